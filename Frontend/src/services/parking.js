@@ -42,6 +42,20 @@ class ParkingService {  // Get user's reservations
     }
   }
 
+  // Autocomplete suggestions for lot names, pin codes and addresses
+  async suggest(query, limit = 8) {
+    try {
+      const response = await apiClient.get('/search/suggest', { params: { q: query, limit } })
+      return { success: true, data: response.data.data }
+    } catch (error) {
+      console.error('Suggest error:', error)
+      return {
+        success: false,
+        message: error.response?.data?.message || 'Suggestions failed'
+      }
+    }
+  }
+
   // Get all parking lots
   async getAllParkingLots() {
     try {
@@ -84,6 +98,21 @@ class ParkingService {  // Get user's reservations
     }
   }
 
+  // Book several spots at once, all or nothing:
+  // { lot_id, count, contiguous } or { lots: [{ lot_id, count, contiguous }] }, plus vehicle_numbers / remarks
+  async createBatchReservation(batchData) {
+    try {
+      const response = await apiClient.post('/reservations/batch', batchData)
+      return { success: true, data: response.data.data }
+    } catch (error) {
+      console.error('Create batch reservation error:', error)
+      return {
+        success: false,
+        message: error.response?.data?.message || 'Failed to book parking spots'
+      }
+    }
+  }
+
   // Release parking spot
   async releaseReservation(reservationId) {
     try {
@@ -99,10 +128,11 @@ class ParkingService {  // Get user's reservations
   }
 
   // Get user reservations
-  async getUserReservations() {
+  // Get user reservations, one page at a time (pass pagination.next_cursor as `after`)
+  async getUserReservations(params = {}) {
     try {
-      const response = await apiClient.get('/reservations')
-      return { success: true, data: response.data.data }
+      const response = await apiClient.get('/reservations', { params })
+      return { success: true, data: response.data.data, pagination: response.data.pagination }
     } catch (error) {
       console.error('Get reservations error:', error)
       return {
@@ -111,6 +141,76 @@ class ParkingService {  // Get user's reservations
       }
     }
   }
+
+  // Book a spot for a future window: { lot_id, start, end, vehicle_number, remarks } (ISO 8601 times)
+  async createAdvanceBooking(bookingData) {
+    try {
+      const response = await apiClient.post('/advance-bookings', bookingData)
+      return { success: true, data: response.data.data }
+    } catch (error) {
+      console.error('Create advance booking error:', error)
+      return {
+        success: false,
+        message: error.response?.data?.message || 'Failed to book parking spot in advance'
+      }
+    }
+  }
+
+  // Get user advance bookings, one page at a time (params: after, limit, status, upcoming)
+  async getAdvanceBookings(params = {}) {
+    try {
+      const response = await apiClient.get('/advance-bookings', { params })
+      return { success: true, data: response.data.data, pagination: response.data.pagination }
+    } catch (error) {
+      console.error('Get advance bookings error:', error)
+      return {
+        success: false,
+        message: error.response?.data?.message || 'Failed to fetch advance bookings'
+      }
+    }
+  }
+
+  async cancelAdvanceBooking(bookingId) {
+    try {
+      const response = await apiClient.put(`/advance-bookings/${bookingId}/cancel`)
+      return { success: true, data: response.data.data }
+    } catch (error) {
+      console.error('Cancel advance booking error:', error)
+      return {
+        success: false,
+        message: error.response?.data?.message || 'Failed to cancel advance booking'
+      }
+    }
+  }
+
+  async checkInAdvanceBooking(bookingId) {
+    try {
+      const response = await apiClient.put(`/advance-bookings/${bookingId}/check-in`)
+      return { success: true, data: response.data.data }
+    } catch (error) {
+      console.error('Check-in error:', error)
+      return {
+        success: false,
+        message: error.response?.data?.message || 'Failed to check in'
+      }
+    }
+  }
+
+  // Free spots of a lot between start and end, overall and per slot
+  async getLotAvailability(lotId, start, end, slotMinutes = 60) {
+    try {
+      const response = await apiClient.get(`/parking-lots/${lotId}/availability`, {
+        params: { start, end, slot_minutes: slotMinutes }
+      })
+      return { success: true, data: response.data.data }
+    } catch (error) {
+      console.error('Get availability error:', error)
+      return {
+        success: false,
+        message: error.response?.data?.message || 'Failed to fetch availability'
+      }
+    }
+  }
 }
 
 class AdminService {
@@ -182,6 +282,40 @@ class AdminService {
     }
   }
 
+  // Bulk import parking lots from a CSV or NDJSON file; large files return 202 with a job to poll
+  async importParkingLots(file, format = null) {
+    try {
+      const formData = new FormData()
+      formData.append('file', file)
+      const response = await apiClient.post('/admin/parking-lots/import', formData, {
+        params: format ? { format } : {},
+        headers: { 'Content-Type': 'multipart/form-data' }
+      })
+      return { success: true, data: response.data.data, status: response.data.status }
+    } catch (error) {
+      console.error('Import parking lots error:', error)
+      return {
+        success: false,
+        data: error.response?.data?.data,
+        message: error.response?.data?.message || 'Failed to import parking lots'
+      }
+    }
+  }
+
+  // Progress and row errors of a bulk import
+  async getImportStatus(jobId) {
+    try {
+      const response = await apiClient.get(`/admin/parking-lots/import/${jobId}`)
+      return { success: true, data: response.data.data }
+    } catch (error) {
+      console.error('Get import status error:', error)
+      return {
+        success: false,
+        message: error.response?.data?.message || 'Failed to fetch import status'
+      }
+    }
+  }
+
   // Get all users
   async getAllUsers() {
     try {
@@ -196,11 +330,26 @@ class AdminService {
     }
   }
 
-  // Get all reservations
-  async getAllReservations() {
+  // Activate/deactivate a user or change their role: { is_active, role }
+  async updateUser(userId, userData) {
     try {
-      const response = await apiClient.get('/admin/reservations')
+      const response = await apiClient.put(`/admin/users/${userId}`, userData)
       return { success: true, data: response.data.data }
+    } catch (error) {
+      console.error('Update user error:', error)
+      return {
+        success: false,
+        message: error.response?.data?.message || 'Failed to update user'
+      }
+    }
+  }
+
+  // Get all reservations
+  // Filters: lot_id, user_id, start, end, active; pass pagination.next_cursor as `after`
+  async getAllReservations(params = {}) {
+    try {
+      const response = await apiClient.get('/admin/reservations', { params })
+      return { success: true, data: response.data.data, pagination: response.data.pagination }
     } catch (error) {
       console.error('Get reservations error:', error)
       return {
@@ -210,11 +359,11 @@ class AdminService {
     }
   }
 
-  // Search functionality
-  async search(searchType, searchQuery) {
+  // Search functionality (spot_location results are paginated: pass pagination.next_cursor as `after`)
+  async search(searchType, searchQuery, params = {}) {
     try {
-      const response = await apiClient.get(`/admin/search?type=${searchType}&query=${encodeURIComponent(searchQuery)}`)
-      return { success: true, data: response.data.data }
+      const response = await apiClient.get('/admin/search', { params: { type: searchType, query: searchQuery, ...params } })
+      return { success: true, data: response.data.data, pagination: response.data.pagination }
     } catch (error) {
       console.error('Search error:', error)
       return {
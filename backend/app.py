@@ -1,10 +1,20 @@
 from flask import Flask
 from flask_cors import CORS
 from application.config import DevelopmentConfig
-from application.database import db
+from application.database import db, migrate, sync_schema
 from application.routes import create_routes
 from application.security import jwt
 from application.mail import mail
+from application.allocator import spot_allocator
+from application.suggest import suggest_index
+from application.geo import lot_grid
+from application.schedule import booking_schedule
+from application.index_sync import init_index_sync
+from application.commands import register_commands
+from application.cache import init_cache
+from application.revocation import init_revocation_store
+from application.passwords import init_password_hasher
+from application.search import init_search_index, is_search_index_object
 import os
 from dotenv import load_dotenv
 
@@ -19,8 +29,17 @@ def create_app():
     
     # Initialize extensions
     db.init_app(app)
+    migrate.init_app(
+        app, db,
+        directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'),
+        render_as_batch=True,  # SQLite needs batch mode for ALTER TABLE
+        include_object=is_search_index_object
+    )
     jwt.init_app(app)
     mail.init_app(app)
+    init_cache(app)
+    init_revocation_store(app)
+    init_password_hasher(app)
     
     # Configure CORS to allow frontend requests
     CORS(app, 
@@ -31,6 +50,7 @@ def create_app():
     
     # Register routes
     create_routes(app)
+    register_commands(app)
     
     # Create database tables
     with app.app_context():
@@ -38,7 +58,14 @@ def create_app():
         instance_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
         os.makedirs(instance_dir, exist_ok=True)
         
-        db.create_all()
+        # Create a fresh database or apply pending migrations
+        if app.config['AUTO_MIGRATE']:
+            sync_schema()
+        else:
+            db.create_all()
+        
+        # Full-text lot search index (FTS5 on SQLite, tsvector on PostgreSQL) and its sync triggers
+        init_search_index()
         
         # Create admin user if not exists
         from application.models import User
@@ -56,6 +83,22 @@ def create_app():
         else:
             print("Admin user already exists!")
         
+        # Build the in-memory free spot lists used by the booking path
+        spot_allocator.load()
+        
+        # Prefix index behind /api/search/suggest
+        suggest_index.configure(max_entries=app.config['SUGGEST_MAX_ENTRIES'])
+        suggest_index.load()
+        
+        # Spatial grid behind /api/parking-lots/nearby
+        lot_grid.load()
+        
+        # Upcoming advance bookings behind /api/parking-lots/<id>/availability
+        booking_schedule.load()
+        
+        # Follow index changes made by other workers
+        init_index_sync(app)
+        
         print("Database initialized successfully!")
     
     return app
@@ -0,0 +1,267 @@
+from datetime import datetime, timedelta, timezone
+from application.database import db
+from application.models import AdvanceBooking, ParkingLot, ParkingSpot, Reservation
+from application.allocator import spot_allocator, CLAIM_ATTEMPTS
+from application.batch_booking import MAX_VEHICLE_NUMBER_LENGTH
+from application.cache_services import invalidate_related_caches
+from application.schedule import booking_schedule, ACTIVE_STATUSES, DEFAULT_HOLD
+from application.index_sync import publish_booking_changes
+from application import billing
+from application import user_stats
+
+CHECK_IN_EARLY = timedelta(minutes=15)  # how long before its start a booking can be checked in
+MAX_BOOKING_HOURS = 72
+BOOKING_HORIZON_DAYS = 60  # how far ahead a window may start
+MAX_AVAILABILITY_SLOTS = 500
+
+
+class AdvanceBookingError(ValueError):
+    """Raised when an advance booking request is malformed or cannot be satisfied"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def parse_time(value, field):
+    """ISO 8601 timestamp as a naive UTC datetime, the way the tables store them"""
+    if not isinstance(value, str) or not value.strip():
+        raise AdvanceBookingError(f'{field} is required (ISO 8601)')
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        raise AdvanceBookingError(f'{field} must be an ISO 8601 timestamp')
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_window(start, end, max_hours=MAX_BOOKING_HOURS):
+    """(start, end) from two ISO timestamps; end must come after start and at most max_hours later"""
+    start, end = parse_time(start, 'start'), parse_time(end, 'end')
+    if end <= start:
+        raise AdvanceBookingError('end must be after start')
+    if end - start > timedelta(hours=max_hours):
+        raise AdvanceBookingError(f'A window can span at most {max_hours} hours')
+    return start, end
+
+
+def _overlapping(spot_id, start, end, exclude_id=None):
+    """Whether the table holds another active booking of the spot overlapping [start, end)"""
+    query = db.select(AdvanceBooking.id).where(
+        AdvanceBooking.spot_id == spot_id,
+        AdvanceBooking.status.in_(ACTIVE_STATUSES),
+        AdvanceBooking.start_time < end,
+        AdvanceBooking.end_time > start
+    )
+    if exclude_id is not None:
+        query = query.where(AdvanceBooking.id != exclude_id)
+    return db.session.execute(query.limit(1)).first() is not None
+
+
+def _candidate_spots(lot_id, start, now, hold):
+    """
+    Spots that could take a window starting at start, lowest id first. A window
+    starting within the hold needs a spot that is free right now; further out,
+    any spot will have been vacated by then.
+    """
+    if start < now + hold:
+        return sorted(spot_allocator.free_spot_ids(lot_id))
+    return db.session.execute(
+        db.select(ParkingSpot.id).where(ParkingSpot.lot_id == lot_id).order_by(ParkingSpot.id)
+    ).scalars().all()
+
+
+def create_booking(user_id, lot_id, start, end, vehicle_number=None, remarks=None, hold=DEFAULT_HOLD, now=None):
+    """
+    Book a spot of the lot for [start, end) and return the booking. The schedule
+    picks a spot with no overlapping window; the row is then written and checked
+    against the table under a lock on the spot, so two workers whose schedules
+    disagree cannot book the same window. On a clash the lot is re-read and the
+    next spot tried.
+    """
+    now = now or datetime.utcnow()
+    if start < now - timedelta(minutes=1):
+        raise AdvanceBookingError('start must not be in the past')
+    if start > now + timedelta(days=BOOKING_HORIZON_DAYS):
+        raise AdvanceBookingError(f'Windows can be booked at most {BOOKING_HORIZON_DAYS} days ahead')
+    if vehicle_number is not None and (
+        not isinstance(vehicle_number, str) or len(vehicle_number) > MAX_VEHICLE_NUMBER_LENGTH
+    ):
+        raise AdvanceBookingError(f'Vehicle number must be a string of at most {MAX_VEHICLE_NUMBER_LENGTH} characters')
+    if db.session.get(ParkingLot, lot_id) is None:
+        raise AdvanceBookingError(f'Parking lot {lot_id} not found', 404)
+
+    for _ in range(CLAIM_ATTEMPTS):
+        busy = booking_schedule.busy_spots(lot_id, start, end)
+        spot_id = next((spot_id for spot_id in _candidate_spots(lot_id, start, now, hold) if spot_id not in busy), None)
+        if spot_id is None:
+            raise AdvanceBookingError('No spot in this lot is free for the whole window', 409)
+
+        try:
+            # Serializes bookings of this spot on databases with row locks
+            db.session.execute(db.select(ParkingSpot.id).where(ParkingSpot.id == spot_id).with_for_update())
+            booking = AdvanceBooking(
+                user_id=user_id, lot_id=lot_id, spot_id=spot_id, start_time=start, end_time=end,
+                vehicle_number=vehicle_number, remarks=remarks
+            )
+            db.session.add(booking)
+            db.session.flush()
+            if _overlapping(spot_id, start, end, exclude_id=booking.id):
+                # Booked by another worker whose bookings this process has not seen
+                db.session.rollback()
+                booking_schedule.reload_lot(lot_id)
+                continue
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        booking_schedule.add(lot_id, spot_id, start, end, booking.id)
+        publish_booking_changes(lot_id)
+        invalidate_related_caches('reservation', user_id=user_id, lot_id=lot_id)
+        return booking
+
+    raise AdvanceBookingError('Spots of this lot are being booked concurrently, try again', 409)
+
+
+def cancel_booking(booking_id, user_id):
+    """Cancel a booking that has not been checked in yet and free its window"""
+    booking = AdvanceBooking.query.filter_by(id=booking_id, user_id=user_id).first()
+    if booking is None:
+        raise AdvanceBookingError('Advance booking not found', 404)
+
+    cancelled = db.session.execute(
+        db.update(AdvanceBooking).where(
+            AdvanceBooking.id == booking_id, AdvanceBooking.status == 'booked'
+        ).values(status='cancelled').execution_options(synchronize_session=False)
+    ).rowcount
+    if not cancelled:
+        db.session.rollback()
+        raise AdvanceBookingError('Only bookings that are not checked in can be cancelled')
+    db.session.commit()
+
+    booking_schedule.remove(booking.lot_id, booking.spot_id, booking_id)
+    publish_booking_changes(booking.lot_id)
+    invalidate_related_caches('reservation', user_id=user_id, lot_id=booking.lot_id)
+    return booking
+
+
+def check_in(booking_id, user_id, now=None):
+    """
+    Turn a booking into a parking reservation. The booked spot is taken with the
+    allocator's conditional UPDATE; when a walk-in has not left it yet, another
+    spot with no booking for the rest of the window is taken instead and the
+    booking moves there. Returns (booking, reservation).
+    """
+    now = now or datetime.utcnow()
+    booking = AdvanceBooking.query.filter_by(id=booking_id, user_id=user_id).first()
+    if booking is None:
+        raise AdvanceBookingError('Advance booking not found', 404)
+    if booking.status != 'booked':
+        raise AdvanceBookingError(f'Booking is {booking.status.replace("_", " ")}')
+    if now < booking.start_time - CHECK_IN_EARLY:
+        raise AdvanceBookingError(f'Check-in opens at {(booking.start_time - CHECK_IN_EARLY).isoformat()}')
+    if now >= booking.end_time:
+        raise AdvanceBookingError('Booking has expired')
+
+    lot_id, booked_spot_id = booking.lot_id, booking.spot_id
+    start, end = booking.start_time, booking.end_time
+    spot_id = None
+    try:
+        if spot_allocator.claim_specific_spot(lot_id, booked_spot_id):
+            spot_id = booked_spot_id
+        else:
+            held = booking_schedule.busy_spots(lot_id, now, end) - {booked_spot_id}
+            spot_id = spot_allocator.claim_spot(lot_id, held=held)
+            if spot_id is None:
+                db.session.rollback()
+                raise AdvanceBookingError('The booked spot is still occupied and no other spot is free', 409)
+
+        # Before the reservation is flushed, or a first-time backfill would count it twice
+        user_stats.record_reservation_started(user_id)
+        reservation = Reservation(
+            spot_id=spot_id, user_id=user_id, vehicle_number=booking.vehicle_number, remarks=booking.remarks,
+            **billing.tariff_snapshot(lot_id)
+        )
+        db.session.add(reservation)
+        db.session.flush()
+
+        checked_in = db.session.execute(
+            db.update(AdvanceBooking).where(
+                AdvanceBooking.id == booking_id, AdvanceBooking.status == 'booked'
+            ).values(
+                status='checked_in', spot_id=spot_id, reservation_id=reservation.id
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        if not checked_in:
+            raise AdvanceBookingError('Booking was checked in or cancelled meanwhile', 409)
+
+        ParkingLot.adjust_spot_counters(lot_id, available=-1, occupied=1)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        if spot_id is not None:
+            # Check-in did not go through, so re-sync the lot with the database
+            spot_allocator.abandon(lot_id, spot_id)
+        raise
+
+    spot_allocator.confirm(spot_id)
+    if spot_id != booked_spot_id:
+        booking_schedule.remove(lot_id, booked_spot_id, booking_id)
+        booking_schedule.add(lot_id, spot_id, start, end, booking_id)
+        publish_booking_changes(lot_id)
+    invalidate_related_caches('reservation', user_id=user_id, lot_id=lot_id)
+    return booking, reservation
+
+
+def lot_availability(lot_id, start, end, slot_minutes=60, hold=DEFAULT_HOLD, now=None):
+    """
+    Spots of the lot free for all of [start, end) and per slot_minutes slot,
+    answered from the booking schedule and the allocator's free lists without
+    reading bookings or reservations. Slots starting within the hold also
+    leave out spots occupied right now.
+    """
+    now = now or datetime.utcnow()
+    if slot_minutes < 1:
+        raise AdvanceBookingError('slot_minutes must be positive')
+    step = timedelta(minutes=slot_minutes)
+    if (end - start) / step > MAX_AVAILABILITY_SLOTS:
+        raise AdvanceBookingError(f'At most {MAX_AVAILABILITY_SLOTS} slots per request; use a larger slot_minutes')
+
+    lot = db.session.get(ParkingLot, lot_id)
+    if lot is None:
+        raise AdvanceBookingError(f'Parking lot {lot_id} not found', 404)
+
+    slots = []
+    slot_start = start
+    while slot_start < end:
+        slots.append((slot_start, min(slot_start + step, end)))
+        slot_start += step
+
+    busy_counts = booking_schedule.busy_counts(lot_id, slots)
+    free_now = spot_allocator.free_spot_ids(lot_id) if start < now + hold else None
+
+    def free_during(slot_start, slot_end, busy_count):
+        if free_now is not None and slot_start < now + hold:
+            return len(free_now - booking_schedule.busy_spots(lot_id, slot_start, slot_end))
+        return max(lot.number_of_spots - busy_count, 0)
+
+    free_spots = free_during(start, end, len(booking_schedule.busy_spots(lot_id, start, end)))
+    return {
+        'lot_id': lot_id,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'slot_minutes': slot_minutes,
+        'total_spots': lot.number_of_spots,
+        'free_spots': free_spots,
+        'available': free_spots > 0,
+        'slots': [
+            {
+                'start': slot_start.isoformat(),
+                'end': slot_end.isoformat(),
+                'free_spots': free_during(slot_start, slot_end, busy_count)
+            }
+            for (slot_start, slot_end), busy_count in zip(slots, busy_counts)
+        ]
+    }
@@ -0,0 +1,412 @@
+import re
+import threading
+from collections import deque
+from application.database import db
+
+CLAIM_ATTEMPTS = 3  # free-list candidates tried before falling back to the table
+DATABASE_CANDIDATES = 20  # free spots read per fallback attempt
+SPOT_NUMBER = re.compile(r'^([A-Za-z]*)(\d+)$')
+
+
+def _skip_locked():
+    """Whether the database supports SELECT ... FOR UPDATE SKIP LOCKED"""
+    return db.session.get_bind().dialect.name == 'postgresql'
+
+
+def take_spot(spot_id):
+    """
+    Flip one spot from free to occupied in the current transaction; False when
+    another transaction got there first. The status check in the UPDATE makes
+    the claim atomic on every backend; on PostgreSQL the row is first locked with
+    SKIP LOCKED so a spot another transaction is claiming is skipped, not waited on.
+    """
+    from application.models import ParkingSpot
+
+    if _skip_locked():
+        locked = db.session.execute(
+            db.select(ParkingSpot.id).where(
+                ParkingSpot.id == spot_id, ParkingSpot.status == 'A'
+            ).with_for_update(skip_locked=True)
+        ).scalar()
+        if locked is None:
+            return False
+    return db.session.execute(
+        db.update(ParkingSpot).where(
+            ParkingSpot.id == spot_id, ParkingSpot.status == 'A'
+        ).values(status='O').execution_options(synchronize_session=False)
+    ).rowcount == 1
+
+
+def claim_from_database(lot_id, exclude=()):
+    """Occupy the lowest-numbered free spot of the lot read from the table, or None when it is full"""
+    from application.models import ParkingSpot
+
+    query = db.select(ParkingSpot.id).where(
+        ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'A'
+    ).order_by(ParkingSpot.id)
+    if exclude:
+        query = query.where(ParkingSpot.id.notin_(exclude))
+    if _skip_locked():
+        # The first free row nobody else holds is ours; lock just that one
+        query = query.limit(1).with_for_update(skip_locked=True)
+    else:
+        query = query.limit(DATABASE_CANDIDATES)
+
+    while True:
+        candidates = db.session.execute(query).scalars().all()
+        if not candidates:
+            return None
+        for spot_id in candidates:
+            if take_spot(spot_id):
+                return spot_id
+        # Every candidate was taken between the read and the UPDATE; read again
+
+
+def take_spots(spot_ids):
+    """Occupy every listed spot that is still free, with one UPDATE; returns the ids actually taken"""
+    from application.models import ParkingSpot
+
+    spot_ids = list(spot_ids)
+    if spot_ids and _skip_locked():
+        spot_ids = db.session.execute(
+            db.select(ParkingSpot.id).where(
+                ParkingSpot.id.in_(spot_ids), ParkingSpot.status == 'A'
+            ).with_for_update(skip_locked=True)
+        ).scalars().all()
+    if not spot_ids:
+        return []
+    if not db.session.get_bind().dialect.update_returning:
+        return [spot_id for spot_id in spot_ids if take_spot(spot_id)]
+    return db.session.execute(
+        db.update(ParkingSpot).where(
+            ParkingSpot.id.in_(spot_ids), ParkingSpot.status == 'A'
+        ).values(status='O').returning(ParkingSpot.id).execution_options(synchronize_session=False)
+    ).scalars().all()
+
+
+def untake_spots(spot_ids):
+    """Give back spots taken earlier in the current transaction"""
+    from application.models import ParkingSpot
+
+    if spot_ids:
+        db.session.execute(
+            db.update(ParkingSpot).where(ParkingSpot.id.in_(spot_ids)).values(status='A')
+            .execution_options(synchronize_session=False)
+        )
+
+
+def claim_many_from_database(lot_id, count, exclude=()):
+    """Occupy up to count of the lowest-numbered free spots of the lot read from the table"""
+    from application.models import ParkingSpot
+
+    claimed = []
+    while len(claimed) < count:
+        query = db.select(ParkingSpot.id).where(
+            ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'A'
+        ).order_by(ParkingSpot.id).limit(count - len(claimed))
+        if exclude:
+            query = query.where(ParkingSpot.id.notin_(exclude))
+        if _skip_locked():
+            query = query.with_for_update(skip_locked=True)
+        candidates = db.session.execute(query).scalars().all()
+        if not candidates:
+            break
+        claimed.extend(take_spots(candidates))
+    return claimed
+
+
+def _spot_runs(rows):
+    """Group (id, spot_number) rows into runs of consecutive numbers sharing a prefix (A1, A2, A3 ...)"""
+    numbered = []
+    for spot_id, spot_number in rows:
+        match = SPOT_NUMBER.match(spot_number or '')
+        if match:
+            numbered.append((match.group(1), int(match.group(2)), spot_id))
+    numbered.sort()
+
+    run = []
+    for prefix, number, spot_id in numbered:
+        if run and (prefix != run[-1][0] or number != run[-1][1] + 1):
+            yield [item[2] for item in run]
+            run = []
+        run.append((prefix, number, spot_id))
+    if run:
+        yield [item[2] for item in run]
+
+
+def claim_contiguous_from_database(lot_id, count, exclude=()):
+    """Occupy count free spots with consecutive numbers, or return [] when the lot has no such run"""
+    from application.models import ParkingSpot
+
+    exclude = set(exclude)
+    for _ in range(CLAIM_ATTEMPTS):
+        rows = [row for row in db.session.query(ParkingSpot.id, ParkingSpot.spot_number).filter(
+            ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'A'
+        ).all() if row[0] not in exclude]
+        window = next((run[:count] for run in _spot_runs(rows) if len(run) >= count), None)
+        if window is None:
+            return []
+        taken = take_spots(window)
+        if len(taken) == count:
+            return taken
+        # Part of the run was booked since the read; hand back our share and look again
+        untake_spots(taken)
+    return []
+
+
+class LotFreeList:
+    """Free list of available spot ids for a single parking lot"""
+
+    def __init__(self, spot_ids=()):
+        self._queue = deque(spot_ids)
+        self._free = set(self._queue)
+
+    def pop(self):
+        """Take a free spot id, or None when the lot is full"""
+        while self._queue:
+            spot_id = self._queue.popleft()
+            if spot_id in self._free:
+                self._free.discard(spot_id)
+                return spot_id
+        return None
+
+    def push(self, spot_id):
+        """Return a spot id to the free list"""
+        if spot_id not in self._free:
+            self._free.add(spot_id)
+            self._queue.append(spot_id)
+
+    def discard(self, spot_id):
+        """Forget a spot id (the stale queue entry is skipped lazily by pop)"""
+        self._free.discard(spot_id)
+
+    def __contains__(self, spot_id):
+        return spot_id in self._free
+
+    def __len__(self):
+        return len(self._free)
+
+
+class SpotAllocator:
+    """Thread-safe in-memory allocator handing out free spots per lot in O(1)"""
+
+    def __init__(self):
+        self._lots = {}
+        self._pending = set()  # handed out but not yet committed
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Build the free lists for every lot from the parking_spots table"""
+        from application.models import ParkingSpot
+
+        rows = db.session.query(ParkingSpot.lot_id, ParkingSpot.id).filter(
+            ParkingSpot.status == 'A'
+        ).order_by(ParkingSpot.lot_id, ParkingSpot.id).all()
+
+        lots = {}
+        for lot_id, spot_id in rows:
+            lots.setdefault(lot_id, []).append(spot_id)
+
+        with self._lock:
+            self._pending.clear()
+            self._lots = {lot_id: LotFreeList(spot_ids) for lot_id, spot_ids in lots.items()}
+
+    def reload_lot(self, lot_id):
+        """Re-read the free spots of one lot from the database"""
+        from application.models import ParkingSpot
+
+        spot_ids = [row[0] for row in db.session.query(ParkingSpot.id).filter(
+            ParkingSpot.lot_id == lot_id,
+            ParkingSpot.status == 'A'
+        ).order_by(ParkingSpot.id).all()]
+
+        with self._lock:
+            if spot_ids or lot_id in self._lots:
+                self._lots[lot_id] = LotFreeList(
+                    spot_id for spot_id in spot_ids if spot_id not in self._pending
+                )
+
+    def allocate(self, lot_id):
+        """Take a free spot id from the lot, or None when none is left"""
+        with self._lock:
+            free_list = self._lots.get(lot_id)
+            spot_id = free_list.pop() if free_list is not None else None
+            if spot_id is not None:
+                self._pending.add(spot_id)
+            return spot_id
+
+    def claim_spot(self, lot_id, held=()):
+        """
+        Occupy a free spot of the lot inside the current transaction and return its id,
+        or None when the lot is full. Candidates come from the free list, but the spot
+        only changes hands through take_spot's conditional UPDATE, so two workers whose
+        free lists disagree with the database can never both book it. Spots in held
+        (e.g. booked in advance for the next hour) are skipped and stay free.
+        """
+        spot_id = None
+        set_aside = []
+        losses = 0
+        while losses < CLAIM_ATTEMPTS:
+            candidate = self.allocate(lot_id)
+            if candidate is None:
+                break
+            if candidate in held:
+                set_aside.append(candidate)
+                continue
+            if take_spot(candidate):
+                spot_id = candidate
+                break
+            # Another worker booked it since our free list was built
+            self.confirm(candidate)
+            losses += 1
+        self._give_back(lot_id, set_aside)
+        if spot_id is not None:
+            return spot_id
+
+        # Free list is empty or keeps disagreeing with the database, so pick
+        # straight from the table and re-sync the lot afterwards
+        spot_id = claim_from_database(lot_id, exclude=held)
+        if spot_id is not None:
+            with self._lock:
+                self._pending.add(spot_id)
+        self.reload_lot(lot_id)
+        return spot_id
+
+    def claim_specific_spot(self, lot_id, spot_id):
+        """Occupy one particular spot inside the current transaction; False when it is not free"""
+        with self._lock:
+            free_list = self._lots.get(lot_id)
+            if free_list is not None:
+                free_list.discard(spot_id)
+            self._pending.add(spot_id)
+        if take_spot(spot_id):
+            return True
+        self.confirm(spot_id)
+        return False
+
+    def _give_back(self, lot_id, spot_ids):
+        """Return handed out but unused spot ids to the end of the lot's free list"""
+        if spot_ids:
+            with self._lock:
+                self._pending.difference_update(spot_ids)
+                free_list = self._lots.setdefault(lot_id, LotFreeList())
+                for spot_id in spot_ids:
+                    free_list.push(spot_id)
+
+    def allocate_many(self, lot_id, count):
+        """Take up to count free spot ids from the lot"""
+        with self._lock:
+            free_list = self._lots.get(lot_id)
+            spot_ids = []
+            while free_list is not None and len(spot_ids) < count:
+                spot_id = free_list.pop()
+                if spot_id is None:
+                    break
+                spot_ids.append(spot_id)
+            self._pending.update(spot_ids)
+            return spot_ids
+
+    def claim_spots(self, lot_id, count, contiguous=False, held=()):
+        """
+        Occupy count free spots of the lot inside the current transaction and return
+        their ids, skipping spots in held. Fewer ids come back when the lot cannot
+        supply them all; the caller then rolls back and calls abandon_many with
+        whatever was returned.
+        """
+        if contiguous:
+            spot_ids = claim_contiguous_from_database(lot_id, count, exclude=held)
+            with self._lock:
+                self._pending.update(spot_ids)
+                free_list = self._lots.get(lot_id)
+                if free_list is not None:
+                    for spot_id in spot_ids:
+                        free_list.discard(spot_id)
+            return spot_ids
+
+        claimed = []
+        set_aside = []
+        for _ in range(CLAIM_ATTEMPTS):
+            candidates = self.allocate_many(lot_id, count - len(claimed))
+            if not candidates:
+                break
+            set_aside.extend(spot_id for spot_id in candidates if spot_id in held)
+            candidates = [spot_id for spot_id in candidates if spot_id not in held]
+            taken = take_spots(candidates)
+            claimed.extend(taken)
+            # The rest were booked by another worker since our free list was built
+            self.confirm_many(set(candidates).difference(taken))
+            if len(claimed) == count:
+                self._give_back(lot_id, set_aside)
+                return claimed
+        self._give_back(lot_id, set_aside)
+
+        more = claim_many_from_database(lot_id, count - len(claimed), exclude=held)
+        with self._lock:
+            self._pending.update(more)
+        self.reload_lot(lot_id)
+        return claimed + more
+
+    def confirm(self, spot_id):
+        """Mark a handed out spot as committed to the database"""
+        with self._lock:
+            self._pending.discard(spot_id)
+
+    def confirm_many(self, spot_ids):
+        """Mark handed out spots as committed to the database"""
+        with self._lock:
+            self._pending.difference_update(spot_ids)
+
+    def abandon(self, lot_id, spot_id):
+        """Undo a handed out spot whose booking failed and re-sync the lot"""
+        self.confirm(spot_id)
+        self.reload_lot(lot_id)
+
+    def abandon_many(self, lot_id, spot_ids):
+        """Undo handed out spots whose booking failed and re-sync the lot"""
+        self.confirm_many(spot_ids)
+        self.reload_lot(lot_id)
+
+    def release(self, lot_id, spot_id):
+        """Give a spot back to the lot's free list"""
+        with self._lock:
+            self._lots.setdefault(lot_id, LotFreeList()).push(spot_id)
+
+    def add_spots(self, lot_id, spot_ids):
+        """Register newly created spots as free"""
+        with self._lock:
+            free_list = self._lots.setdefault(lot_id, LotFreeList())
+            for spot_id in spot_ids:
+                free_list.push(spot_id)
+
+    def remove_spots(self, lot_id, spot_ids):
+        """Forget spots that were deleted from the lot"""
+        with self._lock:
+            free_list = self._lots.get(lot_id)
+            if free_list is not None:
+                for spot_id in spot_ids:
+                    free_list.discard(spot_id)
+
+    def drop_lot(self, lot_id):
+        """Forget a deleted lot"""
+        with self._lock:
+            self._lots.pop(lot_id, None)
+
+    def free_spot_ids(self, lot_id):
+        """Ids of the lot's free spots, read from the database if the lot is not loaded yet"""
+        with self._lock:
+            free_list = self._lots.get(lot_id)
+            if free_list is not None:
+                return set(free_list._free)
+        self.reload_lot(lot_id)
+        with self._lock:
+            free_list = self._lots.get(lot_id)
+            return set(free_list._free) if free_list is not None else set()
+
+    def available_count(self, lot_id):
+        """Number of spots currently free in the lot"""
+        with self._lock:
+            free_list = self._lots.get(lot_id)
+            return len(free_list) if free_list is not None else 0
+
+
+spot_allocator = SpotAllocator()
@@ -0,0 +1,353 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from sqlalchemy import Float, Integer, String
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from application.database import db
+from application.models import User, ParkingLot, ParkingSpot, Reservation, DailyLotStats
+
+GRANULARITIES = ('day', 'week', 'month')
+MAX_BUCKETS = 400
+
+
+# ==================== PORTABLE SQL EXPRESSIONS ====================
+
+class hours_between(FunctionElement):
+    """Hours elapsed from start to end, compiled per database dialect"""
+    type = Float()
+    name = 'hours_between'
+    inherit_cache = True
+
+
+@compiles(hours_between)
+def _hours_between_default(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return 'EXTRACT(EPOCH FROM (%s - %s)) / 3600.0' % (compiler.process(end, **kw), compiler.process(start, **kw))
+
+
+@compiles(hours_between, 'sqlite')
+def _hours_between_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return '((julianday(%s) - julianday(%s)) * 24.0)' % (compiler.process(end, **kw), compiler.process(start, **kw))
+
+
+@compiles(hours_between, 'mysql')
+def _hours_between_mysql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return '(TIMESTAMPDIFF(SECOND, %s, %s) / 3600.0)' % (compiler.process(start, **kw), compiler.process(end, **kw))
+
+
+class hour_of_day(FunctionElement):
+    """Hour (0-23) of a timestamp, compiled per database dialect"""
+    type = Integer()
+    name = 'hour_of_day'
+    inherit_cache = True
+
+
+@compiles(hour_of_day)
+def _hour_of_day_default(element, compiler, **kw):
+    return 'CAST(EXTRACT(HOUR FROM %s) AS INTEGER)' % compiler.process(list(element.clauses)[0], **kw)
+
+
+@compiles(hour_of_day, 'sqlite')
+def _hour_of_day_sqlite(element, compiler, **kw):
+    return "CAST(strftime('%%H', %s) AS INTEGER)" % compiler.process(list(element.clauses)[0], **kw)
+
+
+@compiles(hour_of_day, 'mysql')
+def _hour_of_day_mysql(element, compiler, **kw):
+    return 'HOUR(%s)' % compiler.process(list(element.clauses)[0], **kw)
+
+
+class _time_bucket(FunctionElement):
+    """Start date ('YYYY-MM-DD') of the bucket a timestamp falls in"""
+    type = String()
+    inherit_cache = True
+    granularity = None
+
+
+class day_bucket(_time_bucket):
+    name = 'day_bucket'
+    granularity = 'day'
+    inherit_cache = True
+
+
+class week_bucket(_time_bucket):
+    name = 'week_bucket'
+    granularity = 'week'
+    inherit_cache = True
+
+
+class month_bucket(_time_bucket):
+    name = 'month_bucket'
+    granularity = 'month'
+    inherit_cache = True
+
+
+@compiles(_time_bucket)
+def _time_bucket_default(element, compiler, **kw):
+    column = compiler.process(list(element.clauses)[0], **kw)
+    return "to_char(date_trunc('%s', %s), 'YYYY-MM-DD')" % (element.granularity, column)
+
+
+@compiles(_time_bucket, 'sqlite')
+def _time_bucket_sqlite(element, compiler, **kw):
+    column = compiler.process(list(element.clauses)[0], **kw)
+    if element.granularity == 'day':
+        return 'date(%s)' % column
+    if element.granularity == 'week':
+        # Monday of the ISO week
+        return "date(%s, 'weekday 0', '-6 days')" % column
+    return "strftime('%%Y-%%m-01', %s)" % column
+
+
+BUCKET_EXPRESSIONS = {'day': day_bucket, 'week': week_bucket, 'month': month_bucket}
+
+
+def time_bucket(granularity, column):
+    return BUCKET_EXPRESSIONS[granularity](column)
+
+
+# ==================== BUCKET HELPERS ====================
+
+def bucket_start(value, granularity):
+    """Python twin of time_bucket for a date or datetime"""
+    day = value.date() if isinstance(value, datetime) else value
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def next_bucket(start, granularity):
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    if granularity == 'week':
+        return start + timedelta(weeks=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def iter_buckets(start, end, granularity):
+    """Bucket start dates covering [start, end)"""
+    current = bucket_start(start, granularity)
+    end_day = end.date() if isinstance(end, datetime) else end
+    while current < end_day:
+        yield current
+        current = next_bucket(current, granularity)
+
+
+def bucket_label(start, granularity):
+    if granularity == 'month':
+        return start.strftime('%B %Y')
+    if granularity == 'week':
+        return f"Week of {start.isoformat()}"
+    return start.isoformat()
+
+
+def default_range(granularity='month', periods=6, now=None):
+    """The current bucket plus the periods - 1 before it"""
+    now = now or datetime.utcnow()
+    start = bucket_start(now, granularity)
+    for _ in range(periods - 1):
+        start = bucket_start(start - timedelta(days=1), granularity)
+    return datetime.combine(start, datetime.min.time()), datetime.combine(next_bucket(bucket_start(now, granularity), granularity), datetime.min.time())
+
+
+def parse_range(args):
+    """Read start, end and granularity query arguments, raising ValueError on bad input"""
+    granularity = args.get('granularity', 'month').lower()
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+    start_arg, end_arg = args.get('start'), args.get('end')
+    try:
+        start = datetime.fromisoformat(start_arg) if start_arg else None
+        end = datetime.fromisoformat(end_arg) if end_arg else None
+    except ValueError:
+        raise ValueError('start and end must be ISO dates or datetimes')
+
+    default_start, default_end = default_range(granularity)
+    explicit = bool(start or end)
+    start = start or default_start
+    end = end or default_end
+    if start >= end:
+        raise ValueError('start must be before end')
+    if sum(1 for _ in iter_buckets(start, end, granularity)) > MAX_BUCKETS:
+        raise ValueError(f'Range is too long for {granularity} granularity (max {MAX_BUCKETS} buckets)')
+    return start, end, granularity, explicit
+
+
+# ==================== FACT TABLE SPLIT ====================
+
+def fact_coverage():
+    """(first_day, last_day) held in daily_lot_stats, or None when it is empty"""
+    first_day, last_day = db.session.query(
+        db.func.min(DailyLotStats.day), db.func.max(DailyLotStats.day)
+    ).one()
+    if first_day is None:
+        return None
+    if not isinstance(first_day, date):
+        first_day, last_day = date.fromisoformat(first_day), date.fromisoformat(last_day)
+    return first_day, last_day
+
+
+def fact_window(start=None, end=None):
+    """
+    Whole closed days inside [start, end) that daily_lot_stats can answer, as a
+    (fact_start, fact_end) datetime pair, or None. Everything outside it, which
+    always includes today, is read from raw reservations.
+    """
+    coverage = fact_coverage()
+    if coverage is None:
+        return None
+    first_day, last_day = coverage
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+    fact_start = datetime.combine(first_day, datetime.min.time())
+    if start is not None:
+        start_day = datetime.combine(start.date(), datetime.min.time())
+        fact_start = max(fact_start, start_day if start == start_day else start_day + timedelta(days=1))
+
+    fact_end = min(datetime.combine(last_day + timedelta(days=1), datetime.min.time()), today)
+    if end is not None:
+        fact_end = min(fact_end, datetime.combine(end.date(), datetime.min.time()))
+
+    return (fact_start, fact_end) if fact_start < fact_end else None
+
+
+def raw_filters(column, start, end, window):
+    """Restrict column to [start, end) minus the days answered by the fact table"""
+    filters = []
+    if start is not None:
+        filters.append(column >= start)
+    if end is not None:
+        filters.append(column < end)
+    if window is not None:
+        filters.append(db.or_(column < window[0], column >= window[1]))
+    return filters
+
+
+def fact_filters(window):
+    return [DailyLotStats.day >= window[0].date(), DailyLotStats.day < window[1].date()]
+
+
+# ==================== AGGREGATIONS ====================
+
+def revenue_trend(start, end, granularity):
+    """Revenue (by leaving time) and reservations (by parking time) per bucket"""
+    window = fact_window(start, end)
+    revenue, counts = defaultdict(float), defaultdict(int)
+
+    revenue_bucket = time_bucket(granularity, Reservation.leaving_timestamp)
+    for key, total in db.session.query(
+        revenue_bucket, db.func.sum(Reservation.parking_cost)
+    ).filter(
+        Reservation.leaving_timestamp.isnot(None),
+        *raw_filters(Reservation.leaving_timestamp, start, end, window)
+    ).group_by(revenue_bucket).all():
+        revenue[key] += float(total or 0)
+
+    count_bucket = time_bucket(granularity, Reservation.parking_timestamp)
+    for key, count in db.session.query(
+        count_bucket, db.func.count(Reservation.id)
+    ).filter(
+        *raw_filters(Reservation.parking_timestamp, start, end, window)
+    ).group_by(count_bucket).all():
+        counts[key] += count
+
+    if window is not None:
+        fact_bucket = time_bucket(granularity, DailyLotStats.day)
+        for key, total, count in db.session.query(
+            fact_bucket, db.func.sum(DailyLotStats.revenue), db.func.sum(DailyLotStats.reservations)
+        ).filter(*fact_filters(window)).group_by(fact_bucket).all():
+            revenue[key] += float(total or 0)
+            counts[key] += int(count or 0)
+
+    return [
+        {
+            'month': bucket_label(bucket, granularity),
+            'period_start': bucket.isoformat(),
+            'revenue': revenue.get(bucket.isoformat(), 0.0),
+            'reservations': counts.get(bucket.isoformat(), 0)
+        }
+        for bucket in iter_buckets(start, end, granularity)
+    ]
+
+
+def lot_occupancy():
+    """Per-lot occupancy read from the denormalized lot counters in one query"""
+    rows = db.session.query(
+        ParkingLot.id, ParkingLot.prime_location_name, ParkingLot.available_spots, ParkingLot.occupied_spots
+    ).order_by(ParkingLot.id).all()
+
+    occupancy = []
+    for lot_id, name, available, occupied in rows:
+        total = available + occupied
+        occupancy.append({
+            'id': lot_id,
+            'name': name,
+            'occupied': occupied,
+            'available': available,
+            'occupancy_percentage': round((occupied / total * 100), 2) if total > 0 else 0
+        })
+    return occupancy
+
+
+def admin_summary(start, end, granularity, range_totals=False):
+    """Everything behind /api/admin/summary in a handful of aggregate queries"""
+    totals_start, totals_end = (start, end) if range_totals else (None, None)
+    window = fact_window(totals_start, totals_end)
+    closed = [
+        Reservation.leaving_timestamp.isnot(None),
+        *raw_filters(Reservation.leaving_timestamp, totals_start, totals_end, window)
+    ]
+
+    total_revenue, completed, completed_hours = db.session.query(
+        db.func.coalesce(db.func.sum(Reservation.parking_cost), 0),
+        db.func.count(Reservation.id),
+        db.func.coalesce(db.func.sum(hours_between(Reservation.parking_timestamp, Reservation.leaving_timestamp)), 0)
+    ).filter(*closed).one()
+    total_revenue, completed_hours = float(total_revenue), float(completed_hours)
+
+    revenue_by_lot_id = defaultdict(float)
+    for lot_id, revenue in db.session.query(
+        ParkingSpot.lot_id, db.func.sum(Reservation.parking_cost)
+    ).join(
+        ParkingSpot, Reservation.spot_id == ParkingSpot.id
+    ).filter(*closed).group_by(ParkingSpot.lot_id).all():
+        revenue_by_lot_id[lot_id] += float(revenue or 0)
+
+    if window is not None:
+        fact_revenue, fact_completed, fact_hours = db.session.query(
+            db.func.coalesce(db.func.sum(DailyLotStats.revenue), 0),
+            db.func.coalesce(db.func.sum(DailyLotStats.completed_reservations), 0),
+            db.func.coalesce(db.func.sum(DailyLotStats.completed_hours), 0)
+        ).filter(*fact_filters(window)).one()
+        total_revenue += float(fact_revenue)
+        completed += int(fact_completed)
+        completed_hours += float(fact_hours)
+
+        for lot_id, revenue in db.session.query(
+            DailyLotStats.lot_id, db.func.sum(DailyLotStats.revenue)
+        ).filter(*fact_filters(window)).group_by(DailyLotStats.lot_id).all():
+            revenue_by_lot_id[lot_id] += float(revenue or 0)
+
+    occupancy_by_lot = lot_occupancy()
+    total_spots = sum(lot['occupied'] + lot['available'] for lot in occupancy_by_lot)
+    occupied_spots = sum(lot['occupied'] for lot in occupancy_by_lot)
+    avg_duration = completed_hours / completed if completed else 0
+
+    return {
+        'total_revenue': total_revenue,
+        'avg_occupancy': round((occupied_spots / total_spots * 100), 2) if total_spots > 0 else 0,
+        'active_users': User.query.filter_by(is_active=True, role='user').count(),
+        'avg_duration': round(avg_duration, 2),
+        'revenue_by_lot': {
+            lot['name']: revenue_by_lot_id[lot['id']] for lot in occupancy_by_lot if lot['id'] in revenue_by_lot_id
+        },
+        'occupancy_by_lot': occupancy_by_lot,
+        'monthly_revenue': revenue_trend(start, end, granularity),
+        'granularity': granularity,
+        'range': {'start': start.isoformat(), 'end': end.isoformat()}
+    }
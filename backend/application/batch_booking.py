@@ -0,0 +1,141 @@
+from datetime import datetime
+from application.database import db
+from application.models import ParkingLot, Reservation
+from application.allocator import spot_allocator
+from application.schedule import booking_schedule, DEFAULT_HOLD
+from application.cache_services import invalidate_related_caches
+from application import billing
+from application import user_stats
+
+MAX_BATCH_SPOTS = 100  # spots per batch request
+MAX_VEHICLE_NUMBER_LENGTH = 20
+
+
+class BatchBookingError(ValueError):
+    """Raised when a batch booking request is malformed or cannot be satisfied"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _positive_int(value, field):
+    if isinstance(value, bool):
+        raise BatchBookingError(f'{field} must be a positive integer')
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise BatchBookingError(f'{field} must be a positive integer')
+    if value < 1:
+        raise BatchBookingError(f'{field} must be a positive integer')
+    return value
+
+
+def parse_batch(data):
+    """
+    Read a batch request: either {"lot_id", "count", "contiguous"} for one lot or
+    {"lots": [{"lot_id", "count", "contiguous"}, ...]} to spread over several, plus
+    optional "vehicle_numbers" (one per spot) or "vehicle_number" and "remarks".
+    Returns ([(lot_id, count, contiguous)], vehicle_numbers, remarks).
+    """
+    if not isinstance(data, dict):
+        raise BatchBookingError('Request body must be a JSON object')
+
+    entries = data.get('lots')
+    if entries is None:
+        entries = [data]
+    if not isinstance(entries, list) or not entries:
+        raise BatchBookingError('lots must be a non-empty list')
+
+    items = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise BatchBookingError('Each lots entry must be an object')
+        if entry.get('lot_id') is None:
+            raise BatchBookingError('Parking lot ID is required')
+        items.append((
+            _positive_int(entry.get('lot_id'), 'lot_id'),
+            _positive_int(entry.get('count', 1), 'count'),
+            bool(entry.get('contiguous', data.get('contiguous', False)))
+        ))
+
+    total = sum(count for _, count, _ in items)
+    if total > MAX_BATCH_SPOTS:
+        raise BatchBookingError(f'A batch can book at most {MAX_BATCH_SPOTS} spots')
+
+    vehicle_numbers = data.get('vehicle_numbers')
+    if vehicle_numbers is None:
+        vehicle_numbers = [data.get('vehicle_number')] * total
+    elif not isinstance(vehicle_numbers, list) or len(vehicle_numbers) != total:
+        raise BatchBookingError(f'vehicle_numbers must list one vehicle per spot ({total})')
+    for vehicle_number in vehicle_numbers:
+        if vehicle_number is not None and (
+            not isinstance(vehicle_number, str) or len(vehicle_number) > MAX_VEHICLE_NUMBER_LENGTH
+        ):
+            raise BatchBookingError(f'Vehicle numbers must be strings of at most {MAX_VEHICLE_NUMBER_LENGTH} characters')
+
+    return items, vehicle_numbers, data.get('remarks')
+
+
+def book_batch(user_id, items, vehicle_numbers, remarks=None, hold=DEFAULT_HOLD):
+    """
+    Book every requested spot in one transaction, or none of them, and return
+    the new reservation ids in request order. Spots are claimed with set-based
+    conditional UPDATEs and the reservations written with one multi-row INSERT;
+    spots with an advance booking starting within hold are skipped.
+    Raises BatchBookingError after rolling back when a lot is unknown or short of spots.
+    """
+    lot_ids = {lot_id for lot_id, _, _ in items}
+    known = {row[0] for row in db.session.query(ParkingLot.id).filter(ParkingLot.id.in_(lot_ids))}
+    missing = sorted(lot_ids - known)
+    if missing:
+        raise BatchBookingError(f'Parking lot {missing[0]} not found', 404)
+
+    claimed = []  # (lot_id, spot ids) in request order
+    now = datetime.utcnow()
+    try:
+        for lot_id, count, contiguous in items:
+            held = booking_schedule.busy_spots(lot_id, now, now + hold)
+            spot_ids = spot_allocator.claim_spots(lot_id, count, contiguous=contiguous, held=held)
+            claimed.append((lot_id, spot_ids))
+            if len(spot_ids) < count:
+                kind = 'adjacent free spots' if contiguous else 'free spots'
+                raise BatchBookingError(f'Not enough {kind} in parking lot {lot_id} (requested {count})', 409)
+
+        spot_ids = [spot_id for _, lot_spot_ids in claimed for spot_id in lot_spot_ids]
+        tariffs = {lot_id: billing.tariff_snapshot(lot_id) for lot_id in lot_ids}
+        spot_tariffs = [tariffs[lot_id] for lot_id, lot_spot_ids in claimed for _ in lot_spot_ids]
+        rows = [
+            {
+                'spot_id': spot_id,
+                'user_id': user_id,
+                'vehicle_number': vehicle_number,
+                'remarks': remarks,
+                'parking_timestamp': now,
+                'created_at': now,
+                **tariff
+            }
+            for spot_id, vehicle_number, tariff in zip(spot_ids, vehicle_numbers, spot_tariffs)
+        ]
+        user_stats.record_reservation_started(user_id, count=len(rows))
+        reservation_ids = db.session.scalars(
+            db.insert(Reservation).returning(Reservation.id, sort_by_parameter_order=True), rows
+        ).all()
+
+        booked = {}
+        for lot_id, lot_spot_ids in claimed:
+            booked[lot_id] = booked.get(lot_id, 0) + len(lot_spot_ids)
+        for lot_id, count in booked.items():
+            ParkingLot.adjust_spot_counters(lot_id, available=-count, occupied=count)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        for lot_id, lot_spot_ids in claimed:
+            spot_allocator.abandon_many(lot_id, lot_spot_ids)
+        raise
+
+    spot_allocator.confirm_many(spot_ids)
+    for lot_id in booked:
+        invalidate_related_caches('reservation', user_id=user_id, lot_id=lot_id)
+    return reservation_ids
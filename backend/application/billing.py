@@ -0,0 +1,277 @@
+import math
+from application.database import db
+from application.models import ParkingLot, ParkingSpot, Reservation
+from application.analytics import hour_of_day, hours_between
+
+try:
+    import numpy as np
+except ImportError:  # bills are computed row by row without it
+    np = None
+
+# Stays are billed per started hour; float error in time arithmetic must not add an hour to an exact-hour stay
+BILLING_EPSILON_HOURS = 1e-6
+# Hours of the day (UTC, like every stored timestamp) billed at a tariff's night rate
+NIGHT_START_HOUR = 22
+NIGHT_END_HOUR = 6
+AUDIT_CHUNK_SIZE = 50_000  # reservations loaded per batch
+MAX_REPORTED_MISMATCHES = 100
+COST_TOLERANCE = 0.005  # half a paisa/cent
+
+TARIFF_FIELDS = ('hourly_rate', 'first_hour_rate', 'night_rate', 'daily_cap')
+
+if NIGHT_START_HOUR > NIGHT_END_HOUR:
+    _NIGHT = [hour >= NIGHT_START_HOUR or hour < NIGHT_END_HOUR for hour in range(24)]
+else:
+    _NIGHT = [NIGHT_START_HOUR <= hour < NIGHT_END_HOUR for hour in range(24)]
+_NIGHTS_BEFORE = [sum(_NIGHT[:hour]) for hour in range(25)]  # night hours among clock hours 0 .. hour-1
+NIGHT_HOURS_PER_DAY = _NIGHTS_BEFORE[24]
+
+
+class TariffError(ValueError):
+    """Raised for tariff values that cannot be billed"""
+
+
+def parse_tariff(data, partial=False):
+    """
+    Optional tariff fields of a lot from request data: first_hour_rate,
+    night_rate and daily_cap, each a positive number or null for "use
+    price_per_hour" / "no cap". With partial, absent fields are left out.
+    """
+    tariff = {}
+    for field in ('first_hour_rate', 'night_rate', 'daily_cap'):
+        if field not in data:
+            if not partial:
+                tariff[field] = None
+            continue
+        value = data[field]
+        if value is None or value == '':
+            tariff[field] = None
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise TariffError(f'{field} must be a number')
+        if not math.isfinite(value) or value <= 0:
+            raise TariffError(f'{field} must be greater than 0')
+        tariff[field] = value
+    return tariff
+
+
+def tariff_snapshot(lot_id):
+    """The lot's current tariff as Reservation column values, to freeze the price at booking time"""
+    row = db.session.execute(
+        db.select(ParkingLot.price_per_hour, ParkingLot.first_hour_rate, ParkingLot.night_rate, ParkingLot.daily_cap)
+        .where(ParkingLot.id == lot_id)
+    ).one()
+    return dict(zip(TARIFF_FIELDS, row))
+
+
+def billed_hours(duration_hours):
+    """The stay rounded up to whole hours, at least one"""
+    return max(1, math.ceil(duration_hours - BILLING_EPSILON_HOURS))
+
+
+def _nights_before(hour):
+    """Night hours among the clock hours from hour 0 of the first day up to (not including) hour"""
+    return hour // 24 * NIGHT_HOURS_PER_DAY + _NIGHTS_BEFORE[hour % 24]
+
+
+def charge(hours, start_hour, hourly_rate, first_hour_rate=None, night_rate=None, daily_cap=None):
+    """
+    Price of hours billed hours starting in clock hour start_hour. Each hour
+    costs the night rate if it starts at night and the hourly rate otherwise;
+    the first hour costs the first-hour rate instead, and each 24-hour block of
+    the stay costs at most the daily cap. Unset rates fall back to hourly_rate.
+    """
+    night_rate = hourly_rate if night_rate is None else night_rate
+    first_hour_rate = first_hour_rate if first_hour_rate is not None else (
+        night_rate if _NIGHT[start_hour] else hourly_rate
+    )
+    daily_cap = math.inf if daily_cap is None else daily_cap
+
+    def block(first, last):
+        nights = _nights_before(start_hour + last) - _nights_before(start_hour + first)
+        return hourly_rate * (last - first - nights) + night_rate * nights
+
+    first_hour_adjustment = first_hour_rate - (night_rate if _NIGHT[start_hour] else hourly_rate)
+    total = min(block(0, min(hours, 24)) + first_hour_adjustment, daily_cap)
+    blocks = -(-hours // 24)
+    if blocks > 1:
+        # Every block between the first and the last spans a whole day
+        full_day = hourly_rate * (24 - NIGHT_HOURS_PER_DAY) + night_rate * NIGHT_HOURS_PER_DAY
+        total += (blocks - 2) * min(full_day, daily_cap)
+        total += min(block(24 * (blocks - 1), hours), daily_cap)
+    return total
+
+
+def bill(start, end, hourly_rate, first_hour_rate=None, night_rate=None, daily_cap=None):
+    """Cost of a stay from start to end under a tariff"""
+    hours = billed_hours((end - start).total_seconds() / 3600)
+    return charge(hours, start.hour, hourly_rate, first_hour_rate, night_rate, daily_cap)
+
+
+def _charges_numpy(hours, start_hour, hourly_rate, first_hour_rate, night_rate, daily_cap):
+    """charge() over whole columns at once; NaN rates mean unset"""
+    night = np.asarray(_NIGHT)
+    nights_before = np.asarray(_NIGHTS_BEFORE[:24])
+
+    def nights_until(hour):
+        return hour // 24 * NIGHT_HOURS_PER_DAY + nights_before[hour % 24]
+
+    night_rate = np.where(np.isnan(night_rate), hourly_rate, night_rate)
+    starts_at_night = night[start_hour]
+    first_hour_base = np.where(starts_at_night, night_rate, hourly_rate)
+    first_hour_rate = np.where(np.isnan(first_hour_rate), first_hour_base, first_hour_rate)
+    daily_cap = np.where(np.isnan(daily_cap), np.inf, daily_cap)
+
+    def block(first, last):
+        nights = nights_until(start_hour + last) - nights_until(start_hour + first)
+        return hourly_rate * (last - first - nights) + night_rate * nights
+
+    total = np.minimum(block(0, np.minimum(hours, 24)) + first_hour_rate - first_hour_base, daily_cap)
+    blocks = -(-hours // 24)
+    full_day = hourly_rate * (24 - NIGHT_HOURS_PER_DAY) + night_rate * NIGHT_HOURS_PER_DAY
+    total += np.maximum(blocks - 2, 0) * np.minimum(full_day, daily_cap)
+    last_block = np.minimum(block(24 * np.maximum(blocks - 1, 0), hours), daily_cap)
+    total += np.where(blocks > 1, last_block, 0.0)
+    return total
+
+
+def charges(duration_hours, start_hours, hourly_rates, first_hour_rates, night_rates, daily_caps):
+    """
+    Costs of many stays given as columns of equal length: stay length in hours,
+    the clock hour each started in, and the tariff. Vectorized with NumPy when
+    it is installed, a plain loop over charge() otherwise; both return a
+    sequence of floats in input order.
+    """
+    if np is None:
+        return [
+            charge(billed_hours(duration), start_hour, *tariff)
+            for duration, start_hour, *tariff in zip(
+                duration_hours, start_hours, hourly_rates, first_hour_rates, night_rates, daily_caps
+            )
+        ]
+
+    duration_hours = np.array(duration_hours, dtype=float)
+    hours = np.maximum(1, np.ceil(duration_hours - BILLING_EPSILON_HOURS)).astype(np.int64)
+    return _charges_numpy(
+        hours,
+        np.array(start_hours, dtype=np.int64),
+        np.array(hourly_rates, dtype=float),
+        np.array(first_hour_rates, dtype=float),
+        np.array(night_rates, dtype=float),
+        np.array(daily_caps, dtype=float)
+    )
+
+
+def _tariff_columns():
+    """A reservation's tariff snapshot, or its lot's current tariff for rows booked before snapshots existed"""
+    unsnapshotted = Reservation.hourly_rate.is_(None)
+    return (
+        db.func.coalesce(Reservation.hourly_rate, ParkingLot.price_per_hour),
+        db.case((unsnapshotted, ParkingLot.first_hour_rate), else_=Reservation.first_hour_rate),
+        db.case((unsnapshotted, ParkingLot.night_rate), else_=Reservation.night_rate),
+        db.case((unsnapshotted, ParkingLot.daily_cap), else_=Reservation.daily_cap),
+    )
+
+
+def _bill_rows(*filters, limit=None):
+    """
+    (id, hours parked, start hour, billed cost, tariff...) of closed reservations,
+    ordered by id. Durations and hours come from the database as numbers, which
+    is much cheaper than turning every timestamp into a Python datetime.
+    """
+    query = db.select(
+        Reservation.id,
+        hours_between(Reservation.parking_timestamp, Reservation.leaving_timestamp),
+        hour_of_day(Reservation.parking_timestamp),
+        Reservation.parking_cost,
+        *_tariff_columns()
+    ).join(ParkingSpot, ParkingSpot.id == Reservation.spot_id).join(
+        ParkingLot, ParkingLot.id == ParkingSpot.lot_id
+    ).where(Reservation.leaving_timestamp.isnot(None), *filters).order_by(Reservation.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return db.session.execute(query).all()
+
+
+def _costs(rows):
+    _, duration_hours, start_hours, _, *tariff = zip(*rows)
+    return charges(duration_hours, start_hours, *tariff)
+
+
+def _save_costs(costs):
+    """Write {reservation id: cost} with one executemany UPDATE by primary key"""
+    if costs:
+        db.session.execute(
+            db.update(Reservation), [{'id': reservation_id, 'parking_cost': cost} for reservation_id, cost in costs.items()]
+        )
+
+
+def bill_reservations(reservation_ids):
+    """
+    Price closed reservations from their tariff snapshots in one batch and store
+    the costs in the current transaction. Returns {id: (cost, duration in hours)}.
+    """
+    rows = _bill_rows(Reservation.id.in_(reservation_ids))
+    if not rows:
+        return {}
+    costs = {row[0]: float(cost) for row, cost in zip(rows, _costs(rows))}
+    _save_costs(costs)
+    return {row[0]: (costs[row[0]], row[1]) for row in rows}
+
+
+def audit_bills(released_from, released_to, fix=False, chunk_size=AUDIT_CHUNK_SIZE):
+    """
+    Recompute the bills of reservations released in [released_from, released_to)
+    from their tariff snapshots, chunk_size at a time, and report those whose
+    stored cost differs. With fix, the stored costs are corrected (committed per
+    chunk). The per-user and per-lot spending rollups are not touched; run
+    `flask rebuild-user-stats` and `flask backfill-daily-stats` after a fix.
+    """
+    report = {'checked': 0, 'mismatched': 0, 'difference': 0.0, 'fixed': 0, 'mismatches': []}
+    last_id = 0
+    while True:
+        rows = _bill_rows(
+            Reservation.id > last_id,
+            Reservation.leaving_timestamp >= released_from,
+            Reservation.leaving_timestamp < released_to,
+            limit=chunk_size
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        expected = _costs(rows)
+        if np is not None:
+            stored = np.array([row[3] for row in rows], dtype=float)
+            wrong = np.flatnonzero(~(np.abs(np.nan_to_num(stored, nan=-1.0) - expected) <= COST_TOLERANCE))
+            corrections = {rows[i][0]: float(expected[i]) for i in wrong.tolist()}
+        else:
+            corrections = {
+                row[0]: cost for row, cost in zip(rows, expected)
+                if row[3] is None or abs(row[3] - cost) > COST_TOLERANCE
+            }
+
+        report['checked'] += len(rows)
+        report['mismatched'] += len(corrections)
+        stored_of = {row[0]: row[3] for row in rows}
+        for reservation_id, cost in corrections.items():
+            report['difference'] += cost - (stored_of[reservation_id] or 0.0)
+            if len(report['mismatches']) < MAX_REPORTED_MISMATCHES:
+                report['mismatches'].append(
+                    {'reservation_id': reservation_id, 'stored': stored_of[reservation_id], 'expected': round(cost, 2)}
+                )
+        if fix and corrections:
+            try:
+                _save_costs(corrections)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            report['fixed'] += len(corrections)
+        else:
+            db.session.rollback()  # end the read transaction between chunks
+
+    report['difference'] = round(report['difference'], 2)
+    return report
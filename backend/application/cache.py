@@ -0,0 +1,489 @@
+import heapq
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def estimate_size(value, _depth=0):
+    """Rough in-memory size of a cached value in bytes"""
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    return size
+
+
+class CacheEntry:
+    """Single cached value with its expiry time, estimated size and dependency tags"""
+    __slots__ = ('value', 'expires_at', 'size', 'tags')
+
+    def __init__(self, value, expires_at, size, tags=()):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.tags = tags
+
+
+class TTLCache:
+    """Thread-safe in-process cache with per-entry TTL and LRU eviction"""
+
+    def __init__(self, default_ttl=300, max_entries=10000, max_bytes=64 * 1024 * 1024, sweep_batch=500):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_batch = sweep_batch
+
+        self._entries = OrderedDict()  # key -> CacheEntry, least recently used first
+        self._expiry_heap = []  # (expires_at, key), may hold stale pairs
+        self._tag_index = {}  # tag -> set of keys depending on it
+        self._lock = threading.RLock()
+        self._total_bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+        self._sweeper = None
+        self._stop_sweeper = threading.Event()
+
+    def configure(self, default_ttl=None, max_entries=None, max_bytes=None):
+        """Update limits, evicting entries if the new bounds are smaller"""
+        with self._lock:
+            if default_ttl is not None:
+                self.default_ttl = default_ttl
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._enforce_bounds()
+
+    def get(self, key, default=None):
+        """Return a cached value, or default if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry.value
+
+    def set(self, key, value, ttl=None, tags=()):
+        """Cache a value for ttl seconds (default_ttl when not given) under optional dependency tags"""
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl
+        size = estimate_size(value)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                # Would evict everything else and still not fit
+                return False
+            tags = tuple(tags)
+            self._entries[key] = CacheEntry(value, expires_at, size, tags)
+            self._total_bytes += size
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            self._enforce_bounds()
+            self._compact_heap()
+            return True
+
+    def delete(self, key):
+        """Remove a key, returning True if it was cached"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                return True
+            return False
+
+    def invalidate_tags(self, tags):
+        """Remove every entry depending on any of the tags and return how many were removed"""
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in self._tag_index.pop(tag, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        removed += 1
+        return removed
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._expiry_heap = []
+            self._tag_index = {}
+            self._total_bytes = 0
+
+    def cleanup_expired(self, max_items=None):
+        """Remove expired entries and return how many were removed"""
+        removed = 0
+        while max_items is None or removed < max_items:
+            batch = self.sweep_batch if max_items is None else min(self.sweep_batch, max_items - removed)
+            swept = self._sweep_batch(batch)
+            removed += swept
+            if swept < batch:
+                break
+        return removed
+
+    def get_stats(self):
+        """Counters and sizes describing cache usage"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'total_items': len(self._entries),
+                'total_bytes': self._total_bytes,
+                'total_tags': len(self._tag_index),
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'default_ttl': self.default_ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups * 100, 2) if lookups else 0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'sweeper_running': bool(self._sweeper and self._sweeper.is_alive())
+            }
+
+    def start_sweeper(self, interval=60):
+        """Start a daemon thread that removes expired entries every interval seconds"""
+        if self._sweeper and self._sweeper.is_alive():
+            return
+        self._stop_sweeper.clear()
+
+        def sweep_forever():
+            while not self._stop_sweeper.wait(interval):
+                # Small batches so request threads only ever wait for one batch
+                while self._sweep_batch(self.sweep_batch) == self.sweep_batch:
+                    time.sleep(0)
+
+        self._sweeper = threading.Thread(target=sweep_forever, name='cache-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        """Stop the background sweeper thread"""
+        self._stop_sweeper.set()
+
+    def _sweep_batch(self, limit):
+        """Pop up to limit expired entries off the expiry heap under one lock hold"""
+        removed = 0
+        now = time.monotonic()
+        with self._lock:
+            while self._expiry_heap and removed < limit and self._expiry_heap[0][0] <= now:
+                expires_at, key = heapq.heappop(self._expiry_heap)
+                entry = self._entries.get(key)
+                if entry is not None and entry.expires_at == expires_at:
+                    self._remove(key)
+                    self._expirations += 1
+                    removed += 1
+        return removed
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def _enforce_bounds(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self._evictions += 1
+
+    def _compact_heap(self):
+        # Overwritten and evicted keys leave stale heap pairs behind
+        if len(self._expiry_heap) > 2 * len(self._entries) + 1024:
+            self._expiry_heap = [(entry.expires_at, key) for key, entry in self._entries.items()]
+            heapq.heapify(self._expiry_heap)
+
+
+class TwoLevelCache:
+    """
+    Local TTLCache (L1) in front of a shared Redis tier (L2).
+
+    Writes go to both levels. Invalidations delete from Redis and are
+    broadcast over pub/sub so every worker drops the matching L1 entries.
+    Without a Redis client attached it behaves as a plain L1 cache, and if
+    Redis errors out it falls back to L1 only until the next call.
+
+    The channel also carries named events (publish_event/subscribe) for other
+    per-process state, such as the in-memory indexes, that must follow writes
+    made by other workers. Subscribers to 'resync' are called after the
+    listener reconnects, since events may have been missed meanwhile.
+    """
+
+    def __init__(self, l1, key_prefix='parking:cache:', channel='parking:cache:invalidate', l1_max_ttl=30):
+        self.l1 = l1
+        self.redis = None
+        self.key_prefix = key_prefix
+        self.channel = channel
+        self.l1_max_ttl = l1_max_ttl
+        self.origin = uuid.uuid4().hex
+
+        self._listener = None
+        self._stop_listener = threading.Event()
+        self._handlers = {}  # event name -> [handler(**data)]
+        self._stats_lock = threading.Lock()
+        self._l2_hits = 0
+        self._l2_misses = 0
+        self._l2_errors = 0
+        self._messages_received = 0
+
+    def attach_redis(self, client, listen=True):
+        """Use client as the shared L2 tier and subscribe to invalidation broadcasts"""
+        self.redis = client
+        if listen:
+            self.start_listener()
+
+    def get(self, key, default=None):
+        value = self.l1.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.redis is None:
+            return default
+
+        try:
+            raw = self.redis.get(self.key_prefix + key)
+        except Exception:
+            self._count('_l2_errors')
+            return default
+        if raw is None:
+            self._count('_l2_misses')
+            return default
+
+        self._count('_l2_hits')
+        payload = json.loads(raw)
+        self.l1.set(key, payload['value'], ttl=self._l1_ttl(payload.get('ttl')), tags=payload.get('tags', ()))
+        return payload['value']
+
+    def set(self, key, value, ttl=None, tags=()):
+        ttl = self.l1.default_ttl if ttl is None else ttl
+        tags = tuple(tags)
+        self.l1.set(key, value, ttl=self._l1_ttl(ttl), tags=tags)
+        if self.redis is None:
+            return True
+
+        try:
+            redis_key = self.key_prefix + key
+            self.redis.set(redis_key, json.dumps({'value': value, 'ttl': ttl, 'tags': tags}, default=str), ex=max(int(ttl), 1))
+            # A tag set must outlive every key in it, so its expiry is only ever pushed back
+            tag_ttl = max(int(ttl), 1) * 2
+            for tag in tags:
+                tag_key = self._tag_key(tag)
+                self.redis.sadd(tag_key, redis_key)
+                if self.redis.ttl(tag_key) < tag_ttl:
+                    self.redis.expire(tag_key, tag_ttl)
+        except Exception:
+            self._count('_l2_errors')
+        return True
+
+    def delete(self, key):
+        removed = self.l1.delete(key)
+        self._broadcast(keys=[key])
+        if self.redis is not None:
+            try:
+                removed = bool(self.redis.delete(self.key_prefix + key)) or removed
+            except Exception:
+                self._count('_l2_errors')
+        return removed
+
+    def invalidate_tags(self, tags):
+        tags = list(tags)
+        removed = self.l1.invalidate_tags(tags)
+        if self.redis is not None:
+            try:
+                for tag in tags:
+                    tag_key = self._tag_key(tag)
+                    keys = self.redis.smembers(tag_key)
+                    if keys:
+                        removed += self.redis.delete(*keys)
+                    self.redis.delete(tag_key)
+            except Exception:
+                self._count('_l2_errors')
+        self._broadcast(tags=tags)
+        return removed
+
+    def clear(self):
+        self.l1.clear()
+        if self.redis is not None:
+            try:
+                keys = list(self.redis.scan_iter(match=self.key_prefix + '*'))
+                if keys:
+                    self.redis.delete(*keys)
+            except Exception:
+                self._count('_l2_errors')
+        self._broadcast(clear=True)
+
+    def cleanup_expired(self, max_items=None):
+        # Redis expires L2 keys by itself
+        return self.l1.cleanup_expired(max_items)
+
+    def configure(self, **limits):
+        self.l1.configure(**limits)
+
+    def start_sweeper(self, interval=60):
+        self.l1.start_sweeper(interval)
+
+    @property
+    def default_ttl(self):
+        return self.l1.default_ttl
+
+    def get_stats(self):
+        stats = self.l1.get_stats()
+        with self._stats_lock:
+            stats['l2'] = {
+                'enabled': self.redis is not None,
+                'backend': type(self.redis).__name__ if self.redis is not None else None,
+                'hits': self._l2_hits,
+                'misses': self._l2_misses,
+                'errors': self._l2_errors,
+                'invalidations_received': self._messages_received,
+                'listening': bool(self._listener and self._listener.is_alive())
+            }
+        return stats
+
+    def subscribe(self, event, handler):
+        """Call handler(**data) in the listener thread for every event published by another process"""
+        self._handlers.setdefault(event, []).append(handler)
+
+    def publish_event(self, event, **data):
+        """Tell every other process about event; a no-op without Redis"""
+        self._broadcast(event=event, data=data)
+
+    def start_listener(self):
+        """Start a daemon thread applying invalidations published by other workers"""
+        if self._listener and self._listener.is_alive():
+            return
+        self._stop_listener.clear()
+        self._listener = threading.Thread(target=self._listen, name='cache-invalidation-listener', daemon=True)
+        self._listener.start()
+
+    def stop_listener(self):
+        self._stop_listener.set()
+
+    def handle_message(self, data):
+        """Apply one invalidation broadcast to the local L1"""
+        message = json.loads(data)
+        if message.get('origin') == self.origin:
+            return
+        self._count('_messages_received')
+        if message.get('clear'):
+            self.l1.clear()
+        if message.get('tags'):
+            self.l1.invalidate_tags(message['tags'])
+        for key in message.get('keys', ()):
+            self.l1.delete(key)
+        if message.get('event'):
+            self._dispatch(message['event'], message.get('data') or {})
+
+    def _dispatch(self, event, data):
+        for handler in self._handlers.get(event, ()):
+            try:
+                handler(**data)
+            except Exception as e:
+                print(f"Cache event handler for {event} failed: {str(e)}")
+
+    def _listen(self):
+        resync = False
+        while not self._stop_listener.is_set():
+            pubsub = None
+            try:
+                pubsub = self.redis.pubsub()
+                pubsub.subscribe(self.channel)
+                if resync:
+                    self._dispatch('resync', {})
+                    resync = False
+                while not self._stop_listener.is_set():
+                    message = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message['type'] == 'message':
+                        self.handle_message(message['data'])
+            except Exception:
+                # Connection lost: drop L1 since broadcasts may have been missed, then resubscribe
+                self._count('_l2_errors')
+                self.l1.clear()
+                resync = True
+                self._stop_listener.wait(1.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def _broadcast(self, **message):
+        if self.redis is None:
+            return
+        try:
+            self.redis.publish(self.channel, json.dumps(dict(message, origin=self.origin)))
+        except Exception:
+            self._count('_l2_errors')
+
+    def _l1_ttl(self, ttl):
+        ttl = self.l1.default_ttl if ttl is None else ttl
+        return min(ttl, self.l1_max_ttl) if self.redis is not None else ttl
+
+    def _tag_key(self, tag):
+        return f'{self.key_prefix}tag:{tag}'
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+def create_redis_client(app):
+    """Redis client for the configured CACHE_BACKEND, or None for a local-only cache"""
+    backend = app.config.get('CACHE_BACKEND', 'local')
+    if backend == 'redis':
+        import redis
+        return redis.Redis.from_url(app.config['REDIS_URL'])
+    if backend == 'fake':
+        from application.fake_redis import FakeRedis
+        return FakeRedis()
+    return None
+
+
+app_cache = TwoLevelCache(TTLCache())
+
+
+def init_cache(app):
+    """Apply cache limits from the app config, attach the shared tier and start the expiry sweeper"""
+    app_cache.configure(
+        default_ttl=app.config.get('CACHE_DEFAULT_TTL'),
+        max_entries=app.config.get('CACHE_MAX_ENTRIES'),
+        max_bytes=app.config.get('CACHE_MAX_BYTES')
+    )
+    app_cache.l1_max_ttl = app.config.get('CACHE_L1_MAX_TTL', app_cache.l1_max_ttl)
+
+    client = create_redis_client(app)
+    if client is not None:
+        try:
+            client.ping()
+            app_cache.attach_redis(client)
+        except Exception as e:
+            print(f"Shared cache unavailable, using local cache only: {str(e)}")
+
+    if not app.config.get('TESTING'):
+        app_cache.start_sweeper(app.config.get('CACHE_SWEEP_INTERVAL', 60))
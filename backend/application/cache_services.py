@@ -0,0 +1,179 @@
+import threading
+from datetime import datetime
+from application.cache import app_cache
+from application.revocation import revocation_store
+from application.database import db
+from application.models import User, ParkingLot, ParkingSpot, Reservation
+
+# Cache lifetimes in seconds
+LOTS_TTL = 60
+LOT_DETAILS_TTL = 30
+DASHBOARD_TTL = 120
+
+# Hit/miss counters per view and per tag family ('lot', 'user', 'dashboard', ...)
+_usage_lock = threading.Lock()
+_view_usage = {}
+_tag_usage = {}
+
+
+def _record_usage(view, tags, hit):
+    with _usage_lock:
+        counters = [_view_usage.setdefault(view, {'hits': 0, 'misses': 0})]
+        for family in {tag.split(':', 1)[0] for tag in tags}:
+            counters.append(_tag_usage.setdefault(family, {'hits': 0, 'misses': 0}))
+        for counter in counters:
+            counter['hits' if hit else 'misses'] += 1
+
+
+def _usage_report(usage):
+    report = {}
+    with _usage_lock:
+        for name, counter in usage.items():
+            lookups = counter['hits'] + counter['misses']
+            report[name] = dict(counter, hit_rate=round(counter['hits'] / lookups * 100, 2) if lookups else 0)
+    return report
+
+
+def cached_view(view, key, tags, ttl, loader, force_refresh=False):
+    """Return a cached value for key, building it with loader on a miss or forced refresh"""
+    if not force_refresh:
+        value = app_cache.get(key)
+        if value is not None:
+            _record_usage(view, tags, hit=True)
+            return value
+
+    _record_usage(view, tags, hit=False)
+    value = loader()
+    if value is not None:
+        app_cache.set(key, value, ttl=ttl, tags=tags)
+    return value
+
+
+def lot_tag(lot_id):
+    return f'lot:{lot_id}'
+
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+
+class CachedParkingService:
+    """Cached parking lot listings and lot details"""
+
+    @staticmethod
+    def serialize_lot(lot):
+        data = lot.to_dict()
+        data['available_spots_count'] = lot.available_spots
+        data['occupancy_rate'] = round(lot.occupied_spots / lot.number_of_spots * 100, 2) if lot.number_of_spots else 0
+        return data
+
+    @staticmethod
+    def get_parking_lots_with_availability(force_refresh=False):
+        """All parking lots with availability counters"""
+        def load():
+            lots = ParkingLot.query.order_by(ParkingLot.id).all()
+            return [CachedParkingService.serialize_lot(lot) for lot in lots]
+
+        # The listing depends on every lot, so it carries the 'lots' tag rather than one tag per lot
+        return cached_view('parking_lots', 'parking_lots:all', ['lots'], LOTS_TTL, load, force_refresh)
+
+    @staticmethod
+    def get_parking_lot_details(lot_id, force_refresh=False):
+        """One parking lot with its spots and their current reservations"""
+        def load():
+            lot = db.session.get(ParkingLot, lot_id)
+            if not lot:
+                return None
+
+            # Spots and their active reservations in one query instead of one per spot
+            rows = db.session.query(ParkingSpot, Reservation).outerjoin(
+                Reservation, db.and_(
+                    Reservation.spot_id == ParkingSpot.id,
+                    Reservation.leaving_timestamp.is_(None)
+                )
+            ).filter(ParkingSpot.lot_id == lot_id).order_by(ParkingSpot.id).all()
+
+            spots = []
+            for spot, reservation in rows:
+                spots.append({
+                    'id': spot.id,
+                    'spot_number': spot.spot_number,
+                    'status': spot.status,
+                    'lot_id': spot.lot_id,
+                    'current_reservation': reservation.to_dict() if reservation else None,
+                    'created_at': spot.created_at.isoformat()
+                })
+
+            data = CachedParkingService.serialize_lot(lot)
+            data['spots'] = spots
+            data['_generated_at'] = datetime.utcnow().isoformat()
+            return data
+
+        return cached_view('parking_lot_details', f'parking_lot:{lot_id}', [lot_tag(lot_id)],
+                           LOT_DETAILS_TTL, load, force_refresh)
+
+
+class CachedDashboardService:
+    """Cached admin dashboard statistics"""
+
+    @staticmethod
+    def get_admin_dashboard_stats(force_refresh=False):
+        """Lot, spot, user and reservation totals for the admin dashboard"""
+        built = []
+
+        def load():
+            built.append(True)
+            total_lots, total_spots, available_spots, occupied_spots = db.session.query(
+                db.func.count(ParkingLot.id),
+                db.func.coalesce(db.func.sum(ParkingLot.number_of_spots), 0),
+                db.func.coalesce(db.func.sum(ParkingLot.available_spots), 0),
+                db.func.coalesce(db.func.sum(ParkingLot.occupied_spots), 0)
+            ).one()
+
+            active_reservations, total_revenue = db.session.query(
+                db.func.count(Reservation.id).filter(Reservation.leaving_timestamp.is_(None)),
+                db.func.coalesce(db.func.sum(Reservation.parking_cost).filter(Reservation.leaving_timestamp.isnot(None)), 0)
+            ).one()
+
+            return {
+                'total_lots': total_lots,
+                'total_spots': int(total_spots),
+                'available_spots': int(available_spots),
+                'occupied_spots': int(occupied_spots),
+                'total_users': User.query.filter_by(role='user').count(),
+                'active_reservations': active_reservations,
+                'total_revenue': float(total_revenue),
+                '_generated_at': datetime.utcnow().isoformat()
+            }
+
+        stats = cached_view('admin_dashboard', 'dashboard:admin', ['dashboard'], DASHBOARD_TTL, load, force_refresh)
+        return dict(stats, _cached=not built)
+
+
+def invalidate_related_caches(event, user_id=None, lot_id=None):
+    """Evict only the cache entries that depend on what changed"""
+    tags = ['dashboard']
+    if event in ('reservation', 'parking_lot'):
+        tags.append('lots')
+        if lot_id is not None:
+            tags.append(lot_tag(lot_id))
+    if user_id is not None:
+        tags.append(user_tag(user_id))
+    return app_cache.invalidate_tags(tags)
+
+
+def invalidate_bulk_changes(user_ids=(), lot_ids=()):
+    """Evict the entries behind many changed reservations with one invalidation"""
+    tags = ['dashboard', 'lots']
+    tags.extend(lot_tag(lot_id) for lot_id in set(lot_ids))
+    tags.extend(user_tag(user_id) for user_id in set(user_ids))
+    return app_cache.invalidate_tags(tags)
+
+
+def get_cache_status():
+    """Cache statistics plus hit rates per view and per tag family"""
+    stats = app_cache.get_stats()
+    stats['views'] = _usage_report(_view_usage)
+    stats['tags'] = _usage_report(_tag_usage)
+    stats['token_revocations'] = revocation_store.get_stats()
+    return stats
@@ -0,0 +1,164 @@
+from datetime import date, datetime, timedelta
+import click
+from application.database import db
+from application.models import User, ParkingLot, ParkingSpot
+from application.user_stats import rebuild_user_stats
+from application.daily_stats import pending_days, rollup_days
+from application.search import init_search_index, rebuild_search_index
+from application.query_plans import check_query_plans, UnsupportedDialectError
+from application.releases import release_overstays
+from application.billing import audit_bills, AUDIT_CHUNK_SIZE, np
+
+
+def count_spots_by_lot():
+    """Actual available/occupied spot counts per lot in one grouped query"""
+    rows = db.session.query(
+        ParkingSpot.lot_id,
+        db.func.sum(db.case((ParkingSpot.status == 'A', 1), else_=0)),
+        db.func.sum(db.case((ParkingSpot.status == 'O', 1), else_=0))
+    ).group_by(ParkingSpot.lot_id).all()
+    return {lot_id: (int(available or 0), int(occupied or 0)) for lot_id, available, occupied in rows}
+
+
+def check_spot_counters(fix=False):
+    """Compare the denormalized lot counters with parking_spots, optionally repairing them"""
+    actual = count_spots_by_lot()
+    mismatches = []
+
+    for lot in ParkingLot.query.all():
+        available, occupied = actual.get(lot.id, (0, 0))
+        if lot.available_spots != available or lot.occupied_spots != occupied:
+            mismatches.append({
+                'lot_id': lot.id,
+                'stored': (lot.available_spots, lot.occupied_spots),
+                'actual': (available, occupied)
+            })
+            if fix:
+                lot.available_spots = available
+                lot.occupied_spots = occupied
+
+    if fix and mismatches:
+        db.session.commit()
+    return mismatches
+
+
+def register_commands(app):
+    """Register maintenance commands on the Flask CLI"""
+
+    @app.cli.command('check-spot-counters')
+    @click.option('--fix', is_flag=True, help='Rewrite counters that disagree with parking_spots')
+    def check_spot_counters_command(fix):
+        """Verify ParkingLot available/occupied counters against parking_spots"""
+        mismatches = check_spot_counters(fix=fix)
+        for mismatch in mismatches:
+            click.echo(
+                f"Lot {mismatch['lot_id']}: stored available/occupied {mismatch['stored']}, "
+                f"actual {mismatch['actual']}" + (' (fixed)' if fix else '')
+            )
+        if not mismatches:
+            click.echo('All spot counters are consistent.')
+        elif not fix:
+            raise SystemExit(1)
+
+    @app.cli.command('rebuild-user-stats')
+    @click.option('--user-id', type=int, default=None, help='Rebuild a single user')
+    @click.option('--batch-size', type=int, default=500, show_default=True, help='Users per transaction')
+    def rebuild_user_stats_command(user_id, batch_size):
+        """Recompute user_stats and user_monthly_stats from reservations"""
+        last_id, rebuilt = 0, 0
+        while True:
+            if user_id is not None:
+                user_ids = [user_id]
+            else:
+                user_ids = [row[0] for row in db.session.query(User.id).filter(
+                    User.id > last_id
+                ).order_by(User.id).limit(batch_size).all()]
+            if not user_ids:
+                break
+            rebuild_user_stats(user_ids)
+            db.session.commit()
+            rebuilt += len(user_ids)
+            last_id = user_ids[-1]
+            if user_id is not None:
+                break
+        click.echo(f'Rebuilt statistics for {rebuilt} user(s).')
+
+    @app.cli.command('backfill-daily-stats')
+    @click.option('--start', default=None, help='First day (YYYY-MM-DD); defaults to the first pending day')
+    @click.option('--end', default=None, help='Last day (YYYY-MM-DD); defaults to yesterday')
+    @click.option('--chunk-days', type=int, default=7, show_default=True, help='Days per transaction')
+    def backfill_daily_stats_command(start, end, chunk_days):
+        """Rebuild daily_lot_stats for a range of closed days"""
+        pending = pending_days()
+        try:
+            first_day = date.fromisoformat(start) if start else (pending[0] if pending else None)
+            last_day = date.fromisoformat(end) if end else (pending[1] if pending else None)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+        if first_day is None or last_day is None:
+            click.echo('Nothing to roll up.')
+            return
+
+        def progress(chunk_start, chunk_end, written):
+            click.echo(f'{chunk_start} .. {chunk_end}: {written} row(s) written so far')
+
+        written = rollup_days(first_day, last_day, chunk_days=chunk_days, progress=progress)
+        click.echo(f'Wrote {written} daily_lot_stats row(s).')
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Recreate the lot full-text index from parking_lots"""
+        init_search_index()
+        rebuild_search_index()
+        db.session.commit()
+        click.echo(f'Reindexed {ParkingLot.query.count()} parking lot(s).')
+
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        """Fail if a hot route query no longer uses its index (run in CI after migrations)"""
+        try:
+            failures = check_query_plans()
+        except UnsupportedDialectError as e:
+            click.echo(f'Skipping the query plan check: {e}.')
+            return
+        for name, index, plan in failures:
+            click.echo(f'{name}: expected {index}, got plan:\n  ' + plan.replace('\n', '\n  '))
+        if failures:
+            raise SystemExit(1)
+        click.echo('All hot queries use their indexes.')
+
+    @app.cli.command('release-overstays')
+    @click.option('--max-hours', type=float, default=None, help='Defaults to OVERSTAY_MAX_HOURS')
+    @click.option('--chunk-size', type=int, default=500, show_default=True, help='Reservations per transaction')
+    def release_overstays_command(max_hours, chunk_size):
+        """Release reservations parked for longer than the overstay limit"""
+        if max_hours is None:
+            max_hours = app.config['OVERSTAY_MAX_HOURS']
+        result = release_overstays(max_hours, chunk_size=chunk_size)
+        click.echo(f"Released {result['released']} reservation(s) in {result['chunks']} chunk(s), "
+                   f"revenue {result['revenue']:.2f}.")
+
+    @app.cli.command('audit-bills')
+    @click.option('--start', default=None, help='First release day (YYYY-MM-DD); defaults to the first day of last month')
+    @click.option('--end', default=None, help='Last release day (YYYY-MM-DD); defaults to the last day of last month')
+    @click.option('--fix', is_flag=True, help='Store the recomputed costs')
+    @click.option('--chunk-size', type=int, default=AUDIT_CHUNK_SIZE, show_default=True, help='Reservations per batch')
+    def audit_bills_command(start, end, fix, chunk_size):
+        """Recompute the bills of released reservations from their tariff snapshots and report differences"""
+        this_month = date.today().replace(day=1)
+        try:
+            first_day = date.fromisoformat(start) if start else (this_month - timedelta(days=1)).replace(day=1)
+            last_day = date.fromisoformat(end) if end else this_month - timedelta(days=1)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+
+        report = audit_bills(
+            datetime.combine(first_day, datetime.min.time()),
+            datetime.combine(last_day + timedelta(days=1), datetime.min.time()),
+            fix=fix, chunk_size=chunk_size
+        )
+        for mismatch in report['mismatches']:
+            click.echo(f"reservation {mismatch['reservation_id']}: stored {mismatch['stored']}, expected {mismatch['expected']}")
+        click.echo(f"Checked {report['checked']} bill(s) released {first_day} .. {last_day} "
+                   f"({'NumPy' if np is not None else 'pure Python'}): {report['mismatched']} differ "
+                   f"by {report['difference']:+.2f} in total" + (f", {report['fixed']} fixed." if fix else '.'))
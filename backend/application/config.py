@@ -10,10 +10,48 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-string'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # Seconds a worker trusts its cached copy of a user's role and active flag
+    USER_STATUS_TTL = int(os.environ.get('USER_STATUS_TTL') or 30)
+    
+    # Password hashing (application.passwords). Stored hashes made with other
+    # parameters are upgraded on the user's next successful login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt'  # e.g. 'scrypt:32768:8:1', 'pbkdf2:sha256:1000000'
+    PASSWORD_VERIFY_WORKERS = int(os.environ.get('PASSWORD_VERIFY_WORKERS') or 0) or None  # hashes run at once; default min(4, cores)
+    PASSWORD_VERIFY_QUEUE = int(os.environ.get('PASSWORD_VERIFY_QUEUE') or 64)  # hashes waiting beyond that before logins get 503
+    PASSWORD_VERIFY_TIMEOUT = float(os.environ.get('PASSWORD_VERIFY_TIMEOUT') or 10)  # seconds
     
     # Redis Configuration (for production)
     REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
     
+    # In-process cache (application.cache.app_cache)
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL') or 300)  # seconds
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES') or 10000)
+    CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES') or 64 * 1024 * 1024)
+    CACHE_SWEEP_INTERVAL = 60  # seconds between background expiry sweeps
+    # 'local' (in-process only), 'redis' (shared L2 at REDIS_URL) or 'fake' (in-process Redis stand-in)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'local'
+    CACHE_L1_MAX_TTL = 30  # cap on L1 lifetime when a shared tier is attached
+    
+    # Apply pending Alembic migrations (backend/migrations) when the app starts
+    AUTO_MIGRATE = (os.environ.get('AUTO_MIGRATE') or 'true').lower() == 'true'
+    
+    # Autocomplete prefix index: total (token, lot) entries kept in memory per process
+    SUGGEST_MAX_ENTRIES = int(os.environ.get('SUGGEST_MAX_ENTRIES') or 1_000_000)
+    # Each worker rebuilds its lot indexes this often (0 disables), in case it missed another worker's change
+    LOT_INDEX_RELOAD_SECONDS = int(os.environ.get('LOT_INDEX_RELOAD_SECONDS') or 300)
+    
+    # Bulk lot imports: uploads larger than this run as a Celery task (0 imports everything inline)
+    IMPORT_BACKGROUND_THRESHOLD_BYTES = int(os.environ.get('IMPORT_BACKGROUND_THRESHOLD_BYTES') or 1024 * 1024)
+    IMPORT_UPLOAD_DIR = os.environ.get('IMPORT_UPLOAD_DIR')  # where background uploads wait; default <instance>/imports
+    
+    # Active reservations older than this are released by the release_overstayed_reservations task
+    OVERSTAY_MAX_HOURS = float(os.environ.get('OVERSTAY_MAX_HOURS') or 24)
+    
+    # Walk-ins leave alone spots with an advance booking starting within this many minutes
+    ADVANCE_BOOKING_HOLD_MINUTES = int(os.environ.get('ADVANCE_BOOKING_HOLD_MINUTES') or 60)
+    # Each worker re-reads all upcoming bookings this often (0 disables), in case it missed another worker's change
+    BOOKING_SCHEDULE_RELOAD_SECONDS = int(os.environ.get('BOOKING_SCHEDULE_RELOAD_SECONDS') or 30)
+    
     # ================= CELERY CONFIGURATION (NEW) =================
     # Celery Configuration
     CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL') or 'redis://localhost:6379/0'
@@ -36,6 +74,14 @@ class Config:
             'task': 'application.tasks.send_monthly_reports',
             'schedule': 60.0 * 60.0 * 24.0 * 30.0,  # Every 30 days
         },
+        'daily-lot-stats': {
+            'task': 'application.tasks.rollup_daily_lot_stats',
+            'schedule': 60.0 * 60.0,  # Hourly; only closed days not yet rolled up are processed
+        },
+        'release-overstays': {
+            'task': 'application.tasks.release_overstayed_reservations',
+            'schedule': 60.0 * 15.0,  # Every 15 minutes
+        },
     }
     # ===============================================================
     
@@ -71,6 +117,7 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
+    CACHE_BACKEND = 'fake'
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
 
 config = {
@@ -0,0 +1,136 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from application.analytics import hours_between, time_bucket
+from application.database import db
+from application.models import ParkingSpot, Reservation, DailyLotStats
+
+
+def _empty_row():
+    return {
+        'revenue': 0.0,
+        'reservations': 0,
+        'completed_reservations': 0,
+        'completed_hours': 0.0,
+        'parked_hours': 0.0,
+        'peak_occupancy': 0
+    }
+
+
+def _peak(events):
+    """Most intervals open at once; ends sort before starts at the same instant"""
+    running = peak = 0
+    for _, delta in sorted(events):
+        running += delta
+        peak = max(peak, running)
+    return peak
+
+
+def _rollup_chunk(first_day, last_day):
+    """Recompute daily_lot_stats rows for the closed days [first_day, last_day]"""
+    start = datetime.combine(first_day, time.min)
+    end = datetime.combine(last_day + timedelta(days=1), time.min)
+    rows = defaultdict(_empty_row)
+
+    leaving_day = time_bucket('day', Reservation.leaving_timestamp)
+    for lot_id, day_key, revenue, completed, hours in db.session.query(
+        ParkingSpot.lot_id,
+        leaving_day,
+        db.func.coalesce(db.func.sum(Reservation.parking_cost), 0),
+        db.func.count(Reservation.id),
+        db.func.coalesce(db.func.sum(hours_between(Reservation.parking_timestamp, Reservation.leaving_timestamp)), 0)
+    ).join(ParkingSpot, Reservation.spot_id == ParkingSpot.id).filter(
+        Reservation.leaving_timestamp >= start,
+        Reservation.leaving_timestamp < end
+    ).group_by(ParkingSpot.lot_id, leaving_day).all():
+        row = rows[(lot_id, date.fromisoformat(day_key))]
+        row['revenue'] = float(revenue)
+        row['completed_reservations'] = completed
+        row['completed_hours'] = float(hours)
+
+    parking_day = time_bucket('day', Reservation.parking_timestamp)
+    for lot_id, day_key, started in db.session.query(
+        ParkingSpot.lot_id, parking_day, db.func.count(Reservation.id)
+    ).join(ParkingSpot, Reservation.spot_id == ParkingSpot.id).filter(
+        Reservation.parking_timestamp >= start,
+        Reservation.parking_timestamp < end
+    ).group_by(ParkingSpot.lot_id, parking_day).all():
+        rows[(lot_id, date.fromisoformat(day_key))]['reservations'] = started
+
+    # Occupancy: every stay overlapping the chunk, clipped to each day it covers.
+    # Stays still open are treated as occupying the spot until the end of the day.
+    events = defaultdict(list)
+    intervals = db.session.query(
+        ParkingSpot.lot_id, Reservation.parking_timestamp, Reservation.leaving_timestamp
+    ).join(ParkingSpot, Reservation.spot_id == ParkingSpot.id).filter(
+        Reservation.parking_timestamp < end,
+        db.or_(Reservation.leaving_timestamp.is_(None), Reservation.leaving_timestamp > start)
+    ).execution_options(yield_per=5000)
+
+    for lot_id, parked_at, left_at in intervals:
+        stay_start = max(parked_at, start)
+        stay_end = min(left_at or end, end)
+        day = stay_start.date()
+        while datetime.combine(day, time.min) < stay_end:
+            day_start = datetime.combine(day, time.min)
+            day_end = day_start + timedelta(days=1)
+            clipped_start, clipped_end = max(stay_start, day_start), min(stay_end, day_end)
+            if clipped_end > clipped_start:
+                rows[(lot_id, day)]['parked_hours'] += (clipped_end - clipped_start).total_seconds() / 3600
+                events[(lot_id, day)] += [(clipped_start, 1), (clipped_end, -1)]
+            day += timedelta(days=1)
+
+    for key, day_events in events.items():
+        rows[key]['peak_occupancy'] = _peak(day_events)
+
+    db.session.execute(db.delete(DailyLotStats).where(
+        DailyLotStats.day >= first_day,
+        DailyLotStats.day <= last_day
+    ))
+    if rows:
+        db.session.execute(db.insert(DailyLotStats), [
+            dict(values, lot_id=lot_id, day=day, parked_hours=round(values['parked_hours'], 4))
+            for (lot_id, day), values in rows.items()
+        ])
+    return len(rows)
+
+
+def rollup_days(first_day, last_day, chunk_days=7, progress=None):
+    """Idempotently rebuild daily_lot_stats for [first_day, last_day], one transaction per chunk"""
+    last_closed = datetime.utcnow().date() - timedelta(days=1)
+    last_day = min(last_day, last_closed)
+    written = 0
+    day = first_day
+    while day <= last_day:
+        chunk_end = min(day + timedelta(days=chunk_days - 1), last_day)
+        written += _rollup_chunk(day, chunk_end)
+        db.session.commit()
+        if progress:
+            progress(day, chunk_end, written)
+        day = chunk_end + timedelta(days=1)
+    return written
+
+
+def pending_days():
+    """First and last closed day the periodic job still has to roll up, or None"""
+    last_closed = datetime.utcnow().date() - timedelta(days=1)
+    last_rolled = db.session.query(db.func.max(DailyLotStats.day)).scalar()
+    if last_rolled is not None:
+        # Redo the last rolled-up day in case it was written while data was still arriving
+        first_day = last_rolled if isinstance(last_rolled, date) else date.fromisoformat(last_rolled)
+    else:
+        first_parked = db.session.query(db.func.min(Reservation.parking_timestamp)).scalar()
+        if first_parked is None:
+            return None
+        first_day = first_parked.date()
+    return (first_day, last_closed) if first_day <= last_closed else None
+
+
+def rollup_pending(chunk_days=7):
+    """Roll up every closed day not yet in daily_lot_stats"""
+    pending = pending_days()
+    if pending is None:
+        return {'first_day': None, 'last_day': None, 'rows': 0}
+    first_day, last_day = pending
+    rows = rollup_days(first_day, last_day, chunk_days=chunk_days)
+    return {'first_day': first_day.isoformat(), 'last_day': last_day.isoformat(), 'rows': rows}
+
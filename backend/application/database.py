@@ -1,6 +1,24 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask_migrate import Migrate, stamp, upgrade
 
 # Initialize extensions
 db = SQLAlchemy()
-migrate = Migrate()
\ No newline at end of file
+migrate = Migrate()
+
+# First revision, matching databases created by db.create_all() before migrations existed
+BASELINE_REVISION = '0001_baseline'
+
+
+def sync_schema():
+    """Bring the database schema to the latest migration (call inside an app context)"""
+    tables = set(db.inspect(db.engine).get_table_names())
+    if not tables:
+        # Fresh database: create it from the models and mark it current
+        db.create_all()
+        stamp(revision='head')
+    elif 'alembic_version' not in tables:
+        # Created by db.create_all() before migrations: adopt it at the baseline, then upgrade
+        stamp(revision=BASELINE_REVISION)
+        upgrade()
+    else:
+        upgrade()
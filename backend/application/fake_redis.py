@@ -0,0 +1,175 @@
+import fnmatch
+import queue
+import threading
+import time
+
+
+def _to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode('utf-8')
+
+
+class FakePubSub:
+    """Subscriber side of FakeRedis pub/sub, mirroring redis-py's PubSub"""
+
+    def __init__(self, server):
+        self._server = server
+        self._messages = queue.Queue()
+        self.channels = set()
+
+    def subscribe(self, *channels):
+        for channel in channels:
+            channel = _to_bytes(channel)
+            self.channels.add(channel)
+            self._server._subscribe(channel, self)
+            self._messages.put({'type': 'subscribe', 'channel': channel, 'data': len(self.channels)})
+
+    def unsubscribe(self, *channels):
+        for channel in channels or list(self.channels):
+            channel = _to_bytes(channel)
+            self.channels.discard(channel)
+            self._server._unsubscribe(channel, self)
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        deadline = time.monotonic() + (timeout or 0)
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    message = self._messages.get(timeout=remaining)
+                else:
+                    message = self._messages.get_nowait()
+            except queue.Empty:
+                return None
+            if ignore_subscribe_messages and message['type'] != 'message':
+                continue
+            return message
+
+    def close(self):
+        self.unsubscribe()
+
+    def _deliver(self, channel, data):
+        self._messages.put({'type': 'message', 'channel': channel, 'data': data})
+
+
+class FakeRedis:
+    """
+    In-process stand-in for the subset of redis-py used by the app.
+    Several clients can share one FakeRedis to simulate separate workers.
+    """
+
+    def __init__(self):
+        self._data = {}  # key -> (value, expires_at or None)
+        self._subscribers = {}
+        self._lock = threading.RLock()
+
+    def ping(self):
+        return True
+
+    def get(self, name):
+        with self._lock:
+            value = self._live(_to_bytes(name))
+            return value if isinstance(value, bytes) else None
+
+    def set(self, name, value, ex=None, nx=False):
+        name = _to_bytes(name)
+        with self._lock:
+            if nx and self._live(name) is not None:
+                return None
+            self._data[name] = (_to_bytes(value), time.monotonic() + ex if ex else None)
+            return True
+
+    def exists(self, *names):
+        with self._lock:
+            return sum(1 for name in names if self._live(_to_bytes(name)) is not None)
+
+    def delete(self, *names):
+        removed = 0
+        with self._lock:
+            for name in names:
+                name = _to_bytes(name)
+                if self._live(name) is not None:
+                    del self._data[name]
+                    removed += 1
+        return removed
+
+    def expire(self, name, seconds):
+        name = _to_bytes(name)
+        with self._lock:
+            value = self._live(name)
+            if value is None:
+                return False
+            self._data[name] = (value, time.monotonic() + seconds)
+            return True
+
+    def ttl(self, name):
+        name = _to_bytes(name)
+        with self._lock:
+            if self._live(name) is None:
+                return -2
+            expires_at = self._data[name][1]
+            return -1 if expires_at is None else max(int(expires_at - time.monotonic()), 0)
+
+    def sadd(self, name, *values):
+        name = _to_bytes(name)
+        with self._lock:
+            members = self._live(name)
+            if members is None:
+                members = set()
+                self._data[name] = (members, None)
+            before = len(members)
+            members.update(_to_bytes(value) for value in values)
+            return len(members) - before
+
+    def srem(self, name, *values):
+        with self._lock:
+            members = self._live(_to_bytes(name)) or set()
+            before = len(members)
+            members.difference_update(_to_bytes(value) for value in values)
+            return before - len(members)
+
+    def smembers(self, name):
+        with self._lock:
+            return set(self._live(_to_bytes(name)) or ())
+
+    def scan_iter(self, match=None, count=None):
+        pattern = match.decode() if isinstance(match, bytes) else match
+        with self._lock:
+            keys = [key for key in list(self._data) if self._live(key) is not None]
+        for key in keys:
+            if pattern is None or fnmatch.fnmatchcase(key.decode(), pattern):
+                yield key
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+
+    def publish(self, channel, message):
+        channel = _to_bytes(channel)
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber._deliver(channel, _to_bytes(message))
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+    def _live(self, name):
+        item = self._data.get(name)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[name]
+            return None
+        return value
+
+    def _subscribe(self, channel, subscriber):
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+
+    def _unsubscribe(self, channel, subscriber):
+        with self._lock:
+            self._subscribers.get(channel, set()).discard(subscriber)
@@ -0,0 +1,147 @@
+import math
+import threading
+from application.database import db
+
+EARTH_RADIUS_KM = 6371.0088
+CELL_DEGREES = 0.05  # ~5.5 km of latitude per grid cell
+MAX_RADIUS_KM = 50.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def parse_coordinates(latitude, longitude):
+    """Validated (latitude, longitude) floats; (None, None) clears a location"""
+    if latitude is None and longitude is None:
+        return None, None
+    if latitude is None or longitude is None:
+        raise ValueError('latitude and longitude must be given together')
+    latitude, longitude = float(latitude), float(longitude)
+    if not (-90.0 <= latitude <= 90.0) or not (-180.0 <= longitude <= 180.0):
+        raise ValueError('latitude must be within [-90, 90] and longitude within [-180, 180]')
+    return latitude, longitude
+
+
+class LotGrid:
+    """
+    Thread-safe uniform grid of lot coordinates.
+
+    A radius query only visits the cells overlapping the circle's bounding box,
+    so its cost depends on the lots nearby rather than on the total number of lots.
+    """
+
+    def __init__(self, cell_degrees=CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._cells = {}
+        self._lots = {}  # lot_id -> (latitude, longitude)
+        self._lock = threading.Lock()
+
+    def _cell(self, latitude, longitude):
+        return int(math.floor(latitude / self.cell_degrees)), int(math.floor(longitude / self.cell_degrees))
+
+    def load(self):
+        """Index every lot that has coordinates"""
+        from application.models import ParkingLot
+
+        rows = db.session.query(ParkingLot.id, ParkingLot.latitude, ParkingLot.longitude).filter(
+            ParkingLot.latitude.isnot(None),
+            ParkingLot.longitude.isnot(None)
+        ).all()
+
+        cells, lots = {}, {}
+        for lot_id, latitude, longitude in rows:
+            lots[lot_id] = (latitude, longitude)
+            cells.setdefault(self._cell(latitude, longitude), set()).add(lot_id)
+
+        with self._lock:
+            self._cells, self._lots = cells, lots
+
+    def update_lot(self, lot_id, latitude, longitude):
+        """Move a lot to new coordinates, or drop it when they are None"""
+        with self._lock:
+            self._remove(lot_id)
+            if latitude is not None and longitude is not None:
+                self._lots[lot_id] = (latitude, longitude)
+                self._cells.setdefault(self._cell(latitude, longitude), set()).add(lot_id)
+
+    def drop_lot(self, lot_id):
+        with self._lock:
+            self._remove(lot_id)
+
+    def within(self, latitude, longitude, radius_km):
+        """(distance_km, lot_id) for every indexed lot within radius_km, nearest first"""
+        lat_span = math.degrees(radius_km / EARTH_RADIUS_KM)
+        cos_lat = math.cos(math.radians(min(abs(latitude) + lat_span, 89.9)))
+        lon_span = min(180.0, lat_span / max(cos_lat, 1e-6))
+
+        min_row, min_col = self._cell(max(latitude - lat_span, -90.0), longitude - lon_span)
+        max_row, max_col = self._cell(min(latitude + lat_span, 90.0), longitude + lon_span)
+        columns_per_world = int(round(360.0 / self.cell_degrees))
+
+        matches = []
+        with self._lock:
+            if (max_row - min_row + 1) * (max_col - min_col + 1) > len(self._cells):
+                # Huge radius relative to the data: scanning occupied cells is cheaper
+                candidates = self._lots.items()
+            else:
+                candidates = []
+                for row in range(min_row, max_row + 1):
+                    for col in range(min_col, max_col + 1):
+                        # Wrap columns across the antimeridian
+                        wrapped = (col + columns_per_world // 2) % columns_per_world - columns_per_world // 2
+                        for lot_id in self._cells.get((row, wrapped), ()):
+                            candidates.append((lot_id, self._lots[lot_id]))
+            for lot_id, (lot_latitude, lot_longitude) in candidates:
+                distance = haversine_km(latitude, longitude, lot_latitude, lot_longitude)
+                if distance <= radius_km:
+                    matches.append((distance, lot_id))
+
+        matches.sort()
+        return matches
+
+    def __len__(self):
+        return len(self._lots)
+
+    def _remove(self, lot_id):
+        position = self._lots.pop(lot_id, None)
+        if position is not None:
+            cell = self._cells.get(self._cell(*position))
+            if cell is not None:
+                cell.discard(lot_id)
+                if not cell:
+                    del self._cells[self._cell(*position)]
+
+
+lot_grid = LotGrid()
+
+
+def nearby_lots(latitude, longitude, radius_km, min_available=1, limit=20):
+    """
+    Active lots within radius_km having at least min_available free spots, nearest first.
+    The grid narrows the candidates; their live counters are then read in one primary-key query.
+    """
+    from application.models import ParkingLot
+
+    matches = lot_grid.within(latitude, longitude, radius_km)
+    results = []
+    # Fetch candidates nearest-first in batches so a dense area does not load every lot in range
+    batch_size = max(limit * 4, 50)
+    for offset in range(0, len(matches), batch_size):
+        batch = matches[offset:offset + batch_size]
+        lots = {lot.id: lot for lot in ParkingLot.query.filter(
+            ParkingLot.id.in_([lot_id for _, lot_id in batch]),
+            ParkingLot.is_active.is_(True),
+            ParkingLot.available_spots >= min_available
+        ).all()}
+        for distance, lot_id in batch:
+            if lot_id in lots:
+                results.append((lots[lot_id], distance))
+                if len(results) >= limit:
+                    return results
+    return results
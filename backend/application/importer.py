@@ -0,0 +1,320 @@
+import csv
+import io
+import json
+import math
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime
+from application.database import db
+from application.models import ImportJob, ParkingLot
+from application.cache_services import invalidate_related_caches
+from application.geo import lot_grid, parse_coordinates
+from application.suggest import suggest_index
+from application.index_sync import publish_lot_changes
+from application import provisioning
+
+FORMATS = ('csv', 'ndjson')
+REQUIRED_FIELDS = ('prime_location_name', 'address', 'pin_code', 'price_per_hour', 'number_of_spots')
+CHUNK_SIZE = 500  # rows per transaction
+MAX_SPOTS_PER_LOT = 10_000
+MAX_REPORTED_ERRORS = 1000  # per import; error_count keeps counting past it
+
+_EXTENSIONS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+_MIMETYPES = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+
+
+class ImportFileError(Exception):
+    """Raised when an upload cannot be read as a lot import at all"""
+
+
+def detect_format(filename=None, mimetype=None, requested=None):
+    """'csv' or 'ndjson' from an explicit format, the file extension or the content type"""
+    if requested:
+        if requested.lower() not in FORMATS:
+            raise ImportFileError(f'Unsupported format: {requested} (use csv or ndjson)')
+        return requested.lower()
+    if filename:
+        fmt = _EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+        if fmt:
+            return fmt
+    if mimetype in _MIMETYPES:
+        return _MIMETYPES[mimetype]
+    raise ImportFileError('Could not tell the file format; pass format=csv or format=ndjson')
+
+
+def iter_records(stream, fmt):
+    """
+    (line number, record, error) for each row of a binary stream, decoded and
+    parsed incrementally so the whole file is never held in memory.
+    """
+    if not hasattr(stream, 'read1'):
+        stream = io.BufferedReader(stream)
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if fmt == 'csv':
+            yield from _csv_records(text)
+        else:
+            yield from _ndjson_records(text)
+    except UnicodeDecodeError:
+        raise ImportFileError('File is not valid UTF-8 text')
+    finally:
+        text.detach()  # leave the caller's stream open
+
+
+def _csv_records(text):
+    reader = csv.DictReader(text)
+    try:
+        missing = [field for field in REQUIRED_FIELDS if field not in (reader.fieldnames or ())]
+        if missing:
+            raise ImportFileError(f'CSV header is missing: {", ".join(missing)}')
+        for record in reader:
+            if None in record:
+                yield reader.line_num, None, 'Row has more values than the header'
+            else:
+                yield reader.line_num, record, None
+    except csv.Error as e:
+        raise ImportFileError(f'Malformed CSV near line {reader.line_num}: {e}')
+
+
+def _ndjson_records(text):
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f'Invalid JSON: {e}'
+            continue
+        if isinstance(record, dict):
+            yield line_number, record, None
+        else:
+            yield line_number, None, 'Each line must be a JSON object'
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _text(record, field, max_length=None):
+    value = record.get(field)
+    if _blank(value):
+        raise ValueError(f'{field} is required')
+    value = str(value).strip()
+    if max_length is not None and len(value) > max_length:
+        raise ValueError(f'{field} must be at most {max_length} characters')
+    return value
+
+
+def validate_row(record):
+    """Column values for one lot record; raises ValueError describing the first problem"""
+    row = {
+        'prime_location_name': _text(record, 'prime_location_name', 100),
+        'address': _text(record, 'address'),
+        'pin_code': _text(record, 'pin_code', 10),
+    }
+
+    price = record.get('price_per_hour')
+    if _blank(price) or isinstance(price, bool):
+        raise ValueError('price_per_hour is required')
+    try:
+        price = float(price)
+    except (TypeError, ValueError):
+        raise ValueError('price_per_hour must be a number')
+    if not math.isfinite(price) or price <= 0:
+        raise ValueError('price_per_hour must be greater than 0')
+
+    spots = record.get('number_of_spots')
+    if _blank(spots) or isinstance(spots, bool):
+        raise ValueError('number_of_spots is required')
+    if isinstance(spots, float) and spots.is_integer():
+        spots = int(spots)
+    if isinstance(spots, float):
+        raise ValueError('number_of_spots must be a whole number')
+    try:
+        spots = int(spots)
+    except (TypeError, ValueError):
+        raise ValueError('number_of_spots must be a whole number')
+    if not 1 <= spots <= MAX_SPOTS_PER_LOT:
+        raise ValueError(f'number_of_spots must be between 1 and {MAX_SPOTS_PER_LOT}')
+
+    latitude, longitude = record.get('latitude'), record.get('longitude')
+    try:
+        latitude, longitude = parse_coordinates(
+            None if _blank(latitude) else latitude, None if _blank(longitude) else longitude
+        )
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'Invalid coordinates: {e}')
+
+    row.update(
+        price_per_hour=price,
+        number_of_spots=spots,
+        available_spots=spots,
+        occupied_spots=0,
+        latitude=latitude,
+        longitude=longitude
+    )
+    return row
+
+
+def _insert_lots(rows):
+    """Insert lots with one multi-row INSERT ... RETURNING, then all of their spots; returns the new ids in row order"""
+    lot_ids = db.session.scalars(
+        db.insert(ParkingLot).returning(ParkingLot.id, sort_by_parameter_order=True), rows
+    ).all()
+    provisioning.add_spots_to_new_lots([(lot_id, row['number_of_spots']) for lot_id, row in zip(lot_ids, rows)])
+    return lot_ids
+
+
+def _index_lots(lot_ids, rows):
+    """
+    Register committed lots with this process's suggest index and spatial grid,
+    and have the other processes (web workers, when this is a Celery worker)
+    index them too. The allocator is left alone: claim_spot loads a lot it has
+    not seen on its first booking.
+    """
+    for lot_id, row in zip(lot_ids, rows):
+        suggest_index.update_lot(lot_id, row['prime_location_name'], row['address'], row['pin_code'])
+        lot_grid.update_lot(lot_id, row['latitude'], row['longitude'])
+    publish_lot_changes(lot_ids)
+    invalidate_related_caches('parking_lot')
+
+
+def import_lots(stream, fmt, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Stream lot records from a CSV or NDJSON upload and insert the valid ones,
+    committing every chunk_size rows. Invalid rows are skipped and reported.
+    progress(report) runs inside each chunk's transaction just before it
+    commits, so saved progress always matches the committed lots.
+    """
+    report = {'rows_processed': 0, 'lots_imported': 0, 'spots_created': 0, 'error_count': 0, 'errors': []}
+    batch = []
+    pending_rows = 0
+
+    def commit_chunk():
+        lot_ids = _insert_lots(batch) if batch else []
+        report['lots_imported'] += len(lot_ids)
+        report['spots_created'] += sum(row['number_of_spots'] for row in batch)
+        if progress is not None:
+            progress(report)
+        db.session.commit()
+        if lot_ids:
+            _index_lots(lot_ids, batch)
+
+    try:
+        for line_number, record, error in iter_records(stream, fmt):
+            report['rows_processed'] += 1
+            pending_rows += 1
+            if error is None:
+                try:
+                    batch.append(validate_row(record))
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                report['error_count'] += 1
+                if len(report['errors']) < MAX_REPORTED_ERRORS:
+                    report['errors'].append({'line': line_number, 'message': error})
+
+            if pending_rows >= chunk_size:
+                commit_chunk()
+                batch, pending_rows = [], 0
+        if pending_rows:
+            commit_chunk()
+    except Exception:
+        db.session.rollback()
+        raise
+    return report
+
+
+def create_job(fmt, filename=None, user_id=None):
+    """Record a pending import so its progress can be polled"""
+    job = ImportJob(id=uuid.uuid4().hex, status='pending', format=fmt, filename=filename, created_by=user_id)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def _apply_report(job, report):
+    job.rows_processed = report['rows_processed']
+    job.lots_imported = report['lots_imported']
+    job.spots_created = report['spots_created']
+    job.error_count = report['error_count']
+    job.errors = json.dumps(report['errors'])
+
+
+def run_job(job_id, stream, on_progress=None):
+    """
+    Run the import for a pending job, saving its progress with every chunk.
+    Lots committed before a fatal error stay imported; the job records where it stopped.
+    """
+    job = db.session.get(ImportJob, job_id)
+    job.status = 'running'
+    db.session.commit()
+
+    def progress(report):
+        _apply_report(job, report)
+        if on_progress is not None:
+            on_progress(report)
+
+    try:
+        report = import_lots(stream, job.format, progress=progress)
+        _apply_report(job, report)
+        job.status = 'completed'
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(ImportJob, job_id)
+        job.status = 'failed'
+        job.message = str(e)
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def spool_upload(stream, job_id, directory):
+    """Copy an upload to directory in fixed-size blocks so a background task can read it later"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{job_id}.upload')
+    try:
+        with open(path, 'wb') as spooled:
+            shutil.copyfileobj(stream, spooled, 64 * 1024)
+    except Exception:
+        remove_spooled(path)
+        raise
+    return path
+
+
+def remove_spooled(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def run_spooled_job(job_id, path, on_progress=None):
+    """run_job over a spooled upload, which is deleted afterwards whether or not the import succeeded"""
+    try:
+        with open(path, 'rb') as upload:
+            return run_job(job_id, upload, on_progress=on_progress)
+    finally:
+        remove_spooled(path)
+
+
+def start_local_job(app, job_id, path):
+    """Run a spooled import on a thread of this process, for deployments without a Celery broker"""
+    def work():
+        with app.app_context():
+            try:
+                run_spooled_job(job_id, path)
+            except Exception as e:
+                print(f"Lot import {job_id} failed: {str(e)}")
+            finally:
+                db.session.remove()
+
+    thread = threading.Thread(target=work, name=f'lot-import-{job_id}', daemon=True)
+    thread.start()
+    return thread
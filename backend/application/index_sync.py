@@ -0,0 +1,89 @@
+import threading
+from application.cache import app_cache
+from application.database import db
+from application.schedule import booking_schedule
+from application.suggest import suggest_index
+from application.geo import lot_grid
+
+# The in-memory indexes (booking schedule, lot suggestions, spatial grid) are
+# per process and updated in place by the process that made a write. The others
+# hear about it through events on the cache's pub/sub channel, and reload in
+# full after missing events or every few seconds/minutes as a fallback for lost
+# messages.
+
+
+def publish_booking_changes(lot_id):
+    """Have every other process re-read the upcoming bookings of a lot"""
+    app_cache.publish_event('bookings_changed', lot_id=lot_id)
+
+
+def publish_lot_changes(lot_ids):
+    """Have every other process re-index lots that were created, edited or deleted"""
+    app_cache.publish_event('lots_changed', lot_ids=list(lot_ids))
+
+
+def apply_lot_changes(lot_ids):
+    """Re-index lots from the database, dropping those that no longer exist"""
+    from application.models import ParkingLot
+
+    rows = {
+        row.id: row for row in db.session.query(
+            ParkingLot.id, ParkingLot.prime_location_name, ParkingLot.address, ParkingLot.pin_code,
+            ParkingLot.latitude, ParkingLot.longitude
+        ).filter(ParkingLot.id.in_(lot_ids))
+    }
+    for lot_id in lot_ids:
+        row = rows.get(lot_id)
+        if row is None:
+            suggest_index.drop_lot(lot_id)
+            lot_grid.drop_lot(lot_id)
+        else:
+            suggest_index.update_lot(lot_id, row.prime_location_name, row.address, row.pin_code)
+            lot_grid.update_lot(lot_id, row.latitude, row.longitude)
+
+
+def load_lot_indexes():
+    """Rebuild the suggest index and the spatial grid from every lot"""
+    suggest_index.load()
+    lot_grid.load()
+
+
+def _in_app(app, function):
+    """Run function(**data) with an app context, as event handlers and reloaders run on their own threads"""
+    def run(**data):
+        with app.app_context():
+            try:
+                function(**data)
+            finally:
+                db.session.remove()
+    return run
+
+
+def _start_reloader(name, interval, reload):
+    """Call reload every interval seconds on a daemon thread; interval 0 disables it"""
+    if not interval:
+        return None
+
+    def loop():
+        stop = threading.Event()
+        while not stop.wait(interval):
+            try:
+                reload()
+            except Exception as e:
+                print(f"Periodic reload of the {name} failed: {str(e)}")
+
+    thread = threading.Thread(target=loop, name=f'{name.replace(" ", "-")}-reloader', daemon=True)
+    thread.start()
+    return thread
+
+
+def init_index_sync(app):
+    """Keep this process's indexes in step with writes made by other workers; call after loading them"""
+    app_cache.subscribe('bookings_changed', _in_app(app, lambda lot_id: booking_schedule.reload_lot(lot_id)))
+    app_cache.subscribe('lots_changed', _in_app(app, apply_lot_changes))
+    app_cache.subscribe('resync', _in_app(app, booking_schedule.load))
+    app_cache.subscribe('resync', _in_app(app, load_lot_indexes))
+    _start_reloader('booking schedule', app.config.get('BOOKING_SCHEDULE_RELOAD_SECONDS'),
+                    _in_app(app, booking_schedule.load))
+    _start_reloader('lot indexes', app.config.get('LOT_INDEX_RELOAD_SECONDS'),
+                    _in_app(app, load_lot_indexes))
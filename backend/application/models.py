@@ -1,7 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import json
 from application.database import db
+from application.passwords import password_hasher
 
 class User(db.Model):
     """User model for both admin and regular users"""
@@ -30,10 +31,10 @@ class User(db.Model):
     
     @password.setter
     def password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def verify_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
     
     def is_admin(self):
         return self.role == 'admin'
@@ -60,7 +61,17 @@ class ParkingLot(db.Model):
     address = db.Column(db.Text, nullable=False)
     pin_code = db.Column(db.String(10), nullable=False)
     price_per_hour = db.Column(db.Float, nullable=False)
+    # Tariff rules on top of price_per_hour (application.billing); unset means plain hourly pricing
+    first_hour_rate = db.Column(db.Float, nullable=True)
+    night_rate = db.Column(db.Float, nullable=True)
+    daily_cap = db.Column(db.Float, nullable=True)
     number_of_spots = db.Column(db.Integer, nullable=False)
+    # Denormalized spot counters, kept in step with parking_spots.status
+    available_spots = db.Column(db.Integer, nullable=False, default=0)
+    occupied_spots = db.Column(db.Integer, nullable=False, default=0)
+    # Optional WGS84 coordinates used by the nearby-lots search
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
@@ -68,6 +79,16 @@ class ParkingLot(db.Model):
     # Relationships
     parking_spots = db.relationship('ParkingSpot', backref='parking_lot', lazy='dynamic', cascade='all, delete-orphan')
     
+    @staticmethod
+    def adjust_spot_counters(lot_id, available=0, occupied=0):
+        """Shift the spot counters of a lot inside the current transaction"""
+        db.session.execute(
+            db.update(ParkingLot).where(ParkingLot.id == lot_id).values(
+                available_spots=ParkingLot.available_spots + available,
+                occupied_spots=ParkingLot.occupied_spots + occupied
+            ).execution_options(synchronize_session=False)
+        )
+    
     def get_available_spots_count(self):
         """Get count of available parking spots"""
         return self.parking_spots.filter_by(status='A').count()
@@ -83,9 +104,14 @@ class ParkingLot(db.Model):
             'address': self.address,
             'pin_code': self.pin_code,
             'price_per_hour': self.price_per_hour,
+            'first_hour_rate': self.first_hour_rate,
+            'night_rate': self.night_rate,
+            'daily_cap': self.daily_cap,
             'number_of_spots': self.number_of_spots,
-            'available_spots': self.get_available_spots_count(),
-            'occupied_spots': self.get_occupied_spots_count(),
+            'available_spots': self.available_spots,
+            'occupied_spots': self.occupied_spots,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
             'created_at': self.created_at.isoformat(),
             'is_active': self.is_active
         }
@@ -96,6 +122,10 @@ class ParkingLot(db.Model):
 class ParkingSpot(db.Model):
     """Parking spot model"""
     __tablename__ = 'parking_spots'
+    __table_args__ = (
+        # Free-spot lookups and per-lot status counts
+        db.Index('ix_parking_spots_lot_id_status', 'lot_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     spot_number = db.Column(db.String(10), nullable=False)  # A1, A2, B1, etc.
@@ -129,6 +159,16 @@ class ParkingSpot(db.Model):
 class Reservation(db.Model):
     """Reservation model for parking spots"""
     __tablename__ = 'reservations'
+    __table_args__ = (
+        # A user's reservations / active reservations
+        db.Index('ix_reservations_user_id_leaving_timestamp', 'user_id', 'leaving_timestamp'),
+        # The active reservation on a spot
+        db.Index('ix_reservations_spot_id_leaving_timestamp', 'spot_id', 'leaving_timestamp'),
+        # Revenue and duration ranges by release time
+        db.Index('ix_reservations_leaving_timestamp', 'leaving_timestamp'),
+        # Ranges by parking time (trends, daily rollups, admin listing filters)
+        db.Index('ix_reservations_parking_timestamp', 'parking_timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     parking_timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -137,18 +177,27 @@ class Reservation(db.Model):
     vehicle_number = db.Column(db.String(20))
     remarks = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # The lot's tariff when the spot was booked (application.billing.tariff_snapshot)
+    hourly_rate = db.Column(db.Float, nullable=True)
+    first_hour_rate = db.Column(db.Float, nullable=True)
+    night_rate = db.Column(db.Float, nullable=True)
+    daily_cap = db.Column(db.Float, nullable=True)
     
     # Foreign Keys
     spot_id = db.Column(db.Integer, db.ForeignKey('parking_spots.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
     def calculate_cost(self):
-        """Calculate parking cost based on duration"""
+        """Calculate parking cost from the booked tariff; the reference bill benchmarks/bench_billing.py checks billing.py against"""
         if self.leaving_timestamp:
-            duration_hours = (self.leaving_timestamp - self.parking_timestamp).total_seconds() / 3600
-            # Round up to next hour
-            duration_hours = max(1, int(duration_hours) + (1 if duration_hours % 1 > 0 else 0))
-            self.parking_cost = duration_hours * self.parking_spot.parking_lot.price_per_hour
+            from application.billing import bill
+            if self.hourly_rate is not None:
+                tariff = (self.hourly_rate, self.first_hour_rate, self.night_rate, self.daily_cap)
+            else:
+                # Booked before tariff snapshots: the lot's current tariff
+                lot = self.parking_spot.parking_lot
+                tariff = (lot.price_per_hour, lot.first_hour_rate, lot.night_rate, lot.daily_cap)
+            self.parking_cost = bill(self.parking_timestamp, self.leaving_timestamp, *tariff)
         return self.parking_cost
     
     def get_duration(self):
@@ -170,6 +219,10 @@ class Reservation(db.Model):
             'parking_timestamp': self.parking_timestamp.isoformat(),
             'leaving_timestamp': self.leaving_timestamp.isoformat() if self.leaving_timestamp else None,
             'parking_cost': self.parking_cost,
+            'hourly_rate': self.hourly_rate,
+            'first_hour_rate': self.first_hour_rate,
+            'night_rate': self.night_rate,
+            'daily_cap': self.daily_cap,
             'vehicle_number': self.vehicle_number,
             'remarks': self.remarks,
             'duration_hours': round(self.get_duration(), 2),
@@ -178,4 +231,126 @@ class Reservation(db.Model):
         }
     
     def __repr__(self):
-        return f'<Reservation {self.id} - User {self.user_id} - Spot {self.spot_id}>'
\ No newline at end of file
+        return f'<Reservation {self.id} - User {self.user_id} - Spot {self.spot_id}>'
+
+class UserStats(db.Model):
+    """Per-user rollup of reservation totals, maintained on book and release"""
+    __tablename__ = 'user_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_reservations = db.Column(db.Integer, nullable=False, default=0)
+    active_reservations = db.Column(db.Integer, nullable=False, default=0)
+    completed_reservations = db.Column(db.Integer, nullable=False, default=0)
+    total_spent = db.Column(db.Float, nullable=False, default=0.0)
+    total_hours = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f'<UserStats {self.user_id}>'
+
+class UserMonthlyStats(db.Model):
+    """Per-user, per-month, per-lot rollup of completed reservations (by leaving month)"""
+    __tablename__ = 'user_monthly_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)  # first day of the month
+    lot_id = db.Column(db.Integer, primary_key=True)
+    reservations = db.Column(db.Integer, nullable=False, default=0)
+    hours = db.Column(db.Float, nullable=False, default=0.0)
+    spent = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f'<UserMonthlyStats {self.user_id} {self.month} lot {self.lot_id}>'
+
+class DailyLotStats(db.Model):
+    """Per-lot, per-day fact row filled by the daily stats rollup job"""
+    __tablename__ = 'daily_lot_stats'
+    
+    lot_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)  # costs of reservations that ended this day
+    reservations = db.Column(db.Integer, nullable=False, default=0)  # reservations that started this day
+    completed_reservations = db.Column(db.Integer, nullable=False, default=0)  # reservations that ended this day
+    completed_hours = db.Column(db.Float, nullable=False, default=0.0)  # full duration of those reservations
+    parked_hours = db.Column(db.Float, nullable=False, default=0.0)  # spot-hours occupied within this day
+    peak_occupancy = db.Column(db.Integer, nullable=False, default=0)  # most spots occupied at once
+    
+    def __repr__(self):
+        return f'<DailyLotStats lot {self.lot_id} {self.day}>'
+
+class ImportJob(db.Model):
+    """Progress and per-row errors of one bulk parking lot import"""
+    __tablename__ = 'import_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, completed, failed
+    format = db.Column(db.String(10), nullable=False)  # 'csv' or 'ndjson'
+    filename = db.Column(db.String(255), nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    lots_imported = db.Column(db.Integer, nullable=False, default=0)
+    spots_created = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Text, nullable=True)  # JSON list of {line, message}, capped
+    message = db.Column(db.Text, nullable=True)  # why a failed import stopped
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'format': self.format,
+            'filename': self.filename,
+            'rows_processed': self.rows_processed,
+            'lots_imported': self.lots_imported,
+            'spots_created': self.spots_created,
+            'error_count': self.error_count,
+            'errors': json.loads(self.errors) if self.errors else [],
+            'message': self.message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def __repr__(self):
+        return f'<ImportJob {self.id} {self.status}>'
+
+class AdvanceBooking(db.Model):
+    """A spot booked ahead of time for the window [start_time, end_time)"""
+    __tablename__ = 'advance_bookings'
+    __table_args__ = (
+        # Overlap checks on a spot and a user's upcoming bookings
+        db.Index('ix_advance_bookings_spot_id_start_time', 'spot_id', 'start_time'),
+        db.Index('ix_advance_bookings_user_id_start_time', 'user_id', 'start_time'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='booked')  # booked, checked_in, cancelled
+    vehicle_number = db.Column(db.String(20))
+    remarks = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Foreign Keys
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    lot_id = db.Column(db.Integer, db.ForeignKey('parking_lots.id'), nullable=False)
+    spot_id = db.Column(db.Integer, db.ForeignKey('parking_spots.id'), nullable=False)
+    reservation_id = db.Column(db.Integer, db.ForeignKey('reservations.id'), nullable=True)  # set on check-in
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'lot_id': self.lot_id,
+            'spot_id': self.spot_id,
+            'start_time': self.start_time.isoformat(),
+            'end_time': self.end_time.isoformat(),
+            'status': self.status,
+            'vehicle_number': self.vehicle_number,
+            'remarks': self.remarks,
+            'reservation_id': self.reservation_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
+    def __repr__(self):
+        return f'<AdvanceBooking {self.id} - Spot {self.spot_id} {self.start_time} - {self.end_time}>'
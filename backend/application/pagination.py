@@ -0,0 +1,39 @@
+from flask import request
+
+
+class PaginationError(ValueError):
+    """Raised for malformed cursor pagination arguments"""
+
+
+def int_arg(name, args=None):
+    """An optional integer query argument; None when absent, PaginationError when not an integer"""
+    value = (request.args if args is None else args).get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise PaginationError(f'{name} must be an integer')
+
+
+def parse_cursor_args(default_limit=50, max_limit=200):
+    """Read ?after=<id>&limit=<n> from the query string"""
+    after = int_arg('after')
+    try:
+        limit = int(request.args.get('limit', default_limit))
+    except (TypeError, ValueError):
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be positive')
+    return after, min(limit, max_limit)
+
+
+def cursor_page(rows, limit, cursor_of):
+    """Trim a limit + 1 result set to one page and describe the next cursor"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, {
+        'limit': limit,
+        'has_more': has_more,
+        'next_cursor': cursor_of(rows[-1]) if has_more and rows else None
+    }
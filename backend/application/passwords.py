@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_HASH_METHOD = 'scrypt'  # Werkzeug's default: scrypt:32768:8:1
+DEFAULT_MAX_QUEUE = 64
+DEFAULT_TIMEOUT = 10  # seconds a login waits for its hash before giving up
+
+
+class PasswordQueueFull(RuntimeError):
+    """Raised when too many password hashes are running or waiting already"""
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on a small pool of threads instead of the request
+    threads that ask for it. At most max_workers hashes run at once, so a burst
+    of logins can use at most that many cores (hashlib releases the GIL while
+    hashing) and the other endpoints keep theirs; up to max_queue more wait
+    their turn, and beyond that callers get PasswordQueueFull straight away.
+
+    Hashes made with other parameters than the configured method are reported
+    by needs_rehash so callers can upgrade them after a successful login.
+    """
+
+    def __init__(self, method=DEFAULT_HASH_METHOD, max_workers=None, max_queue=DEFAULT_MAX_QUEUE,
+                 timeout=DEFAULT_TIMEOUT):
+        self._lock = threading.Lock()
+        self._executor = None
+        self.configure(method, max_workers, max_queue, timeout)
+        self._reset_stats()
+
+    def configure(self, method=None, max_workers=None, max_queue=None, timeout=None):
+        """Change the hash method and pool limits; unset arguments keep their value"""
+        with self._lock:
+            if method is not None:
+                self.method = method
+                self._prefix = None
+                self._dummy_hash = None
+            if max_workers is not None or self._executor is None:
+                self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='password-hash')
+            if max_queue is not None:
+                self.max_queue = max_queue
+            if timeout is not None:
+                self.timeout = timeout
+
+    def verify(self, password_hash, password):
+        """Whether password matches password_hash"""
+        return self._run(check_password_hash, password_hash, password)
+
+    def verify_unknown(self, password):
+        """
+        Spend as long as verify would for a user that does not exist, so response
+        times do not tell which usernames are registered. Always False.
+        """
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash('not a password')
+        self._run(check_password_hash, self._dummy_hash, password)
+        return False
+
+    def hash(self, password):
+        """A new hash of password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def needs_rehash(self, password_hash):
+        """Whether password_hash was made with other parameters than the configured method"""
+        return password_hash.split('$', 1)[0] != self.prefix
+
+    @property
+    def prefix(self):
+        """Method and parameters as stored in front of the salt, e.g. scrypt:32768:8:1"""
+        if self._prefix is None:
+            # 'scrypt' or 'pbkdf2' alone stand for Werkzeug's current default parameters
+            self._prefix = generate_password_hash('', method=self.method).split('$', 1)[0]
+        return self._prefix
+
+    def get_stats(self):
+        prefix = self.prefix
+        with self._lock:
+            completed = self._completed
+            return {
+                'method': prefix,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'running': self._running,
+                'queued': self._pending - self._running,
+                'peak_queued': self._peak_queued,
+                'submitted': self._submitted,
+                'completed': completed,
+                'rejected': self._rejected,
+                'timed_out': self._timed_out,
+                'avg_wait_ms': round(self._wait_seconds / completed * 1000, 2) if completed else 0.0,
+                'max_wait_ms': round(self._max_wait_seconds * 1000, 2),
+                'avg_hash_ms': round(self._hash_seconds / completed * 1000, 2) if completed else 0.0
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._reset_stats()
+
+    def _reset_stats(self):
+        # pending and running are live gauges and survive a reset
+        self._pending = getattr(self, '_pending', 0)
+        self._running = getattr(self, '_running', 0)
+        self._peak_queued = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._hash_seconds = 0.0
+
+    def _run(self, function, *args):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise PasswordQueueFull('Too many sign-ins in progress, please try again shortly')
+            self._pending += 1
+            self._submitted += 1
+            self._peak_queued = max(self._peak_queued, self._pending - self.max_workers)
+            executor = self._executor
+
+        submitted_at = time.perf_counter()
+
+        def task():
+            started_at = time.perf_counter()
+            with self._lock:
+                self._running += 1
+            try:
+                return function(*args)
+            finally:
+                finished_at = time.perf_counter()
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self._completed += 1
+                    self._wait_seconds += started_at - submitted_at
+                    self._max_wait_seconds = max(self._max_wait_seconds, started_at - submitted_at)
+                    self._hash_seconds += finished_at - started_at
+
+        try:
+            future = executor.submit(task)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # The hash still runs to completion and is counted then; this caller stops waiting
+            with self._lock:
+                self._timed_out += 1
+            raise PasswordQueueFull('Sign-in is taking too long, please try again shortly')
+
+
+password_hasher = PasswordHasher()
+
+
+def init_password_hasher(app):
+    """Apply PASSWORD_HASH_METHOD and the PASSWORD_VERIFY_* pool limits from the app config"""
+    password_hasher.configure(
+        method=app.config.get('PASSWORD_HASH_METHOD'),
+        max_workers=app.config.get('PASSWORD_VERIFY_WORKERS'),
+        max_queue=app.config.get('PASSWORD_VERIFY_QUEUE'),
+        timeout=app.config.get('PASSWORD_VERIFY_TIMEOUT')
+    )
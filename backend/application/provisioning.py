@@ -0,0 +1,91 @@
+from datetime import datetime
+from itertools import chain, islice
+from application.database import db
+from application.models import AdvanceBooking, ParkingLot, ParkingSpot
+from application.schedule import ACTIVE_STATUSES
+
+INSERT_CHUNK_SIZE = 5000  # rows per executemany batch
+DELETE_CHUNK_SIZE = 500  # ids per IN (...) list, well under SQLite's bound-parameter limit
+
+
+class SpotRemovalError(Exception):
+    """Raised when a lot does not have enough free spots to shrink"""
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _spot_rows(lot_id, first_number, count, created_at):
+    for number in range(first_number, first_number + count):
+        yield {'spot_number': f'A{number}', 'status': 'A', 'lot_id': lot_id, 'created_at': created_at}
+
+
+def _insert_spot_rows(rows):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, INSERT_CHUNK_SIZE))
+        if not batch:
+            return
+        db.session.execute(ParkingSpot.__table__.insert(), batch)
+
+
+def add_spots(lot_id, first_number, count):
+    """Insert spots A<first_number> .. A<first_number + count - 1> as free, in chunked executemany batches"""
+    _insert_spot_rows(_spot_rows(lot_id, first_number, count, datetime.utcnow()))
+    return count
+
+
+def add_spots_to_new_lots(lot_counts):
+    """Insert spots A1 .. An for every (lot_id, n), batching across lots so small lots share statements"""
+    now = datetime.utcnow()
+    _insert_spot_rows(chain.from_iterable(_spot_rows(lot_id, 1, count, now) for lot_id, count in lot_counts))
+    return sum(count for _, count in lot_counts)
+
+
+def remove_free_spots(lot_id, count):
+    """
+    Delete count free spots of a lot, newest first, with set-based DELETEs.
+    Spots holding an upcoming advance booking are kept. Raises SpotRemovalError
+    when fewer than count spots qualify (including spots booked while this
+    runs); the caller rolls back.
+    """
+    booked = db.select(AdvanceBooking.spot_id).where(
+        AdvanceBooking.lot_id == lot_id,
+        AdvanceBooking.status.in_(ACTIVE_STATUSES),
+        AdvanceBooking.end_time > datetime.utcnow()
+    )
+    spot_ids = [row[0] for row in db.session.query(ParkingSpot.id).filter(
+        ParkingSpot.lot_id == lot_id,
+        ParkingSpot.status == 'A',
+        ParkingSpot.id.notin_(booked)
+    ).order_by(ParkingSpot.id.desc()).limit(count).all()]
+    if len(spot_ids) < count:
+        raise SpotRemovalError('Cannot remove occupied or booked spots')
+
+    removed = 0
+    for chunk in _chunks(spot_ids, DELETE_CHUNK_SIZE):
+        # Re-check the status so a spot booked since the SELECT is never deleted
+        removed += db.session.execute(
+            db.delete(ParkingSpot).where(
+                ParkingSpot.id.in_(chunk),
+                ParkingSpot.status == 'A'
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+    if removed < count:
+        raise SpotRemovalError('Cannot remove occupied or booked spots')
+    return removed
+
+
+def delete_lot(lot_id):
+    """Delete a lot with its spots and advance bookings in set-based statements instead of loading every row"""
+    db.session.execute(
+        db.delete(AdvanceBooking).where(AdvanceBooking.lot_id == lot_id).execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        db.delete(ParkingSpot).where(ParkingSpot.lot_id == lot_id).execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        db.delete(ParkingLot).where(ParkingLot.id == lot_id).execution_options(synchronize_session=False)
+    )
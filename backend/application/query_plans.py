@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from application.database import db
+from application.models import AdvanceBooking, ParkingSpot, Reservation
+from application.serializers import reservation_rows_query, spot_occupancy_query
+
+
+class UnsupportedDialectError(RuntimeError):
+    """Raised when plans cannot be read from the configured database"""
+
+
+def _hot_queries():
+    """(name, statement, index the plan must use) for the queries behind the busiest routes"""
+    now = datetime(2026, 1, 1)
+    return [
+        (
+            'allocator: free spots of a lot',
+            db.select(ParkingSpot.id).where(ParkingSpot.lot_id == 1, ParkingSpot.status == 'A').order_by(ParkingSpot.id),
+            'ix_parking_spots_lot_id_status'
+        ),
+        (
+            'delete lot: occupied spot count',
+            db.select(db.func.count(ParkingSpot.id)).where(ParkingSpot.lot_id == 1, ParkingSpot.status == 'O'),
+            'ix_parking_spots_lot_id_status'
+        ),
+        (
+            'GET /api/reservations: user page',
+            reservation_rows_query().filter(Reservation.user_id == 1).order_by(Reservation.id.desc()).limit(51).statement,
+            'ix_reservations_user_id_leaving_timestamp'
+        ),
+        (
+            'user stats: active reservations of a user',
+            db.select(db.func.count(Reservation.id)).where(
+                Reservation.user_id == 1, Reservation.leaving_timestamp.is_(None)
+            ),
+            'ix_reservations_user_id_leaving_timestamp'
+        ),
+        (
+            'admin spot_location: active reservation per spot',
+            spot_occupancy_query([1]).order_by(ParkingSpot.id).limit(201).statement,
+            'ix_reservations_spot_id_leaving_timestamp'
+        ),
+        (
+            'lot details: active reservation of a spot',
+            db.select(Reservation.id).where(Reservation.spot_id == 1, Reservation.leaving_timestamp.is_(None)),
+            'ix_reservations_spot_id_leaving_timestamp'
+        ),
+        (
+            'admin summary: revenue over a release-time range',
+            db.select(db.func.sum(Reservation.parking_cost)).where(
+                Reservation.leaving_timestamp >= now - timedelta(days=30), Reservation.leaving_timestamp < now
+            ),
+            'ix_reservations_leaving_timestamp'
+        ),
+        (
+            'overstay release: next chunk of active reservations',
+            db.select(Reservation.id).where(
+                Reservation.id > 0, Reservation.leaving_timestamp.is_(None), Reservation.parking_timestamp < now
+            ).order_by(Reservation.id).limit(500),
+            'ix_reservations_leaving_timestamp'
+        ),
+        (
+            'advance booking: overlapping windows of a spot',
+            db.select(AdvanceBooking.id).where(
+                AdvanceBooking.spot_id == 1, AdvanceBooking.status.in_(('booked', 'checked_in')),
+                AdvanceBooking.start_time < now + timedelta(hours=2), AdvanceBooking.end_time > now
+            ).limit(1),
+            'ix_advance_bookings_spot_id_start_time'
+        ),
+        (
+            'daily rollup: reservations started in a range',
+            db.select(db.func.count(Reservation.id)).where(
+                Reservation.parking_timestamp >= now - timedelta(days=7), Reservation.parking_timestamp < now
+            ),
+            'ix_reservations_parking_timestamp'
+        ),
+    ]
+
+
+def explain(statement):
+    """The database's query plan for statement, as one string"""
+    connection = db.session.connection()
+    dialect = connection.dialect
+    compiled = statement.compile(dialect=dialect, compile_kwargs={'render_postcompile': True})
+    params = compiled.construct_params()
+    if dialect.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    if dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + compiled.string, params).fetchall()
+        return '\n'.join(row[-1] for row in rows)
+    if dialect.name == 'postgresql':
+        # Small tables make sequential scans look cheapest; ask what the planner would do on real data
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        rows = connection.exec_driver_sql('EXPLAIN ' + compiled.string, params).fetchall()
+        return '\n'.join(row[0] for row in rows)
+    raise UnsupportedDialectError(f'Reading query plans is not supported for {dialect.name}')
+
+
+def check_query_plans():
+    """Plans of the hot queries that do not use their expected index, as (name, index, plan)"""
+    failures = []
+    try:
+        for name, statement, index in _hot_queries():
+            plan = explain(statement)
+            if index not in plan:
+                failures.append((name, index, plan))
+    finally:
+        db.session.rollback()
+    return failures
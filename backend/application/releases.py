@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+from application.database import db
+from application.models import ParkingLot, ParkingSpot, Reservation
+from application.allocator import spot_allocator
+from application.cache_services import invalidate_bulk_changes
+from application import billing
+from application import user_stats
+
+RELEASE_CHUNK_SIZE = 500  # reservations closed per transaction
+
+
+def _close_reservations(reservation_ids, now):
+    """Close the still-active reservations among reservation_ids; returns (id, spot_id, user_id) rows"""
+    returned = (Reservation.id, Reservation.spot_id, Reservation.user_id)
+    still_active = (Reservation.id.in_(reservation_ids), Reservation.leaving_timestamp.is_(None))
+    update = db.update(Reservation).where(*still_active).values(
+        leaving_timestamp=now
+    ).execution_options(synchronize_session=False)
+
+    if db.session.get_bind().dialect.update_returning:
+        return db.session.execute(update.returning(*returned)).all()
+
+    # No UPDATE ... RETURNING: lock the rows first so the same ones are updated and read back
+    locked = db.session.execute(db.select(Reservation.id).where(*still_active).with_for_update()).scalars().all()
+    if not locked:
+        return []
+    db.session.execute(update.where(Reservation.id.in_(locked)))
+    return db.session.execute(db.select(*returned).where(Reservation.id.in_(locked))).all()
+
+
+def release_chunk(reservation_ids, now=None):
+    """
+    Release a bounded set of active reservations in the current transaction with
+    set-based statements: one UPDATE closes them, the billing module prices them
+    in one batch from their tariff snapshots, one UPDATE frees their spots, and
+    the lot counters and user rollups get one update per lot and per user.
+    Returns [(reservation_id, spot_id, lot_id, user_id, cost)].
+    """
+    now = now or datetime.utcnow()
+    user_stats.ensure_many_user_stats(row[0] for row in db.session.query(Reservation.user_id).filter(
+        Reservation.id.in_(reservation_ids), Reservation.leaving_timestamp.is_(None)
+    ).distinct())
+
+    closed = _close_reservations(reservation_ids, now)
+    if not closed:
+        return []
+    bills = billing.bill_reservations([row[0] for row in closed])
+
+    spot_ids = [row[1] for row in closed]
+    lot_of = dict(db.session.query(ParkingSpot.id, ParkingSpot.lot_id).filter(ParkingSpot.id.in_(spot_ids)))
+    db.session.execute(
+        db.update(ParkingSpot).where(ParkingSpot.id.in_(spot_ids)).values(status='A')
+        .execution_options(synchronize_session=False)
+    )
+
+    freed = {}
+    for spot_id in spot_ids:
+        freed[lot_of[spot_id]] = freed.get(lot_of[spot_id], 0) + 1
+    for lot_id, count in freed.items():
+        ParkingLot.adjust_spot_counters(lot_id, available=count, occupied=-count)
+
+    user_stats.record_reservations_closed(
+        [(user_id, lot_of[spot_id], bills[reservation_id][1], bills[reservation_id][0])
+         for reservation_id, spot_id, user_id in closed], now
+    )
+    return [
+        (reservation_id, spot_id, lot_of[spot_id], user_id, bills[reservation_id][0])
+        for reservation_id, spot_id, user_id in closed
+    ]
+
+
+def release_reservations(reservation_ids=None, lot_id=None, user_id=None, parked_before=None,
+                         chunk_size=RELEASE_CHUNK_SIZE, now=None):
+    """
+    Release every active reservation matching all of the given filters, chunk_size
+    at a time, committing after each chunk so no transaction holds the tables for long.
+    Returns {'released', 'revenue', 'chunks'}.
+    """
+    now = now or datetime.utcnow()
+    filters = [Reservation.leaving_timestamp.is_(None)]
+    if reservation_ids is not None:
+        filters.append(Reservation.id.in_(reservation_ids))
+    if lot_id is not None:
+        filters.append(Reservation.spot_id.in_(db.select(ParkingSpot.id).where(ParkingSpot.lot_id == lot_id)))
+    if user_id is not None:
+        filters.append(Reservation.user_id == user_id)
+    if parked_before is not None:
+        filters.append(Reservation.parking_timestamp < parked_before)
+
+    summary = {'released': 0, 'revenue': 0.0, 'chunks': 0}
+    last_id = 0
+    while True:
+        # Walk forward by id so rows released concurrently (and skipped) never stall the loop
+        chunk = db.session.execute(
+            db.select(Reservation.id).where(Reservation.id > last_id, *filters).order_by(Reservation.id).limit(chunk_size)
+        ).scalars().all()
+        if not chunk:
+            break
+        last_id = chunk[-1]
+
+        try:
+            released = release_chunk(chunk, now)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        for _, spot_id, spot_lot_id, _, _ in released:
+            spot_allocator.release(spot_lot_id, spot_id)
+        if released:
+            invalidate_bulk_changes(
+                user_ids=[row[3] for row in released], lot_ids=[row[2] for row in released]
+            )
+        summary['released'] += len(released)
+        summary['revenue'] += sum(row[4] or 0.0 for row in released)
+        summary['chunks'] += 1
+
+    summary['revenue'] = round(summary['revenue'], 2)
+    return summary
+
+
+def release_overstays(max_hours, chunk_size=RELEASE_CHUNK_SIZE, now=None):
+    """Release reservations parked for longer than max_hours"""
+    now = now or datetime.utcnow()
+    return release_reservations(parked_before=now - timedelta(hours=max_hours), chunk_size=chunk_size, now=now)
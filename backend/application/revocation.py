@@ -0,0 +1,243 @@
+import hashlib
+import math
+import threading
+import time
+from application.cache import app_cache
+
+LOCAL_PRUNE_MIN = 1024  # local entries before the first prune of expired ones
+
+
+class BloomFilter:
+    """
+    Fixed-size set membership test with no false negatives and a bounded rate
+    of false positives. Items cannot be removed; rebuild to forget them.
+    """
+
+    def __init__(self, capacity=100_000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))  # bits
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def is_full(self):
+        return self.count >= self.capacity
+
+
+class RevocationStore:
+    """
+    Revoked token ids (jti), shared by every worker through Redis. Each entry
+    expires when its token would have, so the store only ever holds tokens
+    that could still be presented.
+
+    A local Bloom filter of revoked ids sits in front: the common "not revoked"
+    answer needs no round trip, and only possible hits are confirmed in Redis.
+    Revocations are published on a channel so every worker adds them to its
+    filter; after a lost connection, or once the filter fills up, it is
+    rebuilt from the live keys. Without Redis the store keeps entries locally
+    and prunes the expired ones whenever the local table doubles in size, the
+    filter fills up or rebuild_interval passes.
+    """
+
+    def __init__(self, key_prefix='parking:revoked:', channel='parking:revoked',
+                 capacity=100_000, error_rate=0.001, rebuild_interval=3600):
+        self.redis = None
+        self.key_prefix = key_prefix
+        self.channel = channel
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._local = {}  # jti -> expiry (epoch seconds), used without Redis or when it errors out
+        self._lock = threading.Lock()
+        self._listener = None
+        self._stop_listener = threading.Event()
+        self._last_rebuild = time.monotonic()
+        self._prune_at = LOCAL_PRUNE_MIN
+
+        self._checks = 0
+        self._bloom_negatives = 0
+        self._lookups = 0
+        self._false_positives = 0
+        self._revocations = 0
+        self._messages_received = 0
+        self._rebuilds = 0
+        self._errors = 0
+
+    def attach_redis(self, client, listen=True):
+        """Share revocations through client and load the ones already there"""
+        self.redis = client
+        self.rebuild()
+        if listen:
+            self.start_listener()
+
+    def revoke(self, jti, expires_at):
+        """Revoke a token until expires_at (its exp claim, epoch seconds)"""
+        ttl = max(1, math.ceil(expires_at - time.time()))
+        if self.redis is not None:
+            with self._lock:
+                self._bloom.add(jti)
+                self._revocations += 1
+            try:
+                self.redis.set(self._key(jti), 1, ex=ttl)
+                self.redis.publish(self.channel, jti)
+                return
+            except Exception:
+                self._count('_errors')
+        # No shared store: at least this worker refuses the token. The filter and
+        # the table change together so a concurrent rebuild cannot lose the entry.
+        with self._lock:
+            if self.redis is None:
+                self._revocations += 1
+            self._bloom.add(jti)
+            self._local[jti] = expires_at
+            due = (
+                len(self._local) >= self._prune_at or self._bloom.is_full()
+                or time.monotonic() - self._last_rebuild > self.rebuild_interval
+            )
+        if due and not (self._listener and self._listener.is_alive()):
+            self.rebuild()
+
+    def is_revoked(self, jti):
+        """Whether a token id was revoked; asks Redis only when the Bloom filter cannot rule it out"""
+        with self._lock:
+            self._checks += 1
+            if jti not in self._bloom:
+                self._bloom_negatives += 1
+                return False
+            self._lookups += 1
+            expires_at = self._local.get(jti)
+        if expires_at is not None and expires_at > time.time():
+            return True
+
+        revoked = False
+        if self.redis is not None:
+            try:
+                revoked = bool(self.redis.exists(self._key(jti)))
+            except Exception:
+                # Cannot confirm either way: refuse the token rather than let a revoked one through
+                self._count('_errors')
+                return True
+        if not revoked:
+            self._count('_false_positives')
+        return revoked
+
+    def rebuild(self):
+        """Start a fresh Bloom filter holding only revocations that have not expired"""
+        now = time.time()
+        shared = []
+        if self.redis is not None:
+            try:
+                for key in self.redis.scan_iter(match=f'{self.key_prefix}*', count=1000):
+                    key = key.decode('utf-8') if isinstance(key, bytes) else key
+                    shared.append(key[len(self.key_prefix):])
+            except Exception:
+                # Keep the old filter: a partial one would let revoked tokens through
+                self._count('_errors')
+                return False
+        with self._lock:
+            self._local = {jti: expires_at for jti, expires_at in self._local.items() if expires_at > now}
+            live = len(shared) + len(self._local)
+            # Room for as many again before the next rebuild, so a burst of live revocations does not rebuild every time
+            bloom = BloomFilter(max(self.capacity, 2 * live), self.error_rate)
+            for jti in shared:
+                bloom.add(jti)
+            for jti in self._local:
+                bloom.add(jti)
+            self._bloom = bloom
+            self._prune_at = max(LOCAL_PRUNE_MIN, 2 * len(self._local))
+            self._last_rebuild = time.monotonic()
+            self._rebuilds += 1
+        return True
+
+    def handle_message(self, data):
+        """Add a revocation published by another worker to the local filter"""
+        jti = data.decode('utf-8') if isinstance(data, bytes) else data
+        with self._lock:
+            self._bloom.add(jti)
+            self._messages_received += 1
+
+    def start_listener(self):
+        """Start a daemon thread applying revocations published by other workers"""
+        if self._listener and self._listener.is_alive():
+            return
+        self._stop_listener.clear()
+        self._listener = threading.Thread(target=self._listen, name='token-revocation-listener', daemon=True)
+        self._listener.start()
+
+    def stop_listener(self):
+        self._stop_listener.set()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'shared': self.redis is not None,
+                'checks': self._checks,
+                'answered_locally': self._bloom_negatives,
+                'lookups': self._lookups,
+                'false_positives': self._false_positives,
+                'revocations': self._revocations,
+                'messages_received': self._messages_received,
+                'rebuilds': self._rebuilds,
+                'errors': self._errors,
+                'bloom_entries': self._bloom.count,
+                'bloom_bytes': len(self._bloom._bits),
+                'local_entries': len(self._local),
+                'listening': bool(self._listener and self._listener.is_alive())
+            }
+
+    def _listen(self):
+        while not self._stop_listener.is_set():
+            pubsub = None
+            try:
+                pubsub = self.redis.pubsub()
+                pubsub.subscribe(self.channel)
+                # Revocations published while we were not subscribed would be missing
+                self.rebuild()
+                while not self._stop_listener.is_set():
+                    message = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message['type'] == 'message':
+                        self.handle_message(message['data'])
+                    if self._bloom.is_full() or time.monotonic() - self._last_rebuild > self.rebuild_interval:
+                        self.rebuild()
+            except Exception:
+                # Connection lost: resubscribe, which rebuilds the filter
+                self._count('_errors')
+                self._stop_listener.wait(1.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def _key(self, jti):
+        return f'{self.key_prefix}{jti}'
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+revocation_store = RevocationStore()
+
+
+def init_revocation_store(app):
+    """Share revoked tokens through the cache's Redis connection; call after init_cache"""
+    if app_cache.redis is not None:
+        revocation_store.attach_redis(app_cache.redis, listen=not app.config.get('TESTING'))
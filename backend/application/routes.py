@@ -1,11 +1,30 @@
-from flask import request, jsonify, send_file
+from flask import request, jsonify, send_file, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from application.models import User, ParkingLot, ParkingSpot, Reservation
+from application.models import User, ParkingLot, ParkingSpot, Reservation, ImportJob, AdvanceBooking
 from application.database import db
-from application.security import generate_tokens, admin_required, user_required, revoke_token
-# from application.cache_services import CachedDashboardService, CachedParkingService, invalidate_related_caches, get_cache_status
+from application.security import generate_tokens, admin_required, user_required, revoke_token, current_user, invalidate_user_status, authenticate
+from application.passwords import password_hasher, PasswordQueueFull
+from application.allocator import spot_allocator
+from application.schedule import booking_schedule
+from application.index_sync import publish_booking_changes, publish_lot_changes
+from application.geo import lot_grid, nearby_lots, parse_coordinates, MAX_RADIUS_KM
+from application.suggest import suggest_index, DEFAULT_LIMIT as SUGGEST_DEFAULT_LIMIT, MAX_LIMIT as SUGGEST_MAX_LIMIT
+from application.pagination import PaginationError, parse_cursor_args, cursor_page
+from application.serializers import ReservationSerializer, reservation_rows_query, apply_reservation_filters, spot_occupancy_query
+from application import analytics
+from application import user_stats
+from application import search
+from application import provisioning
+from application import releases
+from application import billing
+from application import importer
+from application.batch_booking import BatchBookingError, parse_batch, book_batch
+from application import advance_bookings
+from application.advance_bookings import AdvanceBookingError
+from application.cache_services import CachedDashboardService, CachedParkingService, invalidate_related_caches, get_cache_status, cached_view, user_tag
 # Celery tasks will be imported conditionally when needed
-from datetime import datetime
+from datetime import datetime, timedelta
+import json
 import os
 
 def create_routes(app):
@@ -30,48 +49,42 @@ def create_routes(app):
         """User/Admin login with enhanced role-based response"""
         try:
             data = request.get_json()
-            print(f"Login attempt - received data: {data}")  # Debug log
-            
             username = data.get('username')
             password = data.get('password')
             
-            print(f"Username: {username}, Password length: {len(password) if password else 0}")  # Debug log
-            
             if not username or not password:
                 return jsonify({'message': 'Username and password required'}), 400
             
-            user = User.query.filter_by(username=username).first()
-            print(f"User found: {user}")  # Debug log
+            user = authenticate(username, password)
+            if user is None:
+                return jsonify({'message': 'Invalid username or password'}), 401
             
-            if user and user.verify_password(password) and user.is_active:
-                print(f"Password verification successful for user: {user.username}, role: {user.role}")  # Debug log
-                tokens = generate_tokens(user)
-                
-                # Enhanced response with clear role information
-                response_data = {
-                    'message': f'Login successful - Welcome {user.role}!',
-                    'data': {
-                        'access_token': tokens['access_token'],
-                        'refresh_token': tokens['refresh_token'],
-                        'user': {
-                            'id': user.id,
-                            'username': user.username,
-                            'email': user.email,
-                            'role': user.role,
-                            'is_admin': user.is_admin(),
-                            'created_at': user.created_at.isoformat(),
-                            'is_active': user.is_active
-                        }
+            tokens = generate_tokens(user)
+            
+            # Enhanced response with clear role information
+            response_data = {
+                'message': f'Login successful - Welcome {user.role}!',
+                'data': {
+                    'access_token': tokens['access_token'],
+                    'refresh_token': tokens['refresh_token'],
+                    'user': {
+                        'id': user.id,
+                        'username': user.username,
+                        'email': user.email,
+                        'role': user.role,
+                        'is_admin': user.is_admin(),
+                        'created_at': user.created_at.isoformat(),
+                        'is_active': user.is_active
                     }
                 }
+            }
+            
+            return jsonify(response_data), 200
                 
-                return jsonify(response_data), 200
-            else:
-                print(f"Login failed - User: {user}, Password valid: {user.verify_password(password) if user else False}, Active: {user.is_active if user else False}")  # Debug log
-                return jsonify({'message': 'Invalid username or password'}), 401
-                
+        except PasswordQueueFull as e:
+            return jsonify({'message': str(e)}), 503, {'Retry-After': '1'}
         except Exception as e:
-            print(f"Login error: {str(e)}")  # Debug log
+            print(f"Login error: {str(e)}")
             return jsonify({'message': 'Login failed. Please try again.'}), 500
     
     @app.route('/api/auth/register', methods=['POST'])
@@ -110,6 +123,9 @@ def create_routes(app):
                 'data': tokens
             }), 201
             
+        except PasswordQueueFull as e:
+            db.session.rollback()
+            return jsonify({'message': str(e)}), 503, {'Retry-After': '1'}
         except Exception as e:
             db.session.rollback()
             return jsonify({'message': str(e)}), 500
@@ -129,8 +145,7 @@ def create_routes(app):
     def get_profile():
         """Get user profile"""
         try:
-            user_id = int(get_jwt_identity())  # Convert to int
-            user = User.query.get(user_id)
+            user = current_user()
             return jsonify({
                 'message': 'Profile retrieved successfully',
                 'data': user.to_dict()
@@ -143,8 +158,7 @@ def create_routes(app):
     def update_profile():
         """Update user profile"""
         try:
-            user_id = int(get_jwt_identity())  # Convert to int
-            user = User.query.get(user_id)
+            user = current_user()
             
             if not user:
                 return jsonify({'message': 'User not found'}), 404
@@ -179,8 +193,7 @@ def create_routes(app):
     def whoami():
         """Get current authenticated user info - useful for frontend"""
         try:
-            user_id = int(get_jwt_identity())  # Convert to int
-            user = User.query.get(user_id)
+            user = current_user()
             if not user:
                 return jsonify({'message': 'User not found'}), 404
             
@@ -222,6 +235,37 @@ def create_routes(app):
         except Exception as e:
             return jsonify({'message': str(e)}), 500
     
+    @app.route('/api/parking-lots/nearby', methods=['GET'])
+    @user_required
+    def get_nearby_parking_lots():
+        """Lots with free spots near a point (?lat=&lon=&radius=km&min_available=&limit=)"""
+        try:
+            latitude, longitude = parse_coordinates(request.args.get('lat'), request.args.get('lon'))
+            if latitude is None:
+                raise ValueError('lat and lon are required')
+            radius = float(request.args.get('radius', 5))
+            min_available = int(request.args.get('min_available', 1))
+            limit = min(int(request.args.get('limit', 20)), 100)
+            if not (0 < radius <= MAX_RADIUS_KM) or min_available < 0 or limit < 1:
+                raise ValueError(f'radius must be in (0, {MAX_RADIUS_KM:g}] km, min_available >= 0 and limit >= 1')
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        try:
+            results = []
+            for lot, distance in nearby_lots(latitude, longitude, radius, min_available=min_available, limit=limit):
+                lot_data = CachedParkingService.serialize_lot(lot)
+                lot_data['distance_km'] = round(distance, 3)
+                results.append(lot_data)
+            
+            return jsonify({
+                'message': 'Nearby parking lots retrieved successfully',
+                'data': results,
+                'count': len(results)
+            }), 200
+        except Exception as e:
+            return jsonify({'message': str(e)}), 500
+    
     @app.route('/api/parking-lots/<int:lot_id>', methods=['GET'])
     @user_required
     def get_parking_lot(lot_id):
@@ -258,28 +302,40 @@ def create_routes(app):
             if not all(field in data for field in required_fields):
                 return jsonify({'message': 'All fields are required'}), 400
             
+            try:
+                latitude, longitude = parse_coordinates(data.get('latitude'), data.get('longitude'))
+                tariff = billing.parse_tariff(data)
+            except (TypeError, ValueError) as e:
+                return jsonify({'message': str(e)}), 400
+            
             # Create parking lot
             new_lot = ParkingLot(
                 prime_location_name=data['prime_location_name'],
                 address=data['address'],
                 pin_code=data['pin_code'],
                 price_per_hour=float(data['price_per_hour']),
-                number_of_spots=int(data['number_of_spots'])
+                number_of_spots=int(data['number_of_spots']),
+                **tariff
             )
+            new_lot.available_spots = new_lot.number_of_spots
+            new_lot.occupied_spots = 0
+            new_lot.latitude = latitude
+            new_lot.longitude = longitude
             
             db.session.add(new_lot)
             db.session.flush()  # Get the lot ID
             
-            # Create parking spots
-            for i in range(1, new_lot.number_of_spots + 1):
-                spot = ParkingSpot(
-                    spot_number=f"A{i}",  # Simple numbering: A1, A2, A3...
-                    lot_id=new_lot.id
-                )
-                db.session.add(spot)
+            # Create parking spots A1..An in bulk
+            provisioning.add_spots(new_lot.id, 1, new_lot.number_of_spots)
             
             db.session.commit()
             
+            spot_allocator.reload_lot(new_lot.id)
+            suggest_index.update_lot(new_lot.id, new_lot.prime_location_name, new_lot.address, new_lot.pin_code)
+            lot_grid.update_lot(new_lot.id, new_lot.latitude, new_lot.longitude)
+            publish_lot_changes([new_lot.id])
+            invalidate_related_caches('parking_lot', lot_id=new_lot.id)
+            
             return jsonify({
                 'message': 'Parking lot created successfully',
                 'data': new_lot.to_dict()
@@ -289,6 +345,79 @@ def create_routes(app):
             db.session.rollback()
             return jsonify({'message': str(e)}), 500
     
+    @app.route('/api/admin/parking-lots/import', methods=['POST'])
+    @admin_required
+    def import_parking_lots():
+        """Bulk create parking lots from a CSV or NDJSON upload (Admin only)"""
+        try:
+            # Either a multipart 'file' field or the raw request body; both are read incrementally
+            upload = request.files.get('file')
+            if upload is not None:
+                stream, filename, mimetype = upload.stream, upload.filename, upload.mimetype
+            else:
+                stream, filename, mimetype = request.stream, None, request.mimetype
+            
+            try:
+                fmt = importer.detect_format(filename, mimetype, request.args.get('format'))
+            except importer.ImportFileError as e:
+                return jsonify({'message': str(e)}), 400
+            
+            job = importer.create_job(fmt, filename, user_id=int(get_jwt_identity()))
+            
+            threshold = app.config.get('IMPORT_BACKGROUND_THRESHOLD_BYTES')
+            if threshold and (request.content_length or 0) > threshold:
+                upload_dir = app.config.get('IMPORT_UPLOAD_DIR') or os.path.join(app.instance_path, 'imports')
+                path = importer.spool_upload(stream, job.id, upload_dir)
+                
+                # Hand the file to a Celery worker when a broker is configured, else to a thread of this process
+                try:
+                    from application.tasks import import_parking_lots as import_task, has_broker
+                    if has_broker():
+                        import_task.delay(job.id, path)
+                    else:
+                        importer.start_local_job(app, job.id, path)
+                    
+                    return jsonify({
+                        'message': 'Import started',
+                        'data': job.to_dict(),
+                        'status_url': f'/api/admin/parking-lots/import/{job.id}',
+                        'status': 'processing'
+                    }), 202
+                    
+                except Exception as celery_error:
+                    # Fallback to importing the spooled file in this request
+                    print(f"Background import not available, importing synchronously: {str(celery_error)}")
+                    job = importer.run_spooled_job(job.id, path)
+            else:
+                job = importer.run_job(job.id, stream)
+            
+            if job.status == 'failed':
+                return jsonify({'message': job.message, 'data': job.to_dict()}), 400
+            
+            return jsonify({
+                'message': f'Imported {job.lots_imported} parking lots ({job.error_count} rows rejected)',
+                'data': job.to_dict(),
+                'status': 'completed'
+            }), 200
+            
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'message': str(e)}), 500
+    
+    @app.route('/api/admin/parking-lots/import/<job_id>', methods=['GET'])
+    @admin_required
+    def get_import_status(job_id):
+        """Progress and row errors of a bulk lot import (Admin only)"""
+        try:
+            job = db.session.get(ImportJob, job_id)
+            if job is None:
+                return jsonify({'message': 'Import not found'}), 404
+            
+            return jsonify({'data': job.to_dict()}), 200
+            
+        except Exception as e:
+            return jsonify({'message': str(e)}), 500
+    
     @app.route('/api/admin/parking-lots/<int:lot_id>', methods=['PUT'])
     @admin_required
     def update_parking_lot(lot_id):
@@ -306,6 +435,21 @@ def create_routes(app):
                 lot.pin_code = data['pin_code']
             if 'price_per_hour' in data:
                 lot.price_per_hour = float(data['price_per_hour'])
+            try:
+                # Reservations already made keep the tariff they were booked at
+                for field, value in billing.parse_tariff(data, partial=True).items():
+                    setattr(lot, field, value)
+            except billing.TariffError as e:
+                db.session.rollback()
+                return jsonify({'message': str(e)}), 400
+            if 'latitude' in data or 'longitude' in data:
+                try:
+                    lot.latitude, lot.longitude = parse_coordinates(
+                        data.get('latitude', lot.latitude), data.get('longitude', lot.longitude)
+                    )
+                except (TypeError, ValueError) as e:
+                    db.session.rollback()
+                    return jsonify({'message': str(e)}), 400
             
             # Handle spots number change
             if 'number_of_spots' in data:
@@ -313,31 +457,30 @@ def create_routes(app):
                 current_spot_count = lot.number_of_spots
                 
                 if new_spot_count > current_spot_count:
-                    # Add new spots
-                    for i in range(current_spot_count + 1, new_spot_count + 1):
-                        spot = ParkingSpot(
-                            spot_number=f"A{i}",
-                            lot_id=lot.id
-                        )
-                        db.session.add(spot)
+                    # Add new spots in bulk
+                    provisioning.add_spots(lot.id, current_spot_count + 1, new_spot_count - current_spot_count)
+                    ParkingLot.adjust_spot_counters(lot.id, available=new_spot_count - current_spot_count)
                 elif new_spot_count < current_spot_count:
-                    # Remove spots (only if they're available)
-                    spots_to_remove = ParkingSpot.query.filter(
-                        ParkingSpot.lot_id == lot_id,
-                        ParkingSpot.status == 'A'
-                    ).order_by(ParkingSpot.id.desc()).limit(current_spot_count - new_spot_count).all()
-                    
-                    if len(spots_to_remove) < (current_spot_count - new_spot_count):
-                        return jsonify({'message': 'Cannot remove occupied spots'}), 400
-                    
-                    for spot in spots_to_remove:
-                        db.session.delete(spot)
+                    # Remove spots (only if they're available) with set-based deletes
+                    try:
+                        removed = provisioning.remove_free_spots(lot.id, current_spot_count - new_spot_count)
+                    except provisioning.SpotRemovalError as e:
+                        db.session.rollback()
+                        return jsonify({'message': str(e)}), 400
+                    ParkingLot.adjust_spot_counters(lot.id, available=-removed)
                 
                 lot.number_of_spots = new_spot_count
             
             lot.updated_at = datetime.utcnow()
             db.session.commit()
             
+            if 'number_of_spots' in data:
+                spot_allocator.reload_lot(lot.id)
+            suggest_index.update_lot(lot.id, lot.prime_location_name, lot.address, lot.pin_code)
+            lot_grid.update_lot(lot.id, lot.latitude, lot.longitude)
+            publish_lot_changes([lot.id])
+            invalidate_related_caches('parking_lot', lot_id=lot.id)
+            
             return jsonify({
                 'message': 'Parking lot updated successfully',
                 'data': lot.to_dict()
@@ -359,10 +502,26 @@ def create_routes(app):
             if occupied_spots > 0:
                 return jsonify({'message': 'Cannot delete lot with occupied spots'}), 400
             
-            # Delete the lot (spots will be deleted by cascade)
-            db.session.delete(lot)
+            upcoming_bookings = AdvanceBooking.query.filter(
+                AdvanceBooking.lot_id == lot_id,
+                AdvanceBooking.status == 'booked',
+                AdvanceBooking.end_time > datetime.utcnow()
+            ).count()
+            if upcoming_bookings > 0:
+                return jsonify({'message': 'Cannot delete lot with upcoming advance bookings'}), 400
+            
+            # Delete the lot and its spots with set-based deletes
+            provisioning.delete_lot(lot_id)
             db.session.commit()
             
+            spot_allocator.drop_lot(lot_id)
+            booking_schedule.drop_lot(lot_id)
+            publish_booking_changes(lot_id)
+            suggest_index.drop_lot(lot_id)
+            lot_grid.drop_lot(lot_id)
+            publish_lot_changes([lot_id])
+            invalidate_related_caches('parking_lot', lot_id=lot_id)
+            
             return jsonify({'message': 'Parking lot deleted successfully'}), 200
             
         except Exception as e:
@@ -375,6 +534,7 @@ def create_routes(app):
     @user_required
     def create_reservation():
         """Book a parking spot"""
+        spot_id = None
         try:
             data = request.get_json()
             lot_id = data.get('lot_id')
@@ -384,6 +544,7 @@ def create_routes(app):
             if not lot_id:
                 return jsonify({'message': 'Parking lot ID is required'}), 400
             
+            lot_id = int(lot_id)
             user_id = int(get_jwt_identity())  # Convert to int
             
             # Check if user already has an active reservation
@@ -395,28 +556,35 @@ def create_routes(app):
             # if active_reservation:
             #     return jsonify({'message': 'You already have an active reservation'}), 400
             
-            # Find first available spot in the lot
-            available_spot = ParkingSpot.query.filter_by(
-                lot_id=lot_id,
-                status='A'
-            ).first()
+            # Occupy a free spot; the allocator marks it 'O' with a conditional
+            # UPDATE, so concurrent workers can never book the same spot. Spots
+            # booked in advance for the coming hold window are left alone.
+            now = datetime.utcnow()
+            held = booking_schedule.busy_spots(
+                lot_id, now, now + timedelta(minutes=app.config['ADVANCE_BOOKING_HOLD_MINUTES'])
+            )
+            spot_id = spot_allocator.claim_spot(lot_id, held=held)
             
-            if not available_spot:
+            if spot_id is None:
+                db.session.rollback()
                 return jsonify({'message': 'No available spots in this lot'}), 400
             
-            # Create reservation
+            user_stats.record_reservation_started(user_id)
+            
+            # Create reservation, priced later at today's tariff
             reservation = Reservation(
-                spot_id=available_spot.id,
+                spot_id=spot_id,
                 user_id=user_id,
                 vehicle_number=vehicle_number,
-                remarks=remarks
+                remarks=remarks,
+                **billing.tariff_snapshot(lot_id)
             )
             
-            # Update spot status
-            available_spot.status = 'O'
+            ParkingLot.adjust_spot_counters(lot_id, available=-1, occupied=1)
             
             db.session.add(reservation)
             db.session.commit()
+            spot_allocator.confirm(spot_id)
             
             # Invalidate related caches since parking availability changed
             invalidate_related_caches('reservation', user_id=user_id, lot_id=lot_id)
@@ -426,6 +594,36 @@ def create_routes(app):
                 'data': reservation.to_dict()
             }), 201
             
+        except Exception as e:
+            db.session.rollback()
+            if spot_id is not None:
+                # Booking did not go through, so re-sync the lot with the database
+                spot_allocator.abandon(lot_id, spot_id)
+            return jsonify({'message': str(e)}), 500
+    
+    @app.route('/api/reservations/batch', methods=['POST'])
+    @user_required
+    def create_batch_reservation():
+        """Book several parking spots at once, all or nothing"""
+        try:
+            user_id = int(get_jwt_identity())  # Convert to int
+            items, vehicle_numbers, remarks = parse_batch(request.get_json(silent=True))
+            
+            reservation_ids = book_batch(
+                user_id, items, vehicle_numbers, remarks,
+                hold=timedelta(minutes=app.config['ADVANCE_BOOKING_HOLD_MINUTES'])
+            )
+            
+            # Reservations with their spot and lot in one joined query
+            rows = reservation_rows_query().filter(Reservation.id.in_(reservation_ids)).order_by(Reservation.id).all()
+            
+            return jsonify({
+                'message': f'{len(reservation_ids)} parking spots booked successfully',
+                'data': ReservationSerializer().serialize_rows(rows)
+            }), 201
+            
+        except BatchBookingError as e:
+            return jsonify({'message': str(e)}), e.status_code
         except Exception as e:
             db.session.rollback()
             return jsonify({'message': str(e)}), 500
@@ -436,26 +634,28 @@ def create_routes(app):
         """Release/vacate parking spot"""
         try:
             user_id = int(get_jwt_identity())  # Convert to int
-            reservation = Reservation.query.filter_by(
-                id=reservation_id,
-                user_id=user_id,
-                leaving_timestamp=None
-            ).first()
+            reservation = Reservation.query.filter_by(id=reservation_id, user_id=user_id).first()
             
             if not reservation:
-                return jsonify({'message': 'Active reservation not found'}), 404
-            
-            # Update reservation
-            reservation.leaving_timestamp = datetime.utcnow()
-            reservation.calculate_cost()
-            
-            # Update spot status
-            reservation.parking_spot.status = 'A'
+                return jsonify({'message': 'Reservation not found'}), 404
+            if reservation.leaving_timestamp is not None:
+                return jsonify({'message': 'Reservation was already released'}), 409
+            
+            # Closes the reservation only if it is still active (conditional UPDATE), and only
+            # then frees the spot and updates the counters and rollups, so a release racing
+            # the overstay job cannot close it twice
+            released = releases.release_chunk([reservation.id])
+            if not released:
+                db.session.rollback()
+                return jsonify({'message': 'Reservation was already released'}), 409
             
             db.session.commit()
             
+            _, spot_id, lot_id, _, _ = released[0]
+            spot_allocator.release(lot_id, spot_id)
+            
             # Invalidate related caches since parking availability changed
-            invalidate_related_caches('reservation', user_id=user_id)
+            invalidate_related_caches('reservation', user_id=user_id, lot_id=lot_id)
             
             return jsonify({
                 'message': 'Parking spot released successfully',
@@ -469,34 +669,163 @@ def create_routes(app):
     @app.route('/api/reservations', methods=['GET'])
     @user_required
     def get_user_reservations():
-        """Get user's reservations"""
+        """Get user's reservations, newest first, one page at a time"""
         try:
             user_id = int(get_jwt_identity())  # Convert to int
-            reservations = Reservation.query.filter_by(user_id=user_id).order_by(
-                Reservation.created_at.desc()
-            ).all()
-            
-            # Add parking lot and spot information to each reservation
-            reservation_data = []
-            for reservation in reservations:
-                data = reservation.to_dict()
-                
-                # Get parking spot and lot information
-                spot = ParkingSpot.query.get(reservation.spot_id)
-                if spot:
-                    lot = ParkingLot.query.get(spot.lot_id)
-                    if lot:
-                        data['parking_lot_name'] = lot.prime_location_name
-                        data['parking_lot_address'] = lot.address
-                        data['spot_number'] = spot.spot_number
-                        data['price_per_hour'] = lot.price_per_hour
-                
-                reservation_data.append(data)
+            after, limit = parse_cursor_args(default_limit=50, max_limit=200)
+            
+            # Reservations with their spot and lot in one joined query
+            query = reservation_rows_query().filter(Reservation.user_id == user_id)
+            if after is not None:
+                query = query.filter(Reservation.id < after)
+            rows = query.order_by(Reservation.id.desc()).limit(limit + 1).all()
+            
+            rows, pagination = cursor_page(rows, limit, lambda row: row[0].id)
             
             return jsonify({
                 'message': 'Reservations retrieved successfully',
-                'data': reservation_data
+                'data': ReservationSerializer().serialize_rows(rows),
+                'pagination': pagination
+            }), 200
+        except PaginationError as e:
+            return jsonify({'message': str(e)}), 400
+        except Exception as e:
+            return jsonify({'message': str(e)}), 500
+    
+    # ==================== ADVANCE BOOKING ROUTES ====================
+    
+    def _booking_hold():
+        return timedelta(minutes=app.config['ADVANCE_BOOKING_HOLD_MINUTES'])
+    
+    @app.route('/api/advance-bookings', methods=['POST'])
+    @user_required
+    def create_advance_booking():
+        """Book a spot of a lot for a future time window"""
+        try:
+            data = request.get_json(silent=True) or {}
+            user_id = int(get_jwt_identity())  # Convert to int
+            
+            try:
+                lot_id = int(data['lot_id'])
+            except (KeyError, TypeError, ValueError):
+                return jsonify({'message': 'Parking lot ID is required'}), 400
+            start, end = advance_bookings.parse_window(data.get('start'), data.get('end'))
+            
+            booking = advance_bookings.create_booking(
+                user_id, lot_id, start, end,
+                vehicle_number=data.get('vehicle_number'),
+                remarks=data.get('remarks'),
+                hold=_booking_hold()
+            )
+            
+            return jsonify({
+                'message': 'Parking spot booked in advance successfully',
+                'data': booking.to_dict()
+            }), 201
+            
+        except AdvanceBookingError as e:
+            return jsonify({'message': str(e)}), e.status_code
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'message': str(e)}), 500
+    
+    @app.route('/api/advance-bookings', methods=['GET'])
+    @user_required
+    def get_advance_bookings():
+        """Get user's advance bookings, newest first, one page at a time"""
+        try:
+            user_id = int(get_jwt_identity())  # Convert to int
+            after, limit = parse_cursor_args(default_limit=50, max_limit=200)
+            
+            query = AdvanceBooking.query.filter(AdvanceBooking.user_id == user_id)
+            status = request.args.get('status')
+            if status:
+                query = query.filter(AdvanceBooking.status == status)
+            if request.args.get('upcoming', 'false').lower() == 'true':
+                query = query.filter(AdvanceBooking.end_time > datetime.utcnow())
+            if after is not None:
+                query = query.filter(AdvanceBooking.id < after)
+            bookings = query.order_by(AdvanceBooking.id.desc()).limit(limit + 1).all()
+            
+            bookings, pagination = cursor_page(bookings, limit, lambda booking: booking.id)
+            
+            return jsonify({
+                'message': 'Advance bookings retrieved successfully',
+                'data': [booking.to_dict() for booking in bookings],
+                'pagination': pagination
+            }), 200
+            
+        except PaginationError as e:
+            return jsonify({'message': str(e)}), 400
+        except Exception as e:
+            return jsonify({'message': str(e)}), 500
+    
+    @app.route('/api/advance-bookings/<int:booking_id>/cancel', methods=['PUT'])
+    @user_required
+    def cancel_advance_booking(booking_id):
+        """Cancel an advance booking that has not been checked in"""
+        try:
+            user_id = int(get_jwt_identity())  # Convert to int
+            booking = advance_bookings.cancel_booking(booking_id, user_id)
+            
+            return jsonify({
+                'message': 'Advance booking cancelled successfully',
+                'data': booking.to_dict()
+            }), 200
+            
+        except AdvanceBookingError as e:
+            return jsonify({'message': str(e)}), e.status_code
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'message': str(e)}), 500
+    
+    @app.route('/api/advance-bookings/<int:booking_id>/check-in', methods=['PUT'])
+    @user_required
+    def check_in_advance_booking(booking_id):
+        """Arrive for an advance booking and start parking"""
+        try:
+            user_id = int(get_jwt_identity())  # Convert to int
+            booking, reservation = advance_bookings.check_in(booking_id, user_id)
+            
+            return jsonify({
+                'message': 'Checked in successfully',
+                'data': {
+                    'booking': booking.to_dict(),
+                    'reservation': reservation.to_dict()
+                }
             }), 200
+            
+        except AdvanceBookingError as e:
+            return jsonify({'message': str(e)}), e.status_code
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'message': str(e)}), 500
+    
+    @app.route('/api/parking-lots/<int:lot_id>/availability', methods=['GET'])
+    @user_required
+    def get_lot_availability(lot_id):
+        """Free spots of a lot over a time range, overall and per slot"""
+        try:
+            start, end = advance_bookings.parse_window(
+                request.args.get('start'), request.args.get('end'),
+                max_hours=advance_bookings.BOOKING_HORIZON_DAYS * 24
+            )
+            try:
+                slot_minutes = int(request.args.get('slot_minutes', 60))
+            except ValueError:
+                return jsonify({'message': 'slot_minutes must be an integer'}), 400
+            
+            availability = advance_bookings.lot_availability(
+                lot_id, start, end, slot_minutes=slot_minutes, hold=_booking_hold()
+            )
+            
+            return jsonify({
+                'message': 'Availability retrieved successfully',
+                'data': availability
+            }), 200
+            
+        except AdvanceBookingError as e:
+            return jsonify({'message': str(e)}), e.status_code
         except Exception as e:
             return jsonify({'message': str(e)}), 500
     
@@ -538,39 +867,122 @@ def create_routes(app):
         except Exception as e:
             return jsonify({'message': str(e)}), 500
     
+    @app.route('/api/admin/users/<int:user_id>', methods=['PUT'])
+    @admin_required
+    def update_user(user_id):
+        """Activate/deactivate a user or change their role (Admin only)"""
+        try:
+            user = User.query.get_or_404(user_id)
+            data = request.get_json(silent=True) or {}
+            
+            if user_id == int(get_jwt_identity()):
+                return jsonify({'message': 'Admins cannot change their own role or status'}), 400
+            if 'is_active' in data:
+                if not isinstance(data['is_active'], bool):
+                    return jsonify({'message': 'is_active must be true or false'}), 400
+                user.is_active = data['is_active']
+            if 'role' in data:
+                if data['role'] not in ('user', 'admin'):
+                    return jsonify({'message': "role must be 'user' or 'admin'"}), 400
+                user.role = data['role']
+            
+            db.session.commit()
+            
+            # Requests with this user's tokens see the change from now on
+            invalidate_user_status(user_id)
+            
+            return jsonify({
+                'message': 'User updated successfully',
+                'data': user.to_dict()
+            }), 200
+            
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'message': str(e)}), 500
+    
+    @app.route('/api/admin/reservations/release', methods=['POST'])
+    @admin_required
+    def bulk_release_reservations():
+        """Release active reservations in bulk by id, lot, user or age (Admin only)"""
+        try:
+            data = request.get_json(silent=True) or {}
+            
+            try:
+                reservation_ids = data.get('reservation_ids')
+                if reservation_ids is not None:
+                    if not isinstance(reservation_ids, list):
+                        raise ValueError
+                    reservation_ids = [int(reservation_id) for reservation_id in reservation_ids]
+                lot_id = int(data['lot_id']) if data.get('lot_id') is not None else None
+                user_id = int(data['user_id']) if data.get('user_id') is not None else None
+                older_than_hours = float(data['older_than_hours']) if data.get('older_than_hours') is not None else None
+            except (TypeError, ValueError):
+                return jsonify({'message': 'reservation_ids must be a list of integers, lot_id and user_id integers and older_than_hours a number'}), 400
+            
+            if reservation_ids is None and lot_id is None and user_id is None and older_than_hours is None:
+                return jsonify({'message': 'Give reservation_ids, lot_id, user_id or older_than_hours'}), 400
+            
+            parked_before = None
+            if older_than_hours is not None:
+                parked_before = datetime.utcnow() - timedelta(hours=older_than_hours)
+            
+            result = releases.release_reservations(
+                reservation_ids=reservation_ids,
+                lot_id=lot_id,
+                user_id=user_id,
+                parked_before=parked_before
+            )
+            
+            return jsonify({
+                'message': f"Released {result['released']} reservations",
+                'data': result
+            }), 200
+            
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'message': str(e)}), 500
+    
     @app.route('/api/admin/reservations', methods=['GET'])
     @admin_required
     def get_all_reservations():
-        """Get all reservations"""
+        """Get all reservations, newest first, as keyset pages or a streamed NDJSON export"""
         try:
-            reservations = Reservation.query.order_by(Reservation.created_at.desc()).all()
+            after, limit = parse_cursor_args(default_limit=100, max_limit=1000)
+            query = apply_reservation_filters(reservation_rows_query(with_user=True), request.args)
             
-            # Add parking lot and spot information to each reservation
-            reservation_data = []
-            for reservation in reservations:
-                data = reservation.to_dict()
-                
-                # Get user information
-                user = User.query.get(reservation.user_id)
-                if user:
-                    data['user_name'] = user.username
+            if request.args.get('format') == 'ndjson':
+                chunk_size = limit
                 
-                # Get parking spot and lot information
-                spot = ParkingSpot.query.get(reservation.spot_id)
-                if spot:
-                    lot = ParkingLot.query.get(spot.lot_id)
-                    if lot:
-                        data['parking_lot_name'] = lot.prime_location_name
-                        data['parking_lot_address'] = lot.address
-                        data['spot_number'] = spot.spot_number
-                        data['price_per_hour'] = lot.price_per_hour
+                def generate(after):
+                    # One chunk of rows (and one serializer) in memory at a time
+                    while True:
+                        chunk = query
+                        if after is not None:
+                            chunk = chunk.filter(Reservation.id < after)
+                        rows = chunk.order_by(Reservation.id.desc()).limit(chunk_size).all()
+                        if not rows:
+                            break
+                        serializer = ReservationSerializer()
+                        yield ''.join(json.dumps(serializer.serialize(*row)) + '\n' for row in rows)
+                        after = rows[-1][0].id
+                        db.session.expunge_all()
+                        if len(rows) < chunk_size:
+                            break
                 
-                reservation_data.append(data)
+                return Response(stream_with_context(generate(after)), mimetype='application/x-ndjson')
+            
+            if after is not None:
+                query = query.filter(Reservation.id < after)
+            rows = query.order_by(Reservation.id.desc()).limit(limit + 1).all()
+            rows, pagination = cursor_page(rows, limit, lambda row: row[0].id)
             
             return jsonify({
                 'message': 'Reservations retrieved successfully',
-                'data': reservation_data
+                'data': ReservationSerializer().serialize_rows(rows),
+                'pagination': pagination
             }), 200
+        except (PaginationError, ValueError) as e:
+            return jsonify({'message': str(e)}), 400
         except Exception as e:
             return jsonify({'message': str(e)}), 500
     
@@ -669,18 +1081,8 @@ def create_routes(app):
                     })
                     
             elif search_type == 'lot_location':
-                lots = ParkingLot.query.filter(
-                    db.or_(
-                        db.func.lower(ParkingLot.prime_location_name).like(f'%{search_query.lower()}%'),
-                        db.func.lower(ParkingLot.address).like(f'%{search_query.lower()}%'),
-                        ParkingLot.pin_code.like(f'%{search_query}%')
-                    )
-                ).all()
-                for lot in lots:
-                    available_spots = ParkingSpot.query.filter_by(
-                        lot_id=lot.id, 
-                        status='A'
-                    ).count()
+                # Ranked full-text match; availability comes from the lot counters
+                for lot in search.search_lots(search_query):
                     results.append({
                         'id': lot.id,
                         'prime_location_name': lot.prime_location_name,
@@ -688,41 +1090,42 @@ def create_routes(app):
                         'pin_code': lot.pin_code,
                         'price_per_hour': lot.price_per_hour,
                         'number_of_spots': lot.number_of_spots,
-                        'available_spots_count': available_spots
+                        'available_spots_count': lot.available_spots
                     })
                     
             elif search_type == 'spot_location':
-                # Search spots by parking lot location - more flexible matching
-                lots = ParkingLot.query.filter(
-                    db.or_(
-                        db.func.lower(ParkingLot.prime_location_name).like(f'%{search_query.lower()}%'),
-                        db.func.lower(ParkingLot.address).like(f'%{search_query.lower()}%'),
-                        ParkingLot.pin_code.like(f'%{search_query}%')
-                    )
-                ).all()
+                # Spots of the matching lots with their current occupant, one keyset-paginated query
+                after, limit = parse_cursor_args(default_limit=200, max_limit=2000)
+                lot_ids = search.matching_lot_ids(search_query)
+                rows = []
+                if lot_ids is not None:
+                    query = spot_occupancy_query(lot_ids)
+                    if after is not None:
+                        query = query.filter(ParkingSpot.id > after)
+                    rows = query.order_by(ParkingSpot.id).limit(limit + 1).all()
+                rows, pagination = cursor_page(rows, limit, lambda row: row[0])
                 
-                for lot in lots:
-                    spots = ParkingSpot.query.filter_by(lot_id=lot.id).all()
-                    for spot in spots:
-                        current_user = None
-                        reserved_since = None
-                        if spot.status == 'O':  # 'O' means Occupied
-                            reservation = Reservation.query.filter_by(
-                                spot_id=spot.id,
-                                status='active'
-                            ).first()
-                            if reservation:
-                                current_user = reservation.user.username
-                                reserved_since = reservation.start_time.isoformat()
-                        
-                        results.append({
-                            'id': spot.id,
-                            'lot_name': lot.prime_location_name,
-                            'location': lot.address,
-                            'is_available': spot.status == 'A',
-                            'current_user': current_user,
-                            'reserved_since': reserved_since
-                        })
+                for (spot_id, spot_number, status, lot_id, lot_name, address,
+                     reservation_id, parked_at, vehicle_number, username) in rows:
+                    results.append({
+                        'id': spot_id,
+                        'spot_number': spot_number,
+                        'lot_id': lot_id,
+                        'lot_name': lot_name,
+                        'location': address,
+                        'is_available': status == 'A',
+                        'current_user': username,
+                        'reserved_since': parked_at.isoformat() if parked_at else None,
+                        'reservation_id': reservation_id,
+                        'vehicle_number': vehicle_number
+                    })
+                
+                return jsonify({
+                    'status': 'success',
+                    'data': results,
+                    'count': len(results),
+                    'pagination': pagination
+                }), 200
             
             return jsonify({
                 'status': 'success',
@@ -730,6 +1133,8 @@ def create_routes(app):
                 'count': len(results)
             }), 200
             
+        except PaginationError as e:
+            return jsonify({'message': str(e)}), 400
         except Exception as e:
             return jsonify({'message': str(e)}), 500
     
@@ -747,25 +1152,10 @@ def create_routes(app):
             if search_type not in ['lots', 'spots']:
                 return jsonify({'message': 'Search type must be "lots" or "spots"'}), 400
             
-            # Make search query more flexible - convert to lowercase for case-insensitive search
-            search_pattern = f'%{search_query.lower()}%'
-            
             if search_type == 'lots':
-                # Search parking lots with more flexible matching
-                lots = ParkingLot.query.filter(
-                    db.or_(
-                        db.func.lower(ParkingLot.prime_location_name).like(search_pattern),
-                        db.func.lower(ParkingLot.address).like(search_pattern),
-                        ParkingLot.pin_code.like(search_pattern)
-                    )
-                ).all()
-                
+                # Ranked full-text match; availability comes from the lot counters
                 results = []
-                for lot in lots:
-                    available_spots = ParkingSpot.query.filter_by(
-                        lot_id=lot.id, 
-                        status='A'
-                    ).count()
+                for lot in search.search_lots(search_query):
                     results.append({
                         'id': lot.id,
                         'type': 'lot',
@@ -774,21 +1164,18 @@ def create_routes(app):
                         'pin_code': lot.pin_code,
                         'price_per_hour': lot.price_per_hour,
                         'number_of_spots': lot.number_of_spots,
-                        'available_spots_count': available_spots
+                        'available_spots_count': lot.available_spots
                     })
             
             else:  # search_type == 'spots'
-                # Search parking spots with their lot information - more flexible matching
+                # Spots whose number matches, or that belong to a lot matching the full-text index
+                spot_filters = [db.func.lower(ParkingSpot.spot_number).like(f'%{search_query.lower()}%')]
+                lot_ids = search.matching_lot_ids(search_query)
+                if lot_ids is not None:
+                    spot_filters.append(ParkingSpot.lot_id.in_(lot_ids))
                 spots = db.session.query(ParkingSpot, ParkingLot).join(
                     ParkingLot, ParkingSpot.lot_id == ParkingLot.id
-                ).filter(
-                    db.or_(
-                        db.func.lower(ParkingSpot.spot_number).like(search_pattern),
-                        db.func.lower(ParkingLot.prime_location_name).like(search_pattern),
-                        db.func.lower(ParkingLot.address).like(search_pattern),
-                        ParkingLot.pin_code.like(search_pattern)
-                    )
-                ).all()
+                ).filter(db.or_(*spot_filters)).all()
                 
                 results = []
                 for spot, lot in spots:
@@ -814,128 +1201,42 @@ def create_routes(app):
         except Exception as e:
             return jsonify({'message': str(e)}), 500
     
+    @app.route('/api/search/suggest', methods=['GET'])
+    @user_required
+    def search_suggest():
+        """Autocomplete lot names, pin codes and addresses from the in-memory prefix index"""
+        query = request.args.get('q', '').strip()
+        try:
+            limit = min(int(request.args.get('limit', SUGGEST_DEFAULT_LIMIT)), SUGGEST_MAX_LIMIT)
+        except ValueError:
+            return jsonify({'message': 'limit must be an integer'}), 400
+        
+        try:
+            suggestions = suggest_index.suggest(query, limit=limit) if query else []
+            return jsonify({
+                'status': 'success',
+                'data': suggestions,
+                'count': len(suggestions)
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'message': str(e)}), 500
+    
     # ==================== SUMMARY ENDPOINTS ====================
     
     @app.route('/api/admin/summary', methods=['GET'])
     @admin_required
     def admin_summary():
-        """Admin summary dashboard with analytics"""
+        """Admin summary dashboard with analytics (?start=&end=&granularity=day|week|month)"""
+        try:
+            start, end, granularity, explicit_range = analytics.parse_range(request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
         try:
-            # Get total revenue
-            total_revenue = db.session.query(
-                db.func.sum(Reservation.parking_cost)
-            ).filter(
-                Reservation.leaving_timestamp.isnot(None)
-            ).scalar() or 0
-            
-            # Get average occupancy
-            total_spots = ParkingSpot.query.count()
-            occupied_spots = ParkingSpot.query.filter_by(status='O').count()
-            avg_occupancy = round((occupied_spots / total_spots * 100), 2) if total_spots > 0 else 0
-            
-            # Get active users count
-            active_users = User.query.filter_by(is_active=True, role='user').count()
-            
-            # Get average parking duration
-            avg_duration_query = db.session.query(
-                db.func.avg(
-                    db.func.extract('epoch', Reservation.leaving_timestamp - Reservation.parking_timestamp) / 3600
-                )
-            ).filter(
-                Reservation.leaving_timestamp.isnot(None)
-            ).scalar()
-            avg_duration = round(avg_duration_query, 2) if avg_duration_query else 0
-            
-            # Revenue by parking lot
-            revenue_by_lot = {}
-            revenue_results = db.session.query(
-                ParkingLot.prime_location_name,
-                db.func.sum(Reservation.parking_cost).label('total_revenue')
-            ).join(
-                ParkingSpot, ParkingLot.id == ParkingSpot.lot_id
-            ).join(
-                Reservation, ParkingSpot.id == Reservation.spot_id
-            ).filter(
-                Reservation.leaving_timestamp.isnot(None)
-            ).group_by(ParkingLot.id).all()
-            
-            for lot_name, revenue in revenue_results:
-                revenue_by_lot[lot_name] = float(revenue) if revenue else 0
-            
-            # Occupancy by parking lot
-            occupancy_by_lot = []
-            lots = ParkingLot.query.all()
-            for lot in lots:
-                occupied = ParkingSpot.query.filter_by(lot_id=lot.id, status='O').count()
-                available = ParkingSpot.query.filter_by(lot_id=lot.id, status='A').count()
-                total = occupied + available
-                occupancy_percentage = round((occupied / total * 100), 2) if total > 0 else 0
-                
-                occupancy_by_lot.append({
-                    'name': lot.prime_location_name,
-                    'occupied': occupied,
-                    'available': available,
-                    'occupancy_percentage': occupancy_percentage
-                })
-            
-            # Monthly revenue trend (last 6 months)
-            monthly_revenue = []
-            from datetime import datetime, timedelta
-            import calendar
-            
-            current_date = datetime.now()
-            for i in range(6):
-                # Calculate start of month
-                if i == 0:
-                    month_start = current_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                else:
-                    # Go back i months
-                    year = current_date.year
-                    month = current_date.month - i
-                    while month <= 0:
-                        month += 12
-                        year -= 1
-                    month_start = datetime(year, month, 1)
-                
-                # Calculate end of month
-                if month_start.month == 12:
-                    month_end = month_start.replace(year=month_start.year + 1, month=1)
-                else:
-                    month_end = month_start.replace(month=month_start.month + 1)
-                
-                month_revenue = db.session.query(
-                    db.func.sum(Reservation.parking_cost)
-                ).filter(
-                    Reservation.leaving_timestamp >= month_start,
-                    Reservation.leaving_timestamp < month_end,
-                    Reservation.leaving_timestamp.isnot(None)
-                ).scalar() or 0
-                
-                month_reservations = Reservation.query.filter(
-                    Reservation.parking_timestamp >= month_start,
-                    Reservation.parking_timestamp < month_end
-                ).count()
-                
-                monthly_revenue.append({
-                    'month': month_start.strftime('%B %Y'),
-                    'revenue': float(month_revenue),
-                    'reservations': month_reservations
-                })
-            
-            # Reverse to show oldest to newest
-            monthly_revenue.reverse()
-            
             return jsonify({
                 'status': 'success',
-                'data': {
-                    'total_revenue': float(total_revenue),
-                    'avg_occupancy': avg_occupancy,
-                    'active_users': active_users,
-                    'avg_duration': avg_duration,
-                    'revenue_by_lot': revenue_by_lot,
-                    'occupancy_by_lot': occupancy_by_lot,
-                    'monthly_revenue': monthly_revenue
-                }
+                'data': analytics.admin_summary(start, end, granularity, range_totals=explicit_range)
             }), 200
             
         except Exception as e:
@@ -949,166 +1250,15 @@ def create_routes(app):
         try:
             user_id = int(get_jwt_identity())
             
-            # Get user's total reservations
-            total_reservations = Reservation.query.filter_by(user_id=user_id).count()
-            
-            # Get user's active reservations
-            active_reservations = Reservation.query.filter_by(
-                user_id=user_id,
-                leaving_timestamp=None
-            ).count()
-            
-            # Get user's completed reservations
-            completed_reservations = Reservation.query.filter(
-                Reservation.user_id == user_id,
-                Reservation.leaving_timestamp.isnot(None)
-            ).count()
-            
-            # Get user's total spending
-            total_spending = db.session.query(
-                db.func.sum(Reservation.parking_cost)
-            ).filter(
-                Reservation.user_id == user_id,
-                Reservation.leaving_timestamp.isnot(None)
-            ).scalar() or 0
-            
-            # Get user's total hours parked
-            total_hours = db.session.query(
-                db.func.sum(
-                    db.func.extract('epoch', Reservation.leaving_timestamp - Reservation.parking_timestamp) / 3600
-                )
-            ).filter(
-                Reservation.user_id == user_id,
-                Reservation.leaving_timestamp.isnot(None)
-            ).scalar() or 0
-            
-            # Get user's favorite parking lot (most used)
-            favorite_lot_result = db.session.query(
-                ParkingLot.prime_location_name,
-                db.func.count(Reservation.id).label('usage_count')
-            ).join(
-                ParkingSpot, ParkingLot.id == ParkingSpot.lot_id
-            ).join(
-                Reservation, ParkingSpot.id == Reservation.spot_id
-            ).filter(
-                Reservation.user_id == user_id
-            ).group_by(ParkingLot.id).order_by(
-                db.func.count(Reservation.id).desc()
-            ).first()
-            
-            favorite_lot = favorite_lot_result[0] if favorite_lot_result else 'N/A'
-            
-            # Get monthly usage (last 6 months)
-            monthly_usage = []
-            from datetime import datetime, timedelta
-            import calendar
-            
-            current_date = datetime.now()
-            for i in range(6):
-                # Calculate start of month
-                if i == 0:
-                    month_start = current_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                else:
-                    # Go back i months
-                    year = current_date.year
-                    month = current_date.month - i
-                    while month <= 0:
-                        month += 12
-                        year -= 1
-                    month_start = datetime(year, month, 1)
-                
-                # Calculate end of month
-                if month_start.month == 12:
-                    month_end = month_start.replace(year=month_start.year + 1, month=1)
-                else:
-                    month_end = month_start.replace(month=month_start.month + 1)
-                
-                month_spending = db.session.query(
-                    db.func.sum(Reservation.parking_cost)
-                ).filter(
-                    Reservation.user_id == user_id,
-                    Reservation.leaving_timestamp >= month_start,
-                    Reservation.leaving_timestamp < month_end,
-                    Reservation.leaving_timestamp.isnot(None)
-                ).scalar() or 0
-                
-                month_hours = db.session.query(
-                    db.func.sum(
-                        db.func.extract('epoch', Reservation.leaving_timestamp - Reservation.parking_timestamp) / 3600
-                    )
-                ).filter(
-                    Reservation.user_id == user_id,
-                    Reservation.leaving_timestamp >= month_start,
-                    Reservation.leaving_timestamp < month_end,
-                    Reservation.leaving_timestamp.isnot(None)
-                ).scalar() or 0
-                
-                monthly_usage.append({
-                    'month': month_start.strftime('%B %Y'),
-                    'hours': round(float(month_hours), 2),
-                    'spent': float(month_spending)
-                })
-            
-            # Reverse to show oldest to newest
-            monthly_usage.reverse()
-            
-            # Get locations used by user
-            locations_used = []
-            location_results = db.session.query(
-                ParkingLot.prime_location_name,
-                db.func.count(Reservation.id).label('usage_count'),
-                db.func.sum(
-                    db.func.extract('epoch', Reservation.leaving_timestamp - Reservation.parking_timestamp) / 3600
-                ).label('total_hours')
-            ).join(
-                ParkingSpot, ParkingLot.id == ParkingSpot.lot_id
-            ).join(
-                Reservation, ParkingSpot.id == Reservation.spot_id
-            ).filter(
-                Reservation.user_id == user_id,
-                Reservation.leaving_timestamp.isnot(None)
-            ).group_by(ParkingLot.id).all()
-            
-            for name, count, hours in location_results:
-                locations_used.append({
-                    'name': name,
-                    'count': count,
-                    'hours': round(float(hours), 2) if hours else 0
-                })
-            
-            # Get user's recent reservations (last 5)
-            recent_reservations_query = db.session.query(Reservation).filter(
-                Reservation.user_id == user_id
-            ).order_by(Reservation.parking_timestamp.desc()).limit(5).all()
-            
-            recent_reservations = []
-            for reservation in recent_reservations_query:
-                spot = ParkingSpot.query.get(reservation.spot_id)
-                lot = ParkingLot.query.get(spot.lot_id) if spot else None
-                
-                recent_reservations.append({
-                    'id': reservation.id,
-                    'location': lot.prime_location_name if lot else 'Unknown',
-                    'parking_timestamp': reservation.parking_timestamp.isoformat(),
-                    'leaving_timestamp': reservation.leaving_timestamp.isoformat() if reservation.leaving_timestamp else None,
-                    'duration_hours': round(reservation.get_duration(), 2),
-                    'parking_cost': float(reservation.parking_cost),
-                    'is_active': reservation.is_active()
-                })
+            # Read from the per-user rollups, cached until the user's next booking or release
+            summary = cached_view(
+                'user_summary', f'user_summary:{user_id}', [user_tag(user_id)], 60,
+                lambda: user_stats.user_dashboard(user_id)
+            )
             
             return jsonify({
                 'status': 'success',
-                'data': {
-                    'total_reservations': total_reservations,
-                    'active_reservations': active_reservations,
-                    'completed_reservations': completed_reservations,
-                    'total_spending': float(total_spending),
-                    'total_hours': round(float(total_hours), 2),
-                    'favorite_lot': favorite_lot,
-                    'monthly_usage': monthly_usage,
-                    'locations_used': locations_used,
-                    'recent_reservations': recent_reservations
-                }
+                'data': summary
             }), 200
             
         except Exception as e:
@@ -1266,6 +1416,18 @@ def create_routes(app):
         except Exception as e:
             return jsonify({'message': str(e)}), 500
     
+    @app.route('/api/admin/auth/status', methods=['GET'])
+    @admin_required
+    def get_auth_status_route():
+        """Get password hashing pool metrics (Admin only)"""
+        try:
+            return jsonify({
+                'message': 'Auth status retrieved successfully',
+                'data': {'password_hashing': password_hasher.get_stats()}
+            }), 200
+        except Exception as e:
+            return jsonify({'message': str(e)}), 500
+    
     @app.route('/api/admin/cache/clear', methods=['POST'])
     @admin_required
     def clear_cache():
@@ -0,0 +1,146 @@
+import threading
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from application.database import db
+
+ACTIVE_STATUSES = ('booked', 'checked_in')  # bookings that still hold their window
+DEFAULT_HOLD = timedelta(minutes=60)  # see ADVANCE_BOOKING_HOLD_MINUTES
+
+
+class SpotIntervals:
+    """
+    Booked windows [start, end) of one spot. Windows on a spot never overlap,
+    so sorting by start also sorts by end and one bisect answers "is it free".
+    """
+
+    __slots__ = ('starts', 'ends', 'booking_ids')
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.booking_ids = []
+
+    def is_free(self, start, end):
+        """Whether no window overlaps [start, end)"""
+        i = bisect_right(self.ends, start)  # first window ending after start
+        return i == len(self.ends) or self.starts[i] >= end
+
+    def add(self, start, end, booking_id):
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.booking_ids.insert(i, booking_id)
+
+    def remove(self, booking_id):
+        if booking_id in self.booking_ids:
+            i = self.booking_ids.index(booking_id)
+            del self.starts[i], self.ends[i], self.booking_ids[i]
+
+    def prune(self, before):
+        """Forget windows that ended before the given time"""
+        i = bisect_right(self.ends, before)
+        if i:
+            del self.starts[:i], self.ends[:i], self.booking_ids[:i]
+
+    def __len__(self):
+        return len(self.starts)
+
+
+class BookingSchedule:
+    """
+    Thread-safe in-memory index of advance bookings: lot id -> spot id -> SpotIntervals.
+    Only spots with upcoming bookings are tracked, so "which spots of lot X are
+    busy during [t1, t2)" costs one bisect per booked spot instead of a scan of
+    every booking. The advance_bookings table stays authoritative; a lot is
+    re-read whenever a write finds the index out of date.
+    """
+
+    def __init__(self):
+        self._lots = {}
+        self._lock = threading.Lock()
+
+    def _rows(self, now, lot_id=None):
+        from application.models import AdvanceBooking
+
+        query = db.session.query(
+            AdvanceBooking.lot_id, AdvanceBooking.spot_id, AdvanceBooking.start_time,
+            AdvanceBooking.end_time, AdvanceBooking.id
+        ).filter(
+            AdvanceBooking.status.in_(ACTIVE_STATUSES),
+            AdvanceBooking.end_time > now
+        )
+        if lot_id is not None:
+            query = query.filter(AdvanceBooking.lot_id == lot_id)
+        return query.order_by(AdvanceBooking.start_time).all()
+
+    @staticmethod
+    def _build(rows):
+        lots = {}
+        for lot_id, spot_id, start, end, booking_id in rows:
+            lots.setdefault(lot_id, {}).setdefault(spot_id, SpotIntervals()).add(start, end, booking_id)
+        return lots
+
+    def load(self, now=None):
+        """Index every booking that has not ended yet"""
+        lots = self._build(self._rows(now or datetime.utcnow()))
+        with self._lock:
+            self._lots = lots
+
+    def reload_lot(self, lot_id, now=None):
+        """Re-read the upcoming bookings of one lot from the database"""
+        spots = self._build(self._rows(now or datetime.utcnow(), lot_id)).get(lot_id, {})
+        with self._lock:
+            self._lots[lot_id] = spots
+
+    def add(self, lot_id, spot_id, start, end, booking_id):
+        with self._lock:
+            intervals = self._lots.setdefault(lot_id, {}).setdefault(spot_id, SpotIntervals())
+            intervals.prune(datetime.utcnow())
+            intervals.add(start, end, booking_id)
+
+    def remove(self, lot_id, spot_id, booking_id):
+        with self._lock:
+            intervals = self._lots.get(lot_id, {}).get(spot_id)
+            if intervals is not None:
+                intervals.remove(booking_id)
+                if not intervals:
+                    del self._lots[lot_id][spot_id]
+
+    def drop_lot(self, lot_id):
+        """Forget a deleted lot"""
+        with self._lock:
+            self._lots.pop(lot_id, None)
+
+    def is_free(self, lot_id, spot_id, start, end):
+        with self._lock:
+            intervals = self._lots.get(lot_id, {}).get(spot_id)
+            return intervals is None or intervals.is_free(start, end)
+
+    def busy_spots(self, lot_id, start, end):
+        """Ids of the lot's spots with a booking overlapping [start, end)"""
+        with self._lock:
+            return {
+                spot_id for spot_id, intervals in self._lots.get(lot_id, {}).items()
+                if not intervals.is_free(start, end)
+            }
+
+    def busy_counts(self, lot_id, slots):
+        """Number of booked spots in each (start, end) slot, in one pass over the lot's booked spots"""
+        counts = [0] * len(slots)
+        with self._lock:
+            for intervals in self._lots.get(lot_id, {}).values():
+                for i, (start, end) in enumerate(slots):
+                    if not intervals.is_free(start, end):
+                        counts[i] += 1
+        return counts
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'lots': len(self._lots),
+                'spots': sum(len(spots) for spots in self._lots.values()),
+                'bookings': sum(len(intervals) for spots in self._lots.values() for intervals in spots.values())
+            }
+
+
+booking_schedule = BookingSchedule()
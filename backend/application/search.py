@@ -0,0 +1,170 @@
+import re
+from application.database import db
+from application.models import ParkingLot
+
+# Weights for bm25 / ts_rank: a hit in the name outranks one in the address or pin code
+NAME_WEIGHT, ADDRESS_WEIGHT, PIN_WEIGHT = 10.0, 4.0, 1.0
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS parking_lots_fts USING fts5(
+        prime_location_name, address, pin_code,
+        content='parking_lots', content_rowid='id',
+        tokenize='unicode61', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS parking_lots_fts_insert AFTER INSERT ON parking_lots BEGIN
+        INSERT INTO parking_lots_fts(rowid, prime_location_name, address, pin_code)
+        VALUES (new.id, new.prime_location_name, new.address, new.pin_code);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS parking_lots_fts_delete AFTER DELETE ON parking_lots BEGIN
+        INSERT INTO parking_lots_fts(parking_lots_fts, rowid, prime_location_name, address, pin_code)
+        VALUES ('delete', old.id, old.prime_location_name, old.address, old.pin_code);
+    END
+    """,
+    # Only fire for the searchable columns, so counter updates on every booking leave the index alone
+    """
+    CREATE TRIGGER IF NOT EXISTS parking_lots_fts_update
+    AFTER UPDATE OF prime_location_name, address, pin_code ON parking_lots BEGIN
+        INSERT INTO parking_lots_fts(parking_lots_fts, rowid, prime_location_name, address, pin_code)
+        VALUES ('delete', old.id, old.prime_location_name, old.address, old.pin_code);
+        INSERT INTO parking_lots_fts(rowid, prime_location_name, address, pin_code)
+        VALUES (new.id, new.prime_location_name, new.address, new.pin_code);
+    END
+    """
+]
+
+_POSTGRES_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce({row}prime_location_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce({row}address, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce({row}pin_code, '')), 'C')"
+)
+
+_POSTGRES_DDL = [
+    'ALTER TABLE parking_lots ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    'CREATE INDEX IF NOT EXISTS ix_parking_lots_search_vector ON parking_lots USING GIN (search_vector)',
+    """
+    CREATE OR REPLACE FUNCTION parking_lots_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {vector};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """.format(vector=_POSTGRES_VECTOR.format(row='NEW.')),
+    'DROP TRIGGER IF EXISTS parking_lots_search_vector_trigger ON parking_lots',
+    """
+    CREATE TRIGGER parking_lots_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF prime_location_name, address, pin_code ON parking_lots
+    FOR EACH ROW EXECUTE FUNCTION parking_lots_search_vector_update()
+    """
+]
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def init_search_index():
+    """Create the full-text index and its sync triggers if missing, backfilling existing lots"""
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        created = not db.session.execute(db.text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'parking_lots_fts'"
+        )).first()
+        for statement in _SQLITE_DDL:
+            db.session.execute(db.text(statement))
+        if created:
+            rebuild_search_index()
+    elif dialect == 'postgresql':
+        for statement in _POSTGRES_DDL:
+            db.session.execute(db.text(statement))
+        db.session.execute(db.text(
+            'UPDATE parking_lots SET search_vector = {vector} WHERE search_vector IS NULL'.format(
+                vector=_POSTGRES_VECTOR.format(row='')
+            )
+        ))
+    db.session.commit()
+
+
+def rebuild_search_index():
+    """Repopulate the full-text index from parking_lots"""
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        db.session.execute(db.text("INSERT INTO parking_lots_fts(parking_lots_fts) VALUES ('rebuild')"))
+    elif dialect == 'postgresql':
+        db.session.execute(db.text('UPDATE parking_lots SET search_vector = {vector}'.format(
+            vector=_POSTGRES_VECTOR.format(row='')
+        )))
+
+
+def is_search_index_object(object, name, type_, reflected, compare_to):
+    """Alembic include_object hook: leave the full-text index, managed here, out of autogenerate"""
+    if type_ == 'table' and name.startswith('parking_lots_fts'):
+        return False
+    if type_ in ('column', 'index') and name in ('search_vector', 'ix_parking_lots_search_vector'):
+        return False
+    return True
+
+
+def search_terms(text):
+    """Lower-cased word tokens of a user query; punctuation and FTS operators are dropped"""
+    return re.findall(r'\w+', text.lower())
+
+
+def lot_search_query(text):
+    """
+    Query for ParkingLot rows matching every term of text (as a word prefix),
+    best match first. Returns None when text has no searchable terms.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return None
+
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        fts = db.table('parking_lots_fts', db.column('rowid'))
+        fts_ref = db.literal_column('parking_lots_fts')
+        match = ' '.join(f'"{term}"*' for term in terms)
+        rank = db.func.bm25(fts_ref, NAME_WEIGHT, ADDRESS_WEIGHT, PIN_WEIGHT)
+        return ParkingLot.query.join(fts, fts.c.rowid == ParkingLot.id).filter(
+            fts_ref.op('MATCH')(match)
+        ).order_by(rank, ParkingLot.id)
+
+    if dialect == 'postgresql':
+        vector = db.literal_column('parking_lots.search_vector')
+        tsquery = db.func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+        # ts_rank weights are ordered {D, C, B, A}; pin code is C, address B, name A
+        weights = db.literal(f'{{0.1, {PIN_WEIGHT / NAME_WEIGHT}, {ADDRESS_WEIGHT / NAME_WEIGHT}, 1.0}}')
+        rank = db.func.ts_rank(db.cast(weights, db.ARRAY(db.Float)), vector, tsquery)
+        return ParkingLot.query.filter(vector.op('@@')(tsquery)).order_by(rank.desc(), ParkingLot.id)
+
+    # No full-text support: fall back to substring matching
+    return ParkingLot.query.filter(*[
+        db.or_(
+            db.func.lower(ParkingLot.prime_location_name).like(f'%{term}%'),
+            db.func.lower(ParkingLot.address).like(f'%{term}%'),
+            ParkingLot.pin_code.like(f'%{term}%')
+        )
+        for term in terms
+    ]).order_by(ParkingLot.id)
+
+
+def search_lots(text, limit=None):
+    """Ranked lots matching text; availability comes from the lot counters, so this is one query"""
+    query = lot_search_query(text)
+    if query is None:
+        return []
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def matching_lot_ids(text):
+    """Subquery of lot ids matching text, for filtering other tables"""
+    query = lot_search_query(text)
+    if query is None:
+        return None
+    return query.order_by(None).with_entities(ParkingLot.id)
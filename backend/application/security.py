@@ -1,18 +1,27 @@
 from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt
 from functools import wraps
-from flask import jsonify
+from flask import jsonify, g, current_app
+from application.cache import TTLCache, app_cache
+from application.revocation import revocation_store
+from application.passwords import password_hasher
+from application.database import db
 from application.models import User
 
 # Initialize JWT
 jwt = JWTManager()
 
-# Store for blacklisted tokens (in production, use Redis)
-blacklisted_tokens = set()
+# (role, is_active) per user id. Each worker keeps its own copy; changes are
+# announced on the cache's pub/sub channel so the other workers drop theirs, and
+# entries expire after USER_STATUS_TTL seconds in case an announcement is lost
+USER_STATUS_TTL = 30
+user_status_cache = TTLCache(default_ttl=USER_STATUS_TTL, max_entries=100_000, max_bytes=16 * 1024 * 1024)
+app_cache.subscribe('user_status_changed', lambda user_id: user_status_cache.delete(user_id))
+app_cache.subscribe('resync', lambda: user_status_cache.clear())
 
 @jwt.token_in_blocklist_loader
 def check_if_token_revoked(jwt_header, jwt_payload):
-    """Check if token is in blacklist"""
-    return jwt_payload['jti'] in blacklisted_tokens
+    """Check if token was revoked (logged out)"""
+    return revocation_store.is_revoked(jwt_payload['jti'])
 
 @jwt.expired_token_loader
 def expired_token_callback(jwt_header, jwt_payload):
@@ -29,15 +38,57 @@ def missing_token_callback(error):
     """Handle missing token"""
     return jsonify({'message': 'Authorization token is required'}), 401
 
+def get_user_status(user_id):
+    """(role, is_active) of a user from the status cache, reading the users table on a miss"""
+    status = user_status_cache.get(user_id)
+    if status is None:
+        row = db.session.query(User.role, User.is_active).filter(User.id == user_id).first()
+        status = (row.role, bool(row.is_active)) if row is not None else (None, False)
+        user_status_cache.set(user_id, status, ttl=current_app.config.get('USER_STATUS_TTL', USER_STATUS_TTL))
+    return status
+
+def invalidate_user_status(user_id):
+    """Forget a user's cached status, in every worker, after their role or active flag changed"""
+    user_status_cache.delete(user_id)
+    app_cache.publish_event('user_status_changed', user_id=user_id)
+
+def _authorize(admin):
+    """
+    Check the current token's user against their status; returns an error
+    response or None. Role and active status travel in the token as claims,
+    so the common case needs no query: the status only has to confirm that
+    the user has not been deactivated or had their role changed since.
+    """
+    claims = get_jwt()
+    denied = jsonify({'message': 'Admin access required' if admin else 'Access denied'}), 403
+    if claims.get('active') is False:
+        return denied
+    user_id = int(get_jwt_identity())  # Convert back to int
+    role, active = get_user_status(user_id)
+    if not active:
+        return denied
+    if 'role' in claims and claims['role'] != role:
+        return jsonify({'message': 'Your role has changed, please log in again'}), 401
+    if admin and role != 'admin':
+        return denied
+    g.current_user_id = user_id
+    g.current_user_role = role
+    return None
+
+def current_user():
+    """The authenticated user, loaded at most once per request"""
+    if 'current_user' not in g:
+        g.current_user = db.session.get(User, int(get_jwt_identity()))
+    return g.current_user
+
 def admin_required(f):
     """Decorator to require admin role"""
     @wraps(f)
     @jwt_required()
     def decorated_function(*args, **kwargs):
-        current_user_id = int(get_jwt_identity())  # Convert back to int
-        user = User.query.get(current_user_id)
-        if not user or not user.is_admin():
-            return jsonify({'message': 'Admin access required'}), 403
+        error = _authorize(admin=True)
+        if error is not None:
+            return error
         return f(*args, **kwargs)
     return decorated_function
 
@@ -46,17 +97,50 @@ def user_required(f):
     @wraps(f)
     @jwt_required()
     def decorated_function(*args, **kwargs):
-        current_user_id = int(get_jwt_identity())  # Convert back to int
-        user = User.query.get(current_user_id)
-        if not user or not user.is_active:
-            return jsonify({'message': 'Access denied'}), 403
+        error = _authorize(admin=False)
+        if error is not None:
+            return error
         return f(*args, **kwargs)
     return decorated_function
 
+def authenticate(username, password):
+    """
+    The active user with these credentials, or None. Hashes run on the password
+    hasher's bounded pool (PasswordQueueFull when it is saturated), once per
+    attempt, also for unknown usernames so timing does not reveal which exist.
+    No database connection is held while waiting for the hash. A hash made
+    with outdated parameters is replaced after a successful check.
+    """
+    row = db.session.execute(
+        db.select(User.id, User.password_hash, User.is_active).where(User.username == username)
+    ).first()
+    db.session.rollback()  # hand the connection back to the pool during the hash
+    if row is None:
+        return password_hasher.verify_unknown(password) or None
+    user_id, password_hash, is_active = row
+    if not password_hasher.verify(password_hash, password) or not is_active:
+        return None
+
+    if password_hasher.needs_rehash(password_hash):
+        try:
+            new_hash = password_hasher.hash(password)
+            # Conditional, so a password changed meanwhile is not overwritten
+            db.session.execute(
+                db.update(User).where(User.id == user_id, User.password_hash == password_hash)
+                .values(password_hash=new_hash)
+            )
+            db.session.commit()
+        except Exception as e:
+            # The login itself succeeded; the upgrade is retried next time
+            db.session.rollback()
+            print(f"Could not rehash password of user {user_id}: {str(e)}")
+    return db.session.get(User, user_id)
+
 def generate_tokens(user):
-    """Generate access and refresh tokens for user"""
-    access_token = create_access_token(identity=str(user.id))  # Convert to string
-    refresh_token = create_refresh_token(identity=str(user.id))  # Convert to string
+    """Generate access and refresh tokens for user, carrying its role and active status as claims"""
+    claims = {'role': user.role, 'active': bool(user.is_active)}
+    access_token = create_access_token(identity=str(user.id), additional_claims=claims)  # Convert to string
+    refresh_token = create_refresh_token(identity=str(user.id), additional_claims=claims)  # Convert to string
     return {
         'access_token': access_token,
         'refresh_token': refresh_token,
@@ -64,6 +148,6 @@ def generate_tokens(user):
     }
 
 def revoke_token():
-    """Add current token to blacklist"""
-    jti = get_jwt()['jti']
-    blacklisted_tokens.add(jti)
\ No newline at end of file
+    """Revoke the current token for the rest of its lifetime"""
+    claims = get_jwt()
+    revocation_store.revoke(claims['jti'], claims['exp'])
\ No newline at end of file
@@ -0,0 +1,113 @@
+from datetime import datetime
+from application.database import db
+from application.models import User, ParkingLot, ParkingSpot, Reservation
+from application.pagination import int_arg
+
+
+def reservation_rows_query(with_user=False):
+    """Reservations joined with their spot and lot (and user) in a single SELECT"""
+    entities = [Reservation, ParkingSpot, ParkingLot]
+    if with_user:
+        entities.append(User)
+    query = db.session.query(*entities).outerjoin(
+        ParkingSpot, Reservation.spot_id == ParkingSpot.id
+    ).outerjoin(
+        ParkingLot, ParkingSpot.lot_id == ParkingLot.id
+    )
+    if with_user:
+        query = query.outerjoin(User, Reservation.user_id == User.id)
+    return query
+
+
+def spot_occupancy_query(lot_ids):
+    """
+    Every spot of the given lots (an id list or subquery) with its lot and, when
+    occupied, the active reservation and its user, in a single SELECT
+    """
+    return db.session.query(
+        ParkingSpot.id,
+        ParkingSpot.spot_number,
+        ParkingSpot.status,
+        ParkingLot.id,
+        ParkingLot.prime_location_name,
+        ParkingLot.address,
+        Reservation.id,
+        Reservation.parking_timestamp,
+        Reservation.vehicle_number,
+        User.username
+    ).join(
+        ParkingLot, ParkingSpot.lot_id == ParkingLot.id
+    ).outerjoin(
+        Reservation, db.and_(Reservation.spot_id == ParkingSpot.id, Reservation.leaving_timestamp.is_(None))
+    ).outerjoin(
+        User, Reservation.user_id == User.id
+    ).filter(ParkingSpot.lot_id.in_(lot_ids))
+
+
+def apply_reservation_filters(query, args):
+    """Narrow a reservation query by lot_id, user_id, start/end (ISO dates) and active=true"""
+    lot_id = int_arg('lot_id', args)
+    user_id = int_arg('user_id', args)
+    if lot_id is not None:
+        query = query.filter(ParkingSpot.lot_id == lot_id)
+    if user_id is not None:
+        query = query.filter(Reservation.user_id == user_id)
+
+    for name, compare in (('start', Reservation.parking_timestamp.__ge__), ('end', Reservation.parking_timestamp.__lt__)):
+        value = args.get(name)
+        if value:
+            try:
+                query = query.filter(compare(datetime.fromisoformat(value)))
+            except ValueError:
+                raise ValueError(f'{name} must be an ISO date or datetime')
+
+    if args.get('active', '').lower() == 'true':
+        query = query.filter(Reservation.leaving_timestamp.is_(None))
+    return query
+
+
+class ReservationSerializer:
+    """
+    Serializes joined reservation rows. Spot, lot and user fragments are
+    built once per identity and reused, since heavy users park in the same
+    few lots over and over.
+    """
+
+    def __init__(self):
+        self._spots = {}
+        self._lots = {}
+        self._users = {}
+
+    def serialize(self, reservation, spot=None, lot=None, user=None):
+        data = reservation.to_dict()
+        if user is not None:
+            data.update(self._user_fields(user))
+        if spot is not None and lot is not None:
+            data.update(self._lot_fields(lot))
+            data.update(self._spot_fields(spot))
+        return data
+
+    def serialize_rows(self, rows):
+        return [self.serialize(*row) for row in rows]
+
+    def _lot_fields(self, lot):
+        fields = self._lots.get(lot.id)
+        if fields is None:
+            fields = self._lots[lot.id] = {
+                'parking_lot_name': lot.prime_location_name,
+                'parking_lot_address': lot.address,
+                'price_per_hour': lot.price_per_hour
+            }
+        return fields
+
+    def _spot_fields(self, spot):
+        fields = self._spots.get(spot.id)
+        if fields is None:
+            fields = self._spots[spot.id] = {'spot_number': spot.spot_number}
+        return fields
+
+    def _user_fields(self, user):
+        fields = self._users.get(user.id)
+        if fields is None:
+            fields = self._users[user.id] = {'user_name': user.username}
+        return fields
@@ -0,0 +1,190 @@
+import bisect
+import re
+import sys
+import threading
+from array import array
+from application.database import db
+
+FIELDS = ('name', 'pin_code', 'address')  # suggestion priority
+MAX_TOKEN_LENGTH = 32
+MAX_TOKENS_PER_FIELD = {'name': 8, 'pin_code': 1, 'address': 12}
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+MAX_SCAN = 2000  # index entries examined per lookup, whatever the query
+
+
+def tokenize(text, max_tokens=None):
+    """Lower-cased word tokens, truncated and de-duplicated, in order of appearance"""
+    tokens = []
+    for token in re.findall(r'\w+', (text or '').lower()):
+        token = sys.intern(token[:MAX_TOKEN_LENGTH])
+        if token not in tokens:
+            tokens.append(token)
+            if max_tokens is not None and len(tokens) >= max_tokens:
+                break
+    return tokens
+
+
+class FieldIndex:
+    """Sorted unique tokens of one field, each with a sorted array of lot ids"""
+
+    def __init__(self):
+        self.tokens = []
+        self.postings = {}
+
+    def add(self, token, lot_id):
+        lot_ids = self.postings.get(token)
+        if lot_ids is None:
+            bisect.insort(self.tokens, token)
+            self.postings[token] = array('l', (lot_id,))
+        elif not lot_ids or lot_ids[-1] < lot_id:
+            lot_ids.append(lot_id)
+        else:
+            position = bisect.bisect_left(lot_ids, lot_id)
+            if position == len(lot_ids) or lot_ids[position] != lot_id:
+                lot_ids.insert(position, lot_id)
+
+    def remove(self, token, lot_id):
+        lot_ids = self.postings.get(token)
+        if lot_ids is None:
+            return
+        position = bisect.bisect_left(lot_ids, lot_id)
+        if position < len(lot_ids) and lot_ids[position] == lot_id:
+            del lot_ids[position]
+        if not lot_ids:
+            del self.postings[token]
+            del self.tokens[bisect.bisect_left(self.tokens, token)]
+
+    def walk(self, prefix):
+        """Yield lot ids whose token starts with prefix, token by token in sorted order"""
+        position = bisect.bisect_left(self.tokens, prefix)
+        while position < len(self.tokens) and self.tokens[position].startswith(prefix):
+            yield from self.postings[self.tokens[position]]
+            position += 1
+
+
+class SuggestIndex:
+    """
+    Thread-safe in-memory prefix index over lot names, pin codes and addresses.
+
+    Each field keeps its distinct tokens in a sorted list with a compact array of
+    lot ids per token, so a lookup is a bisect plus a walk bounded by MAX_SCAN.
+    The total number of (token, lot) entries is capped; once the cap is hit, new
+    lots are indexed by name and pin code only.
+    """
+
+    def __init__(self, max_entries=1_000_000):
+        self.max_entries = max_entries
+        self._fields = {field: FieldIndex() for field in FIELDS}
+        self._lots = {}  # lot_id -> (name, address, pin_code, indexed tokens as ' tok tok\t tok\t tok tok')
+        self._size = 0
+        self._truncated = 0
+        self._lock = threading.Lock()
+
+    def configure(self, max_entries=None):
+        if max_entries is not None:
+            self.max_entries = max_entries
+
+    def load(self):
+        """Build the index from every parking lot in the database"""
+        from application.models import ParkingLot
+
+        rows = db.session.query(
+            ParkingLot.id, ParkingLot.prime_location_name, ParkingLot.address, ParkingLot.pin_code
+        ).order_by(ParkingLot.id).all()
+
+        with self._lock:
+            self._fields = {field: FieldIndex() for field in FIELDS}
+            self._lots = {}
+            self._size = 0
+            self._truncated = 0
+            for lot_id, name, address, pin_code in rows:
+                self._add(lot_id, name, address, pin_code)
+
+    def update_lot(self, lot_id, name, address, pin_code):
+        """Index a new lot or re-index an edited one"""
+        with self._lock:
+            self._remove(lot_id)
+            self._add(lot_id, name, address, pin_code)
+
+    def drop_lot(self, lot_id):
+        """Remove a deleted lot from the index"""
+        with self._lock:
+            self._remove(lot_id)
+
+    def suggest(self, query, limit=DEFAULT_LIMIT):
+        """
+        Up to limit lots with a token starting with the last query term and every
+        earlier term as a word prefix, name matches first.
+        """
+        terms = tokenize(query)
+        if not terms or limit <= 0:
+            return []
+        prefix, others = terms[-1], terms[:-1]
+
+        results, seen, scanned = [], set(), 0
+        with self._lock:
+            for field in FIELDS:
+                for lot_id in self._fields[field].walk(prefix):
+                    scanned += 1
+                    if lot_id not in seen and self._matches_all(lot_id, others):
+                        seen.add(lot_id)
+                        name, address, pin_code, _ = self._lots[lot_id]
+                        results.append({
+                            'id': lot_id,
+                            'prime_location_name': name,
+                            'address': address,
+                            'pin_code': pin_code,
+                            'matched': field
+                        })
+                    if len(results) >= limit or scanned >= MAX_SCAN:
+                        return results
+        return results
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'lots': len(self._lots),
+                'entries': self._size,
+                'distinct_tokens': sum(len(index.tokens) for index in self._fields.values()),
+                'max_entries': self.max_entries,
+                'truncated_lots': self._truncated
+            }
+
+    def _matches_all(self, lot_id, terms):
+        # Every token is preceded by a space, so ' ' + term finds exactly the word prefixes
+        text = self._lots[lot_id][3]
+        return all(' ' + term in text for term in terms)
+
+    def _add(self, lot_id, name, address, pin_code):
+        tokens = (
+            tuple(tokenize(name, MAX_TOKENS_PER_FIELD['name'])),
+            tuple(tokenize(pin_code, MAX_TOKENS_PER_FIELD['pin_code'])),
+            tuple(tokenize(address, MAX_TOKENS_PER_FIELD['address']))
+        )
+        if self._size + sum(len(field_tokens) for field_tokens in tokens) > self.max_entries:
+            tokens = (tokens[0], tokens[1], ())
+            self._truncated += 1
+
+        for field, field_tokens in zip(FIELDS, tokens):
+            for token in field_tokens:
+                self._fields[field].add(token, lot_id)
+            self._size += len(field_tokens)
+        self._lots[lot_id] = (
+            name, address, pin_code, '\t'.join(''.join(' ' + token for token in field_tokens) for field_tokens in tokens)
+        )
+
+    def _remove(self, lot_id):
+        lot = self._lots.pop(lot_id, None)
+        if lot is None:
+            return
+        tokens = [field_text.split() for field_text in lot[3].split('\t')]
+        if not tokens[2] and tokenize(lot[1], 1):
+            self._truncated -= 1
+        for field, field_tokens in zip(FIELDS, tokens):
+            for token in field_tokens:
+                self._fields[field].remove(token, lot_id)
+            self._size -= len(field_tokens)
+
+
+suggest_index = SuggestIndex()
@@ -6,6 +6,11 @@ from app import app  # Import the Flask app
 # Create a simple Celery instance for tasks
 celery = Celery('tasks', broker='memory://', backend='cache+memory://')
 
+
+def has_broker():
+    '''Whether tasks reach a worker; the in-memory broker accepts them but nothing ever runs them'''
+    return not celery.conf.broker_url.startswith('memory://')
+
 @celery.task
 def send_email_task(to_email, subject, body):
     '''Send an email using Flask-Mail and Celery'''
@@ -19,3 +24,38 @@ def send_email_task(to_email, subject, body):
         mail.send(msg)
         print(f'Sent email to: {to_email}')
         return f'Email sent to {to_email}'
+
+
+@celery.task
+def rollup_daily_lot_stats(chunk_days=7):
+    '''Roll every closed day not yet aggregated into daily_lot_stats'''
+    from application.daily_stats import rollup_pending
+    with app.app_context():
+        result = rollup_pending(chunk_days=chunk_days)
+        print(f"Rolled up daily lot stats: {result}")
+        return result
+
+
+@celery.task
+def release_overstayed_reservations(max_hours=None):
+    '''Release reservations parked longer than OVERSTAY_MAX_HOURS, in bounded chunks'''
+    from application.releases import release_overstays
+    with app.app_context():
+        result = release_overstays(max_hours if max_hours is not None else app.config['OVERSTAY_MAX_HOURS'])
+        print(f"Released overstayed reservations: {result}")
+        return result
+
+
+@celery.task(bind=True)
+def import_parking_lots(self, job_id, path):
+    '''Import a spooled lot upload, publishing progress as the task state and on the import job row'''
+    from application.importer import run_spooled_job
+    with app.app_context():
+        def progress(report):
+            self.update_state(state='PROGRESS', meta={
+                key: report[key] for key in ('rows_processed', 'lots_imported', 'spots_created', 'error_count')
+            })
+
+        job = run_spooled_job(job_id, path, on_progress=progress)
+        print(f"Lot import {job_id} {job.status}: {job.lots_imported} lots, {job.error_count} errors")
+        return {'job_id': job_id, 'status': job.status, 'lots_imported': job.lots_imported, 'error_count': job.error_count}
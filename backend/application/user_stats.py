@@ -0,0 +1,217 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from application.analytics import hours_between, time_bucket, bucket_start, next_bucket
+from application.database import db
+from application.models import ParkingLot, ParkingSpot, Reservation, UserStats, UserMonthlyStats
+from application.serializers import reservation_rows_query
+
+
+def _upsert_increment(model, keys, increments):
+    """INSERT the increments as a new row, or add them to the existing row"""
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(**keys, **increments)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={column: table.c[column] + stmt.excluded[column] for column in increments}
+        )
+        db.session.execute(stmt)
+        return
+
+    # Generic fallback: UPDATE, then INSERT if nothing matched
+    result = db.session.execute(
+        db.update(table).where(*[table.c[column] == value for column, value in keys.items()]).values(
+            **{column: table.c[column] + value for column, value in increments.items()}
+        )
+    )
+    if result.rowcount == 0:
+        db.session.execute(db.insert(table).values(**keys, **increments))
+
+
+def ensure_user_stats(user_id):
+    """Backfill the rollups of a user who has none yet (e.g. history from before they existed)"""
+    with db.session.no_autoflush:
+        if db.session.get(UserStats, user_id) is None:
+            rebuild_user_stats([user_id])
+
+
+def record_reservation_started(user_id, count=1):
+    """Count new reservations; call before adding them to the session"""
+    ensure_user_stats(user_id)
+    _upsert_increment(UserStats, {'user_id': user_id}, {'total_reservations': count, 'active_reservations': count})
+
+
+def record_reservations_closed(closed, leaving_timestamp):
+    """Fold a batch of reservations released at leaving_timestamp, as (user_id, lot_id, hours, cost), into the rollups"""
+    month = bucket_start(leaving_timestamp, 'month')
+    per_user = defaultdict(lambda: [0, 0.0, 0.0])
+    per_user_lot = defaultdict(lambda: [0, 0.0, 0.0])
+    for user_id, lot_id, hours, cost in closed:
+        for totals in (per_user[user_id], per_user_lot[user_id, lot_id]):
+            totals[0] += 1
+            totals[1] += hours
+            totals[2] += cost or 0.0
+
+    for user_id, (count, hours, cost) in per_user.items():
+        _upsert_increment(UserStats, {'user_id': user_id}, {
+            'active_reservations': -count,
+            'completed_reservations': count,
+            'total_spent': cost,
+            'total_hours': hours
+        })
+    for (user_id, lot_id), (count, hours, cost) in per_user_lot.items():
+        _upsert_increment(UserMonthlyStats, {
+            'user_id': user_id,
+            'month': month,
+            'lot_id': lot_id
+        }, {'reservations': count, 'hours': hours, 'spent': cost})
+
+
+def ensure_many_user_stats(user_ids):
+    """Backfill the rollups of every listed user who has none yet, with one lookup"""
+    user_ids = set(user_ids)
+    if user_ids:
+        existing = {row[0] for row in db.session.query(UserStats.user_id).filter(UserStats.user_id.in_(user_ids))}
+        if user_ids - existing:
+            rebuild_user_stats(sorted(user_ids - existing))
+
+
+def rebuild_user_stats(user_ids=None):
+    """Recompute the rollups from reservations for the given users (all users when None)"""
+    closed = Reservation.leaving_timestamp.isnot(None)
+    hours = hours_between(Reservation.parking_timestamp, Reservation.leaving_timestamp)
+
+    totals = db.session.query(
+        Reservation.user_id,
+        db.func.count(Reservation.id),
+        db.func.count(Reservation.id).filter(Reservation.leaving_timestamp.is_(None)),
+        db.func.count(Reservation.id).filter(closed),
+        db.func.coalesce(db.func.sum(Reservation.parking_cost).filter(closed), 0),
+        db.func.coalesce(db.func.sum(hours).filter(closed), 0)
+    )
+    month = time_bucket('month', Reservation.leaving_timestamp)
+    monthly = db.session.query(
+        Reservation.user_id,
+        month,
+        ParkingSpot.lot_id,
+        db.func.count(Reservation.id),
+        db.func.coalesce(db.func.sum(hours), 0),
+        db.func.coalesce(db.func.sum(Reservation.parking_cost), 0)
+    ).join(ParkingSpot, Reservation.spot_id == ParkingSpot.id).filter(closed)
+
+    stats_delete = db.delete(UserStats)
+    monthly_delete = db.delete(UserMonthlyStats)
+    if user_ids is not None:
+        totals = totals.filter(Reservation.user_id.in_(user_ids))
+        monthly = monthly.filter(Reservation.user_id.in_(user_ids))
+        stats_delete = stats_delete.where(UserStats.user_id.in_(user_ids))
+        monthly_delete = monthly_delete.where(UserMonthlyStats.user_id.in_(user_ids))
+
+    db.session.execute(stats_delete)
+    db.session.execute(monthly_delete)
+
+    stats_rows = [
+        {
+            'user_id': user_id,
+            'total_reservations': total,
+            'active_reservations': active,
+            'completed_reservations': completed,
+            'total_spent': float(spent),
+            'total_hours': float(hours_sum)
+        }
+        for user_id, total, active, completed, spent, hours_sum in totals.group_by(Reservation.user_id).all()
+    ]
+    seen = {row['user_id'] for row in stats_rows}
+    # Users without any reservations still get a (zero) row so they are not backfilled again
+    stats_rows += [{'user_id': user_id} for user_id in (user_ids or []) if user_id not in seen]
+    if stats_rows:
+        db.session.execute(db.insert(UserStats), stats_rows)
+
+    monthly_rows = [
+        {
+            'user_id': user_id,
+            'month': date.fromisoformat(month_key),
+            'lot_id': lot_id,
+            'reservations': count,
+            'hours': float(hours_sum),
+            'spent': float(spent)
+        }
+        for user_id, month_key, lot_id, count, hours_sum, spent
+        in monthly.group_by(Reservation.user_id, month, ParkingSpot.lot_id).all()
+    ]
+    if monthly_rows:
+        db.session.execute(db.insert(UserMonthlyStats), monthly_rows)
+    return len(stats_rows)
+
+
+def user_dashboard(user_id, months=6):
+    """Data behind /api/user/summary from the rollups plus the five latest reservations"""
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        ensure_user_stats(user_id)
+        db.session.commit()
+        stats = db.session.get(UserStats, user_id)
+
+    rows = db.session.query(UserMonthlyStats, ParkingLot.prime_location_name).outerjoin(
+        ParkingLot, UserMonthlyStats.lot_id == ParkingLot.id
+    ).filter(UserMonthlyStats.user_id == user_id).all()
+
+    first_month = bucket_start(datetime.utcnow(), 'month')
+    for _ in range(months - 1):
+        first_month = bucket_start(first_month - timedelta(days=1), 'month')
+    month_keys = [first_month]
+    while len(month_keys) < months:
+        month_keys.append(next_bucket(month_keys[-1], 'month'))
+
+    by_month = {key: {'hours': 0.0, 'spent': 0.0} for key in month_keys}
+    by_lot = {}
+    for row, lot_name in rows:
+        if row.month in by_month:
+            by_month[row.month]['hours'] += row.hours
+            by_month[row.month]['spent'] += row.spent
+        lot = by_lot.setdefault(row.lot_id, {'name': lot_name or 'Unknown', 'count': 0, 'hours': 0.0})
+        lot['count'] += row.reservations
+        lot['hours'] += row.hours
+
+    locations_used = [dict(lot, hours=round(lot['hours'], 2)) for lot in by_lot.values()]
+    favorite = max(locations_used, key=lambda lot: lot['count'], default=None)
+
+    recent = reservation_rows_query().filter(
+        Reservation.user_id == user_id
+    ).order_by(Reservation.id.desc()).limit(5).all()
+
+    return {
+        'total_reservations': stats.total_reservations,
+        'active_reservations': stats.active_reservations,
+        'completed_reservations': stats.completed_reservations,
+        'total_spending': float(stats.total_spent),
+        'total_hours': round(float(stats.total_hours), 2),
+        'favorite_lot': favorite['name'] if favorite else 'N/A',
+        'monthly_usage': [
+            {
+                'month': key.strftime('%B %Y'),
+                'hours': round(by_month[key]['hours'], 2),
+                'spent': float(by_month[key]['spent'])
+            }
+            for key in month_keys
+        ],
+        'locations_used': locations_used,
+        'recent_reservations': [
+            {
+                'id': reservation.id,
+                'location': lot.prime_location_name if lot else 'Unknown',
+                'parking_timestamp': reservation.parking_timestamp.isoformat(),
+                'leaving_timestamp': reservation.leaving_timestamp.isoformat() if reservation.leaving_timestamp else None,
+                'duration_hours': round(reservation.get_duration(), 2),
+                'parking_cost': float(reservation.parking_cost),
+                'is_active': reservation.is_active()
+            }
+            for reservation, spot, lot in recent
+        ]
+    }
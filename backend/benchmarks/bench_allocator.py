@@ -0,0 +1,113 @@
+"""
+Bookings/sec with the in-memory spot allocator versus the old
+`ParkingSpot.query.filter_by(lot_id=..., status='A').first()` scan.
+
+    python benchmarks/bench_allocator.py [spots_per_lot] [bookings]
+"""
+import sys
+import threading
+
+from common import make_app, seed_lot, seed_user, timed
+
+from application.allocator import SpotAllocator
+from application.database import db
+from application.models import ParkingSpot, Reservation
+
+
+def book_with_scan(lot_id, user_id, bookings):
+    for _ in range(bookings):
+        spot = ParkingSpot.query.filter_by(lot_id=lot_id, status='A').first()
+        spot.status = 'O'
+        db.session.add(Reservation(spot_id=spot.id, user_id=user_id))
+        db.session.commit()
+
+
+def book_with_allocator(allocator, lot_id, user_id, bookings):
+    for _ in range(bookings):
+        spot_id = allocator.claim_spot(lot_id)  # marks the spot 'O'
+        db.session.add(Reservation(spot_id=spot_id, user_id=user_id))
+        db.session.commit()
+        allocator.confirm(spot_id)
+
+
+def pick_with_scan(lot_id, picks):
+    for _ in range(picks):
+        ParkingSpot.query.filter_by(lot_id=lot_id, status='A').first()
+
+
+def pick_with_allocator(allocator, lot_id, picks):
+    for _ in range(picks):
+        spot_id = allocator.allocate(lot_id)
+        allocator.confirm(spot_id)
+        allocator.release(lot_id, spot_id)
+
+
+def hammer_allocator(allocator, lot_id, threads, ops_per_thread):
+    """Allocate and release from many threads, checking no spot is handed out twice"""
+    held = set()
+    held_lock = threading.Lock()
+    duplicates = []
+
+    def worker():
+        for _ in range(ops_per_thread):
+            spot_id = allocator.allocate(lot_id)
+            with held_lock:
+                if spot_id in held:
+                    duplicates.append(spot_id)
+                held.add(spot_id)
+            with held_lock:
+                held.discard(spot_id)  # hand it back after another thread had a chance to collide
+            allocator.confirm(spot_id)
+            allocator.release(lot_id, spot_id)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return duplicates
+
+
+def main():
+    spots = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    bookings = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    print(f'{spots} spots per lot, {bookings} bookings per run')
+
+    app = make_app()
+    with app.app_context():
+        user_id = seed_user()
+        scan_lot = seed_lot(spots, name='Scan Lot')
+        alloc_lot = seed_lot(spots, name='Allocator Lot')
+
+        allocator = SpotAllocator()
+        timed('allocator build (load)', allocator.load, spots * 2)
+
+        timed('book: allocator.claim_spot()', lambda: book_with_allocator(allocator, alloc_lot, user_id, bookings), bookings)
+        timed('book: filter_by(status=A).first()', lambda: book_with_scan(scan_lot, user_id, bookings), bookings)
+
+        # Spot selection alone on a 90% full lot, where the scan has to skip
+        # every occupied row before it finds a free one
+        occupied = int(spots * 0.9)
+        db.session.execute(
+            ParkingSpot.__table__.update()
+            .where(ParkingSpot.lot_id == scan_lot, ParkingSpot.spot_number.in_([f'A{i}' for i in range(1, occupied + 1)]))
+            .values(status='O')
+        )
+        db.session.commit()
+        allocator.reload_lot(scan_lot)
+        picks = 500
+        timed('pick spot, 90% full: filter_by().first()', lambda: pick_with_scan(scan_lot, picks), picks)
+        timed('pick spot, 90% full: allocator', lambda: pick_with_allocator(allocator, scan_lot, picks), picks)
+
+        threads, ops = 8, 50000
+        duplicates = []
+        timed(f'allocate+release, {threads} threads (no DB)',
+              lambda: duplicates.extend(hammer_allocator(allocator, alloc_lot, threads, ops)),
+              threads * ops)
+        print(f'duplicate hand-outs: {len(duplicates)}')
+        print(f'free spots tracked: {allocator.available_count(alloc_lot)} '
+              f'(database: {ParkingSpot.query.filter_by(lot_id=alloc_lot, status="A").count()})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Bills/sec when auditing a month of released reservations: per-object
+Reservation.calculate_cost (two lazy loads per row when the tariff is not
+snapshotted) versus billing.audit_bills, which loads the columns in chunks
+and prices them as one NumPy batch (or a plain loop when NumPy is missing).
+Also checks that both agree.
+
+    python benchmarks/bench_billing.py [reservations] [lots]
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+from common import make_app, seed_lot, seed_user, timed
+
+from application import billing
+from application.database import db
+from application.models import ParkingLot, ParkingSpot, Reservation
+
+MONTH_START = datetime(2026, 9, 1)
+
+
+def seed_month(n_reservations, n_lots, user_id):
+    """Reservations parked and released within September, on lots with mixed tariffs"""
+    rng = random.Random(42)
+    spots = []
+    for i in range(n_lots):
+        lot_id = seed_lot(50, name=f'Billing Lot {i}', price=rng.choice([10.0, 20.0, 35.5]))
+        lot = db.session.get(ParkingLot, lot_id)
+        if i % 2:
+            lot.first_hour_rate = lot.price_per_hour * 1.5
+            lot.night_rate = lot.price_per_hour / 2
+            lot.daily_cap = lot.price_per_hour * 12
+        spots.extend(row[0] for row in db.session.query(ParkingSpot.id).filter(ParkingSpot.lot_id == lot_id))
+    db.session.commit()
+
+    rows = []
+    for _ in range(n_reservations):
+        start = MONTH_START + timedelta(minutes=rng.randrange(27 * 24 * 60))
+        rows.append({
+            'spot_id': rng.choice(spots),
+            'user_id': user_id,
+            'parking_timestamp': start,
+            'leaving_timestamp': start + timedelta(minutes=rng.choice([30, 60, 95, 240, 600, 1500, 4000])),
+            'parking_cost': 0.0,
+            'created_at': start
+        })
+    db.session.execute(Reservation.__table__.insert(), rows)
+    db.session.commit()
+
+
+def audit_per_object():
+    """The old way: load every reservation and call calculate_cost on it"""
+    costs = {}
+    for reservation in Reservation.query.filter(Reservation.leaving_timestamp.isnot(None)).all():
+        costs[reservation.id] = reservation.calculate_cost()
+    db.session.rollback()
+    return costs
+
+
+def main():
+    n_reservations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_lots = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f'{n_reservations} reservations over {n_lots} lots, NumPy {"on" if billing.np is not None else "off"}')
+
+    app = make_app()
+    with app.app_context():
+        seed_month(n_reservations, n_lots, seed_user('billing'))
+        month = (MONTH_START, MONTH_START + timedelta(days=30))
+
+        results = {}
+        timed('per-object calculate_cost', lambda: results.update(per_object=audit_per_object()), n_reservations)
+        timed('billing.audit_bills (vectorized)',
+              lambda: results.update(report=billing.audit_bills(*month)), n_reservations)
+        timed('billing.audit_bills --fix',
+              lambda: results.update(fixed=billing.audit_bills(*month, fix=True)), n_reservations)
+
+        stored = dict(db.session.query(Reservation.id, Reservation.parking_cost))
+        differ = sum(
+            1 for reservation_id, cost in results['per_object'].items()
+            if abs(stored[reservation_id] - cost) > billing.COST_TOLERANCE
+        )
+        print(f"audit found {results['report']['mismatched']} stale bill(s), fixed {results['fixed']['fixed']}; "
+              f'{differ} fixed bill(s) differ from calculate_cost')
+        sys.exit(1 if differ else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Login throughput under a burst, and what the burst does to everything else.
+Many request threads log in at once, either hashing inline on their own thread
+(as login did before) or through security.authenticate, which runs the hashes
+on the password hasher's bounded pool. Meanwhile a probe thread runs a query
+and a little Python over and over; its latency stands in for the other
+endpoints, which also need a connection from the database pool.
+A last round logs in users whose hashes use older parameters and checks that
+every one of them is upgraded.
+
+    python benchmarks/bench_login.py [logins] [threads] [pool_workers] [method]
+    python benchmarks/bench_login.py 400 32 2 pbkdf2:sha256:600000
+"""
+import sys
+import threading
+import time
+
+from common import make_app
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from application.database import db
+from application.models import User
+from application.passwords import password_hasher, PasswordQueueFull
+from application.security import authenticate
+
+PASSWORD = 'correct horse'
+N_USERS = 50
+
+
+def seed_users(method):
+    """N_USERS users sharing PASSWORD, hashed with method (one hash, copied, to keep seeding fast)"""
+    password_hash = generate_password_hash(PASSWORD, method=method)
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'login{i}', 'email': f'login{i}@bench.local', 'password_hash': password_hash, 'role': 'user',
+         'is_active': True}
+        for i in range(N_USERS)
+    ])
+    db.session.commit()
+
+
+def login_inline(username):
+    """The old login path: query the user and hash on the request thread"""
+    user = User.query.filter_by(username=username).first()
+    return user if user is not None and check_password_hash(user.password_hash, PASSWORD) else None
+
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def probe(app, stop, latencies):
+    """A cheap endpoint's work, one query and a little Python, timed end to end"""
+    while not stop.is_set():
+        with app.app_context():
+            start = time.perf_counter()
+            db.session.execute(db.select(db.func.count(User.id))).scalar()
+            sum(i * i for i in range(20_000))
+            db.session.remove()
+            latencies.append(time.perf_counter() - start)
+        time.sleep(0.005)
+
+
+def burst(app, login, n_logins, n_threads):
+    """n_logins logins spread over n_threads threads; returns (elapsed, login latencies, outcomes, probe latencies)"""
+    latencies, probe_latencies = [], []
+    outcomes = {'ok': 0, 'failed': 0, 'rejected': 0}
+    lock = threading.Lock()
+    remaining = iter(range(n_logins))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(remaining, None)
+            if i is None:
+                return
+            with app.app_context():
+                start = time.perf_counter()
+                try:
+                    outcome = 'ok' if login(f'login{i % N_USERS}') is not None else 'failed'
+                except PasswordQueueFull:
+                    outcome = 'rejected'
+                elapsed = time.perf_counter() - start
+                db.session.remove()
+            with lock:
+                latencies.append(elapsed)
+                outcomes[outcome] += 1
+
+    stop = threading.Event()
+    probe_thread = threading.Thread(target=probe, args=(app, stop, probe_latencies))
+    probe_thread.start()
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    probe_thread.join()
+    return elapsed, latencies, outcomes, probe_latencies
+
+
+def report(label, n_logins, result):
+    elapsed, latencies, outcomes, probe_latencies = result
+    print(f'{label:<34} {outcomes["ok"] / elapsed:8.1f} logins/s  '
+          f'login p50 {percentile(latencies, 0.5) * 1000:7.1f}ms p95 {percentile(latencies, 0.95) * 1000:7.1f}ms  '
+          f'probe p50 {percentile(probe_latencies, 0.5) * 1000:6.1f}ms p95 {percentile(probe_latencies, 0.95) * 1000:6.1f}ms  '
+          f'ok {outcomes["ok"]} failed {outcomes["failed"]} rejected {outcomes["rejected"]}')
+    return outcomes
+
+
+def main():
+    n_logins = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    method = sys.argv[4] if len(sys.argv) > 4 else 'scrypt'
+
+    app = make_app()
+    # Queue room for every thread, so the comparison measures waiting rather than rejections
+    password_hasher.configure(method=method, max_workers=workers, max_queue=n_threads)
+    print(f'{n_logins} logins from {n_threads} threads, {method}, pool of {password_hasher.max_workers}')
+
+    with app.app_context():
+        seed_users(method)
+        idle = []
+        stop = threading.Event()
+        threading.Timer(1.0, stop.set).start()
+        probe(app, stop, idle)
+        print(f'{"probe alone":<34} {"":>18} probe p50 {percentile(idle, 0.5) * 1000:6.1f}ms '
+              f'p95 {percentile(idle, 0.95) * 1000:6.1f}ms')
+
+    report('inline hashing (old)', n_logins, burst(app, login_inline, n_logins, n_threads))
+    password_hasher.reset_stats()
+    outcomes = report('bounded pool (authenticate)', n_logins,
+                      burst(app, lambda username: authenticate(username, PASSWORD), n_logins, n_threads))
+    stats = password_hasher.get_stats()
+    print(f'  pool: peak queued {stats["peak_queued"]}, avg wait {stats["avg_wait_ms"]}ms, '
+          f'max wait {stats["max_wait_ms"]}ms, avg hash {stats["avg_hash_ms"]}ms')
+
+    # Users still on older parameters are rehashed on their first login only
+    with app.app_context():
+        db.session.execute(db.update(User).values(
+            password_hash=generate_password_hash(PASSWORD, method='pbkdf2:sha256:1000')
+        ))
+        db.session.commit()
+    for label in ('first logins, outdated hashes', 'second logins, upgraded hashes'):
+        report(label, N_USERS, burst(app, lambda username: authenticate(username, PASSWORD), N_USERS, n_threads))
+    with app.app_context():
+        hashes = db.session.execute(db.select(User.password_hash)).scalars().all()
+        outdated = sum(1 for password_hash in hashes if password_hasher.needs_rehash(password_hash))
+    print(f'{outdated} of {len(hashes)} hashes still outdated')
+    sys.exit(1 if outdated or outcomes['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Nearest-available-lot queries through the spatial grid versus loading every
+lot with coordinates and computing distances on each request.
+
+    python benchmarks/bench_nearby.py [lots] [queries]
+"""
+import random
+import sys
+
+from common import make_app, timed
+
+from application.database import db
+from application.geo import LotGrid, haversine_km, lot_grid, nearby_lots
+from application.models import ParkingLot
+
+CENTER = (13.0827, 80.2707)  # lots are scattered over a ~100 km square around this point
+
+
+def seed_lots(n_lots, batch=5000):
+    rnd = random.Random(11)
+    for offset in range(0, n_lots, batch):
+        rows = []
+        for lot_id in range(offset + 1, min(offset + batch, n_lots) + 1):
+            available = rnd.choice([0, 0, 1, 3, 10])
+            rows.append({
+                'id': lot_id,
+                'prime_location_name': f'Lot {lot_id}',
+                'address': 'Chennai',
+                'pin_code': '600001',
+                'price_per_hour': 20.0,
+                'number_of_spots': 10,
+                'available_spots': available,
+                'occupied_spots': 10 - available,
+                'latitude': CENTER[0] + rnd.uniform(-0.45, 0.45),
+                'longitude': CENTER[1] + rnd.uniform(-0.45, 0.45),
+                'is_active': True
+            })
+        db.session.execute(ParkingLot.__table__.insert(), rows)
+        db.session.commit()
+
+
+def nearby_with_scan(latitude, longitude, radius_km, min_available=1, limit=20):
+    lots = ParkingLot.query.filter(
+        ParkingLot.latitude.isnot(None),
+        ParkingLot.is_active.is_(True),
+        ParkingLot.available_spots >= min_available
+    ).all()
+    matches = []
+    for lot in lots:
+        distance = haversine_km(latitude, longitude, lot.latitude, lot.longitude)
+        if distance <= radius_km:
+            matches.append((distance, lot.id, lot))
+    matches.sort(key=lambda match: match[:2])
+    return [(lot, distance) for distance, _, lot in matches[:limit]]
+
+
+def main():
+    n_lots = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    app = make_app()
+    with app.app_context():
+        seed_lots(n_lots)
+        timed('build grid', lot_grid.load, n_lots)
+
+        rnd = random.Random(5)
+        points = [
+            (CENTER[0] + rnd.uniform(-0.4, 0.4), CENTER[1] + rnd.uniform(-0.4, 0.4))
+            for _ in range(n_queries)
+        ]
+        for radius in (1.0, 3.0, 10.0):
+            print(f'\nradius {radius:g} km')
+            # Both paths must agree on which lots come back
+            for latitude, longitude in points[:20]:
+                expected = [lot.id for lot, _ in nearby_with_scan(latitude, longitude, radius)]
+                actual = [lot.id for lot, _ in nearby_lots(latitude, longitude, radius)]
+                assert expected == actual, (latitude, longitude, radius)
+                db.session.expunge_all()
+            timed('  full scan + haversine', lambda: [
+                (nearby_with_scan(lat, lon, radius), db.session.expunge_all()) for lat, lon in points[:20]
+            ], 20)
+            timed('  grid + primary-key lookup', lambda: [
+                (nearby_lots(lat, lon, radius), db.session.expunge_all()) for lat, lon in points
+            ], n_queries)
+            timed('  grid candidates only', lambda: [lot_grid.within(lat, lon, radius) for lat, lon in points], n_queries)
+
+        # Cell size sanity check: a coarser grid visits fewer cells but more candidates
+        for cell in (0.01, 0.05, 0.2):
+            grid = LotGrid(cell_degrees=cell)
+            grid.load()
+            timed(f'grid {cell:g} deg cells, 3 km radius', lambda: [grid.within(lat, lon, 3.0) for lat, lon in points], n_queries)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Lot creation, shrinking and deletion time by spot count: one ORM object per
+spot (the old route code) versus the chunked set-based statements in
+application/provisioning.py.
+
+    python benchmarks/bench_provisioning.py [max_spots]
+"""
+import sys
+import time
+
+from common import make_app
+
+from application.database import db
+from application.models import ParkingLot, ParkingSpot
+from application import provisioning
+
+
+def new_lot(n_spots):
+    lot = ParkingLot(
+        prime_location_name='Garage', address='1 Bench Street', pin_code='600001',
+        price_per_hour=10.0, number_of_spots=n_spots
+    )
+    lot.available_spots = n_spots
+    lot.occupied_spots = 0
+    db.session.add(lot)
+    db.session.flush()
+    return lot
+
+
+def create_orm(n_spots):
+    lot = new_lot(n_spots)
+    for i in range(1, n_spots + 1):
+        db.session.add(ParkingSpot(spot_number=f'A{i}', lot_id=lot.id))
+    db.session.commit()
+    return lot.id
+
+
+def create_bulk(n_spots):
+    lot = new_lot(n_spots)
+    provisioning.add_spots(lot.id, 1, n_spots)
+    db.session.commit()
+    return lot.id
+
+
+def shrink_orm(lot_id, count):
+    spots = ParkingSpot.query.filter(
+        ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'A'
+    ).order_by(ParkingSpot.id.desc()).limit(count).all()
+    for spot in spots:
+        db.session.delete(spot)
+    db.session.commit()
+
+
+def shrink_bulk(lot_id, count):
+    provisioning.remove_free_spots(lot_id, count)
+    db.session.commit()
+
+
+def delete_orm(lot_id):
+    db.session.delete(db.session.get(ParkingLot, lot_id))  # cascades by loading every spot
+    db.session.commit()
+
+
+def delete_bulk(lot_id):
+    provisioning.delete_lot(lot_id)
+    db.session.commit()
+
+
+def seconds(fn, *args):
+    db.session.expunge_all()
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    max_spots = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    sizes = [size for size in (100, 1_000, 5_000, 20_000, 50_000) if size <= max_spots]
+
+    app = make_app()
+    with app.app_context():
+        print(f'{"spots":>8} | {"create orm":>10} {"bulk":>8} | {"shrink/2 orm":>12} {"bulk":>8} | {"delete orm":>10} {"bulk":>8}')
+        for size in sizes:
+            row = []
+            for create, shrink, delete in ((create_orm, shrink_orm, delete_orm), (create_bulk, shrink_bulk, delete_bulk)):
+                create_time, lot_id = seconds(create, size)
+                shrink_time, _ = seconds(shrink, lot_id, size // 2)
+                delete_time, _ = seconds(delete, lot_id)
+                assert ParkingSpot.query.filter_by(lot_id=lot_id).count() == 0
+                row.append((create_time, shrink_time, delete_time))
+            (c_orm, s_orm, d_orm), (c_bulk, s_bulk, d_bulk) = row
+            print(f'{size:>8} | {c_orm:>9.3f}s {c_bulk:>7.3f}s | {s_orm:>11.3f}s {s_bulk:>7.3f}s | {d_orm:>9.3f}s {d_bulk:>7.3f}s')
+
+
+if __name__ == '__main__':
+    main()
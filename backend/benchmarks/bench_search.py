@@ -0,0 +1,94 @@
+"""
+Lot search with the full-text index versus the old leading-wildcard LIKE
+filter followed by one available-spots COUNT per matched lot.
+
+    python benchmarks/bench_search.py [lots] [repeats]
+"""
+import random
+import sys
+
+from common import make_app, timed
+
+from application.database import db
+from application.models import ParkingLot, ParkingSpot
+from application.search import init_search_index, search_lots
+
+AREAS = ['Anna Nagar', 'Adyar', 'T Nagar', 'Velachery', 'Guindy', 'Mylapore', 'Tambaram', 'Porur']
+KINDS = ['Mall', 'Metro', 'Hospital', 'Tech Park', 'Stadium', 'Market', 'Airport', 'Beach']
+STREETS = ['MG Road', 'Mount Road', 'OMR', 'ECR', 'GST Road', 'Poonamallee High Road']
+QUERIES = ['phoenix', 'metro', 'velachery mall', '6000', 'omr tech']
+COUNT_SAMPLE = 50
+
+
+def seed_lots(n_lots, spots_per_lot=2, batch=5000):
+    rnd = random.Random(42)
+    next_id = 1
+    for offset in range(0, n_lots, batch):
+        lots, spots = [], []
+        for lot_id in range(next_id, next_id + min(batch, n_lots - offset)):
+            # A handful of lots carry a rare name so selective queries have something to find
+            name = f'Phoenix {rnd.choice(KINDS)}' if lot_id % 5000 == 0 else f'{rnd.choice(AREAS)} {rnd.choice(KINDS)} {lot_id}'
+            lots.append({
+                'id': lot_id,
+                'prime_location_name': name,
+                'address': f'{rnd.randint(1, 500)} {rnd.choice(STREETS)}, Chennai',
+                'pin_code': f'600{rnd.randint(0, 120):03d}',
+                'price_per_hour': 20.0,
+                'number_of_spots': spots_per_lot,
+                'available_spots': spots_per_lot,
+                'occupied_spots': 0
+            })
+            spots += [{'lot_id': lot_id, 'spot_number': f'A{i}', 'status': 'A'} for i in range(1, spots_per_lot + 1)]
+        next_id += len(lots)
+        db.session.execute(ParkingLot.__table__.insert(), lots)
+        if spots:
+            db.session.execute(ParkingSpot.__table__.insert(), spots)
+        db.session.commit()
+
+
+def like_filter(text):
+    pattern = f'%{text.lower()}%'
+    return ParkingLot.query.filter(
+        db.or_(
+            db.func.lower(ParkingLot.prime_location_name).like(pattern),
+            db.func.lower(ParkingLot.address).like(pattern),
+            ParkingLot.pin_code.like(pattern)
+        )
+    ).all()
+
+
+def count_available(lots):
+    return [(lot.id, ParkingSpot.query.filter_by(lot_id=lot.id, status='A').count()) for lot in lots]
+
+
+def search_with_index(text):
+    return [(lot.id, lot.available_spots) for lot in search_lots(text)]
+
+
+def main():
+    n_lots = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    app = make_app()
+    with app.app_context():
+        seed_lots(n_lots)
+        timed('build FTS index over all lots', init_search_index, n_lots)
+        print()
+
+        for text in QUERIES:
+            lots = like_filter(text)
+            print(f'query {text!r}: {len(search_with_index(text))} indexed match(es), {len(lots)} substring match(es)')
+
+            like_time = timed('  LIKE filter', lambda: [like_filter(text) for _ in range(repeats)], repeats) / repeats
+            # One COUNT per matched lot; time a sample and extrapolate so broad queries finish
+            sample = lots[:COUNT_SAMPLE]
+            count_time = timed(f'  COUNT per lot ({len(sample)} lots)', lambda: count_available(sample), len(sample)) if sample else 0
+            per_lot = count_time / len(sample) if sample else 0
+            print(f'  old search total (est.)                       {like_time + per_lot * len(lots):8.3f}s per query')
+            index_time = timed('  full-text index, counters', lambda: [search_with_index(text) for _ in range(repeats)], repeats)
+            print(f'  new search total                              {index_time / repeats:8.3f}s per query')
+            db.session.expire_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Autocomplete lookups against the in-memory prefix index, plus its build
+time, memory footprint and incremental update cost.
+
+    python benchmarks/bench_suggest.py [lots] [lookups]
+"""
+import random
+import sys
+import tracemalloc
+
+from common import make_app, timed
+from bench_search import QUERIES, seed_lots
+
+from application.suggest import SuggestIndex
+
+
+def main():
+    n_lots = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+
+    app = make_app()
+    with app.app_context():
+        seed_lots(n_lots, spots_per_lot=0)
+
+        index = SuggestIndex()
+        timed('build index', index.load, n_lots)
+        # Rebuild under tracemalloc only to measure the footprint (tracing slows the build down)
+        tracemalloc.start()
+        index.load()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats = index.get_stats()
+        print(f"{stats['entries']} entries ({stats['distinct_tokens']} distinct tokens) for {stats['lots']} lots, "
+              f"~{current / 1024 / 1024:.1f} MiB\n")
+
+        prefixes = ['p', 'ph', 'phoe', 'me', 'metro', 'velachery ma', '600', '60004', 'omr te', 'zzz'] + QUERIES
+        for prefix in prefixes:
+            elapsed = timed(f'suggest {prefix!r} ({len(index.suggest(prefix))} hits)',
+                            lambda: [index.suggest(prefix) for _ in range(lookups)], lookups)
+            print(f'{"":<45} {elapsed / lookups * 1e6:8.1f} us/lookup')
+
+        rnd = random.Random(7)
+        edits = 2000
+        timed('incremental update_lot', lambda: [
+            index.update_lot(rnd.randint(1, n_lots), f'Edited Lot {i}', 'New Street, Chennai', '600999')
+            for i in range(edits)
+        ], edits)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite database so they never touch
+instance/parking_app.db. Run them from the backend directory, e.g.
+    python benchmarks/bench_allocator.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from application.config import TestingConfig
+from application.database import db
+
+
+def make_app(db_path=None, database_uri=None):
+    """Create a minimal app bound to a temporary SQLite file, or to database_uri when given"""
+    if database_uri is None:
+        if db_path is None:
+            fd, db_path = tempfile.mkstemp(suffix='.db', prefix='parking_bench_')
+            os.close(fd)
+        database_uri = f'sqlite:///{db_path}'
+    app = Flask(__name__)
+    app.config.from_object(TestingConfig)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed_lot(n_spots, name='Bench Lot', price=10.0):
+    """Insert one lot with n_spots free spots and return its id"""
+    from application.models import ParkingLot, ParkingSpot
+
+    lot = ParkingLot(
+        prime_location_name=name,
+        address='1 Bench Street',
+        pin_code='600001',
+        price_per_hour=price,
+        number_of_spots=n_spots
+    )
+    lot.available_spots = n_spots
+    lot.occupied_spots = 0
+    db.session.add(lot)
+    db.session.flush()
+    db.session.execute(
+        ParkingSpot.__table__.insert(),
+        [{'spot_number': f'A{i}', 'status': 'A', 'lot_id': lot.id} for i in range(1, n_spots + 1)]
+    )
+    db.session.commit()
+    return lot.id
+
+
+def seed_user(username='bench'):
+    """Insert a regular user and return its id"""
+    from application.models import User
+
+    user = User(username=username, email=f'{username}@bench.local', password='bench')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def timed(label, fn, ops):
+    """Run fn once and print ops/sec"""
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<45} {ops:>8} ops  {elapsed:8.3f}s  {ops / elapsed:12.1f} ops/sec')
+    return elapsed
@@ -0,0 +1,147 @@
+"""
+Concurrent booking stress test: several simulated workers, each with its own
+SpotAllocator (as separate gunicorn workers have), book one lot from many
+threads until it is full. Reports bookings/sec and checks that no spot was
+booked twice and that spot statuses and lot counters agree with the
+reservations.
+
+The old read-then-write claim (load the spot, check status, set 'O') runs
+first for comparison; it double-books as soon as two workers' free lists
+overlap. The current claim_spot must never do so, and the script exits
+non-zero if it does.
+
+    python benchmarks/stress_booking.py [spots] [workers] [threads_per_worker]
+    python benchmarks/stress_booking.py 500 4 8 postgresql://user:pw@localhost/parking_stress
+"""
+import sys
+import threading
+import time
+
+from common import make_app, seed_lot, seed_user
+
+from application.allocator import SpotAllocator
+from application.database import db
+from application.models import ParkingLot, ParkingSpot, Reservation
+
+
+def claim_read_then_write(allocator, lot_id):
+    """The claim path before conditional updates: check the loaded row, then write it"""
+    spot_id = allocator.allocate(lot_id)
+    if spot_id is None:
+        spot = ParkingSpot.query.filter_by(lot_id=lot_id, status='A').first()
+        spot_id = spot.id if spot is not None else None
+    if spot_id is None:
+        return None
+    spot = db.session.get(ParkingSpot, spot_id)
+    if spot.status != 'A':
+        allocator.confirm(spot_id)
+        return claim_read_then_write(allocator, lot_id)
+    time.sleep(0)  # let another thread run between the check and the write, as a busy server would
+    spot.status = 'O'
+    db.session.flush()
+    return spot_id
+
+
+def claim_conditional(allocator, lot_id):
+    return allocator.claim_spot(lot_id)
+
+
+def book(app, claim, allocator, lot_id, user_id, counts, counts_lock):
+    """Book until the lot is full, the way create_reservation does"""
+    booked = errors = 0
+    while True:
+        with app.app_context():
+            spot_id = None
+            try:
+                spot_id = claim(allocator, lot_id)
+                if spot_id is None:
+                    db.session.rollback()
+                    break
+                db.session.add(Reservation(spot_id=spot_id, user_id=user_id, vehicle_number='STRESS'))
+                ParkingLot.adjust_spot_counters(lot_id, available=-1, occupied=1)
+                db.session.commit()
+                allocator.confirm(spot_id)
+                booked += 1
+            except Exception:
+                db.session.rollback()
+                if spot_id is not None:
+                    allocator.abandon(lot_id, spot_id)
+                errors += 1
+                if errors > 1000:
+                    break
+    with counts_lock:
+        counts['booked'] += booked
+        counts['errors'] += errors
+
+
+def check(lot_id, n_spots):
+    """Double bookings and counter mismatches after the lot has been filled"""
+    double_booked = db.session.query(Reservation.spot_id).join(ParkingSpot).filter(
+        ParkingSpot.lot_id == lot_id
+    ).group_by(Reservation.spot_id).having(db.func.count(Reservation.id) > 1).count()
+    reservations = db.session.query(Reservation.id).join(ParkingSpot).filter(ParkingSpot.lot_id == lot_id).count()
+    occupied = ParkingSpot.query.filter_by(lot_id=lot_id, status='O').count()
+    lot = db.session.get(ParkingLot, lot_id)
+    return {
+        'double_booked_spots': double_booked,
+        'reservations': reservations,
+        'occupied_spots': occupied,
+        'lot_counters': (lot.available_spots, lot.occupied_spots),
+        'expected_counters': (n_spots - occupied, occupied),
+    }
+
+
+def run(app, label, claim, n_spots, workers, threads_per_worker):
+    with app.app_context():
+        lot_id = seed_lot(n_spots, name=label)
+        user_id = seed_user(f'stress_{label.lower().replace(" ", "_")}')
+        allocators = []
+        for _ in range(workers):
+            allocator = SpotAllocator()
+            allocator.reload_lot(lot_id)
+            allocators.append(allocator)
+
+    counts = {'booked': 0, 'errors': 0}
+    counts_lock = threading.Lock()
+    threads = [
+        threading.Thread(target=book, args=(app, claim, allocator, lot_id, user_id, counts, counts_lock))
+        for allocator in allocators for _ in range(threads_per_worker)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        result = check(lot_id, n_spots)
+    print(f'{label:<22} {counts["booked"]:>6} bookings  {elapsed:7.3f}s  {counts["booked"] / elapsed:9.1f} bookings/sec  '
+          f'{counts["errors"]:>4} errors  {result["double_booked_spots"]:>4} double-booked spots')
+    print(f'{"":<22} reservations {result["reservations"]}, occupied spots {result["occupied_spots"]}, '
+          f'lot counters {result["lot_counters"]} (expected {result["expected_counters"]})')
+    return result
+
+
+def main():
+    n_spots = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    threads_per_worker = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    database_uri = sys.argv[4] if len(sys.argv) > 4 else None
+    print(f'{n_spots} spots, {workers} workers x {threads_per_worker} threads')
+
+    app = make_app(database_uri=database_uri)
+    run(app, 'read-then-write (old)', claim_read_then_write, n_spots, workers, threads_per_worker)
+    result = run(app, 'conditional UPDATE', claim_conditional, n_spots, workers, threads_per_worker)
+
+    ok = (
+        result['double_booked_spots'] == 0
+        and result['reservations'] == result['occupied_spots'] == n_spots
+        and result['lot_counters'] == result['expected_counters']
+    )
+    print('OK: no double bookings' if ok else 'FAILED')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Baseline schema: users, parking lots, spots and reservations
+
+Revision ID: 0001_baseline
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=80), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('password_hash', sa.String(length=128), nullable=False),
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('username')
+    )
+    op.create_table(
+        'parking_lots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('prime_location_name', sa.String(length=100), nullable=False),
+        sa.Column('address', sa.Text(), nullable=False),
+        sa.Column('pin_code', sa.String(length=10), nullable=False),
+        sa.Column('price_per_hour', sa.Float(), nullable=False),
+        sa.Column('number_of_spots', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'parking_spots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('spot_number', sa.String(length=10), nullable=False),
+        sa.Column('status', sa.Enum('A', 'O', name='spot_status'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('lot_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['lot_id'], ['parking_lots.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'reservations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('parking_timestamp', sa.DateTime(), nullable=False),
+        sa.Column('leaving_timestamp', sa.DateTime(), nullable=True),
+        sa.Column('parking_cost', sa.Float(), nullable=True),
+        sa.Column('vehicle_number', sa.String(length=20), nullable=True),
+        sa.Column('remarks', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('spot_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['spot_id'], ['parking_spots.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('reservations')
+    op.drop_table('parking_spots')
+    op.drop_table('parking_lots')
+    op.drop_table('users')
+    sa.Enum(name='spot_status').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,102 @@
+"""Lot spot counters and coordinates, per-user and per-lot-day statistics tables
+
+Revision ID: 0002_counters_stats_and_coordinates
+Revises: 0001_baseline
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_counters_stats_and_coordinates'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    # Databases created with db.create_all() may already have some of these
+    existing = _columns('parking_lots')
+    new_columns = [
+        sa.Column('available_spots', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('occupied_spots', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('latitude', sa.Float(), nullable=True),
+        sa.Column('longitude', sa.Float(), nullable=True),
+    ]
+    missing = [column for column in new_columns if column.name not in existing]
+    if missing:
+        with op.batch_alter_table('parking_lots') as batch_op:
+            for column in missing:
+                batch_op.add_column(column)
+
+    if 'available_spots' not in existing:
+        op.execute("""
+            UPDATE parking_lots SET
+                available_spots = (SELECT COUNT(*) FROM parking_spots
+                                   WHERE parking_spots.lot_id = parking_lots.id AND parking_spots.status = 'A'),
+                occupied_spots = (SELECT COUNT(*) FROM parking_spots
+                                  WHERE parking_spots.lot_id = parking_lots.id AND parking_spots.status = 'O')
+        """)
+
+    tables = _tables()
+    if 'user_stats' not in tables:
+        # Rows are backfilled lazily per user (application.user_stats.ensure_user_stats)
+        # or in bulk with `flask rebuild-user-stats`
+        op.create_table(
+            'user_stats',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('total_reservations', sa.Integer(), nullable=False),
+            sa.Column('active_reservations', sa.Integer(), nullable=False),
+            sa.Column('completed_reservations', sa.Integer(), nullable=False),
+            sa.Column('total_spent', sa.Float(), nullable=False),
+            sa.Column('total_hours', sa.Float(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('user_id')
+        )
+    if 'user_monthly_stats' not in tables:
+        op.create_table(
+            'user_monthly_stats',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('month', sa.Date(), nullable=False),
+            sa.Column('lot_id', sa.Integer(), nullable=False),
+            sa.Column('reservations', sa.Integer(), nullable=False),
+            sa.Column('hours', sa.Float(), nullable=False),
+            sa.Column('spent', sa.Float(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('user_id', 'month', 'lot_id')
+        )
+    if 'daily_lot_stats' not in tables:
+        # Filled by the rollup_daily_lot_stats task or `flask backfill-daily-stats`
+        op.create_table(
+            'daily_lot_stats',
+            sa.Column('lot_id', sa.Integer(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('revenue', sa.Float(), nullable=False),
+            sa.Column('reservations', sa.Integer(), nullable=False),
+            sa.Column('completed_reservations', sa.Integer(), nullable=False),
+            sa.Column('completed_hours', sa.Float(), nullable=False),
+            sa.Column('parked_hours', sa.Float(), nullable=False),
+            sa.Column('peak_occupancy', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('lot_id', 'day')
+        )
+
+
+def downgrade():
+    op.drop_table('daily_lot_stats')
+    op.drop_table('user_monthly_stats')
+    op.drop_table('user_stats')
+    with op.batch_alter_table('parking_lots') as batch_op:
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
+        batch_op.drop_column('occupied_spots')
+        batch_op.drop_column('available_spots')
@@ -0,0 +1,37 @@
+"""Indexes for the hot spot and reservation filters
+
+Revision ID: 0003_hot_path_indexes
+Revises: 0002_counters_stats_and_coordinates
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_hot_path_indexes'
+down_revision = '0002_counters_stats_and_coordinates'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_parking_spots_lot_id_status', 'parking_spots', ['lot_id', 'status']),
+    ('ix_reservations_user_id_leaving_timestamp', 'reservations', ['user_id', 'leaving_timestamp']),
+    ('ix_reservations_spot_id_leaving_timestamp', 'reservations', ['spot_id', 'leaving_timestamp']),
+    ('ix_reservations_leaving_timestamp', 'reservations', ['leaving_timestamp']),
+    ('ix_reservations_parking_timestamp', 'reservations', ['parking_timestamp']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        # A database built by db.create_all() from the current models already has them
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,44 @@
+"""Bulk parking lot import jobs
+
+Revision ID: 0004_import_jobs
+Revises: 0003_hot_path_indexes
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_import_jobs'
+down_revision = '0003_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A database built by db.create_all() from the current models already has it
+    if 'import_jobs' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'import_jobs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('format', sa.String(length=10), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('rows_processed', sa.Integer(), nullable=False),
+        sa.Column('lots_imported', sa.Integer(), nullable=False),
+        sa.Column('spots_created', sa.Integer(), nullable=False),
+        sa.Column('error_count', sa.Integer(), nullable=False),
+        sa.Column('errors', sa.Text(), nullable=True),
+        sa.Column('message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('import_jobs')
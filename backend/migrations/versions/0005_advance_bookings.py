@@ -0,0 +1,49 @@
+"""Advance bookings of a spot for a future time window
+
+Revision ID: 0005_advance_bookings
+Revises: 0004_import_jobs
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_advance_bookings'
+down_revision = '0004_import_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A database built by db.create_all() from the current models already has it
+    if 'advance_bookings' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'advance_bookings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.DateTime(), nullable=False),
+        sa.Column('end_time', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('vehicle_number', sa.String(length=20), nullable=True),
+        sa.Column('remarks', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('lot_id', sa.Integer(), nullable=False),
+        sa.Column('spot_id', sa.Integer(), nullable=False),
+        sa.Column('reservation_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['lot_id'], ['parking_lots.id']),
+        sa.ForeignKeyConstraint(['reservation_id'], ['reservations.id']),
+        sa.ForeignKeyConstraint(['spot_id'], ['parking_spots.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_advance_bookings_spot_id_start_time', 'advance_bookings', ['spot_id', 'start_time'], unique=False)
+    op.create_index('ix_advance_bookings_user_id_start_time', 'advance_bookings', ['user_id', 'start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_advance_bookings_user_id_start_time', table_name='advance_bookings')
+    op.drop_index('ix_advance_bookings_spot_id_start_time', table_name='advance_bookings')
+    op.drop_table('advance_bookings')
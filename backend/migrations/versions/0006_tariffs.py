@@ -0,0 +1,54 @@
+"""Lot tariff rules and the tariff snapshot on reservations
+
+Revision ID: 0006_tariffs
+Revises: 0005_advance_bookings
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_tariffs'
+down_revision = '0005_advance_bookings'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _add_missing(table, names):
+    # Databases created with db.create_all() from the current models already have them
+    missing = [name for name in names if name not in _columns(table)]
+    if missing:
+        with op.batch_alter_table(table) as batch_op:
+            for name in missing:
+                batch_op.add_column(sa.Column(name, sa.Float(), nullable=True))
+    return missing
+
+
+def upgrade():
+    _add_missing('parking_lots', ['first_hour_rate', 'night_rate', 'daily_cap'])
+    added = _add_missing('reservations', ['hourly_rate', 'first_hour_rate', 'night_rate', 'daily_cap'])
+
+    if 'hourly_rate' in added:
+        # Existing reservations were priced at their lot's hourly rate; freeze the current one
+        op.execute("""
+            UPDATE reservations SET hourly_rate = (
+                SELECT parking_lots.price_per_hour FROM parking_spots
+                JOIN parking_lots ON parking_lots.id = parking_spots.lot_id
+                WHERE parking_spots.id = reservations.spot_id
+            )
+        """)
+
+
+def downgrade():
+    with op.batch_alter_table('reservations') as batch_op:
+        for name in ('daily_cap', 'night_rate', 'first_hour_rate', 'hourly_rate'):
+            batch_op.drop_column(name)
+    with op.batch_alter_table('parking_lots') as batch_op:
+        for name in ('daily_cap', 'night_rate', 'first_hour_rate'):
+            batch_op.drop_column(name)
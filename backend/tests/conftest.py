@@ -0,0 +1,34 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.py builds the app at import time from DATABASE_URL, so point it at a throwaway database first
+_fd, _db_path = tempfile.mkstemp(suffix='.db', prefix='parking_test_')
+os.close(_fd)
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_path}'
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app
+    yield flask_app
+    os.remove(_db_path)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, username, password):
+    response = client.post('/api/auth/login', json={'username': username, 'password': password})
+    return {'Authorization': f"Bearer {response.get_json()['data']['access_token']}"}
+
+
+@pytest.fixture
+def admin_headers(client):
+    return login(client, 'admin', 'admin123')
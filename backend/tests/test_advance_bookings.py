@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta
+
+from conftest import login
+
+
+def test_check_in_counts_reservation_once_for_user_without_stats(client, admin_headers):
+    """A user's first reservation coming from a check-in must not be counted twice by the stats backfill"""
+    lot = client.post('/api/admin/parking-lots', headers=admin_headers, json={
+        'prime_location_name': 'Check-in Lot', 'address': '1 Test Road', 'pin_code': '600001',
+        'price_per_hour': 10, 'number_of_spots': 3
+    })
+    assert lot.status_code == 201
+    lot_id = lot.get_json()['data']['id']
+
+    client.post('/api/auth/register', json={'username': 'checkin', 'email': 'checkin@test.local', 'password': 'pw'})
+    headers = login(client, 'checkin', 'pw')
+
+    start = datetime.utcnow() + timedelta(minutes=5)
+    booking = client.post('/api/advance-bookings', headers=headers, json={
+        'lot_id': lot_id, 'start': start.isoformat(), 'end': (start + timedelta(hours=2)).isoformat()
+    })
+    assert booking.status_code == 201
+    booking_id = booking.get_json()['data']['id']
+
+    assert client.put(f'/api/advance-bookings/{booking_id}/check-in', headers=headers).status_code == 200
+
+    summary = client.get('/api/user/summary', headers=headers).get_json()['data']
+    assert summary['total_reservations'] == 1
+    assert summary['active_reservations'] == 1
@@ -0,0 +1,13 @@
+from application.cache import TTLCache, TwoLevelCache
+from application.fake_redis import FakeRedis
+
+
+def test_short_lived_entry_does_not_shorten_its_tag_set():
+    """Invalidating a tag must still reach a long-lived entry after a short-lived one was cached under it"""
+    cache = TwoLevelCache(TTLCache())
+    cache.attach_redis(FakeRedis(), listen=False)
+
+    cache.set('report', 'slow to build', ttl=3600, tags=('lots',))
+    cache.set('count', 3, ttl=5, tags=('lots',))
+
+    assert cache.redis.ttl(cache._tag_key('lots')) > 3600
@@ -0,0 +1,12 @@
+from application import query_plans
+
+
+def test_check_query_plans_skips_unsupported_databases(app, monkeypatch):
+    """check-query-plans reports a database it cannot read plans from instead of crashing"""
+    def explain(statement):
+        raise query_plans.UnsupportedDialectError('Reading query plans is not supported for mysql')
+
+    monkeypatch.setattr(query_plans, 'explain', explain)
+    result = app.test_cli_runner().invoke(args=['check-query-plans'])
+    assert result.exit_code == 0
+    assert 'Skipping the query plan check: Reading query plans is not supported for mysql.' in result.output
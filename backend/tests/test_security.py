@@ -0,0 +1,29 @@
+from conftest import login
+
+
+def _register(client, username):
+    client.post('/api/auth/register', json={'username': username, 'email': f'{username}@test.local', 'password': 'pw'})
+    headers = login(client, username, 'pw')
+    user_id = client.get('/api/auth/profile', headers=headers).get_json()['data']['id']
+    return headers, user_id
+
+
+def test_deactivated_user_cannot_search_suggestions(client, admin_headers):
+    """Search suggestions check the user's status like every other user endpoint"""
+    headers, user_id = _register(client, 'suggester')
+    assert client.get('/api/search/suggest?q=a', headers=headers).status_code == 200
+
+    assert client.put(f'/api/admin/users/{user_id}', headers=admin_headers, json={'is_active': False}).status_code == 200
+    assert client.get('/api/search/suggest?q=a', headers=headers).status_code == 403
+
+
+def test_user_status_change_from_another_worker_clears_cached_status(app):
+    """A status change announced by another worker is not served from this worker's cache"""
+    import json
+    from application.cache import app_cache
+    from application.security import user_status_cache
+
+    user_status_cache.set(12345, ('user', True))
+    app_cache.handle_message(json.dumps({'origin': 'another-worker', 'event': 'user_status_changed',
+                                         'data': {'user_id': 12345}}))
+    assert user_status_cache.get(12345) is None